@@ -5,40 +5,57 @@ See <https://www.gnu.org/licenses/gpl-3.0.html> for details.
 
 from __future__ import annotations
 
+import re
 from collections import defaultdict
-from dataclasses import field
 from math import fsum, log
 from statistics import fmean, median
-from typing import Optional, TYPE_CHECKING
+from typing import TYPE_CHECKING, ClassVar, Optional
 
+try:
+    import numpy as np
+except ImportError:  # numpy is optional (not bundled with Anki)
+    np = None  # type: ignore[assignment]
 
-from .text_processing import WordToken
+from .lib.lru_cache import LruCache
 from .lib.utilities import dataclass_with_slots
+from .text_processing import WordToken
 
 if TYPE_CHECKING:
-    from anki.notes import Note, NoteId
+    from collections.abc import Callable, Iterable, Sequence
+
     from anki.cards import CardId
-    from .target_cards import TargetCards
+    from anki.models import NotetypeId
+    from anki.notes import Note, NoteId
+
     from .language_data import LanguageData
-    from .target_corpus_data import CorpusSegmentId, TargetCorpusData, NoteFieldContentData
-    from collections.abc import Sequence, Callable
+    from .target_cards import TargetCards
+    from .target_corpus_data import CorpusSegmentId, NoteFieldContentData, TargetCorpusData
 
 
 @dataclass_with_slots()
 class FieldMetrics:
-    words_fr_scores: dict[WordToken, float] = field(default_factory=dict)
-    words_internal_fr_scores: dict[WordToken, float] = field(default_factory=dict)
-    words_ue_scores: dict[WordToken, float] = field(default_factory=dict)
+    """
+    Metrics of the content of a note field.
+
+    Scores of words are kept in lists parallel to words (the unique words of the field, in order of first occurrence).
+    The per word dicts and lists (used by meta data and debug info of note fields) are only created when accessed.
+    """
+    words: Sequence[WordToken] = ()
+    words_count: Sequence[int] = ()  # number of occurrences of each word in the field
+
+    fr_values: Sequence[float] = ()
+    internal_fr_values: Sequence[float] = ()
+    ue_values: Sequence[float] = ()
+    familiarity_values: Sequence[float] = ()
+    familiarity_positional_values: Sequence[float] = ()
+    familiarity_sweetspot_values: Sequence[float] = ()
 
-    words_familiarity_sweetspot_scores: dict[WordToken, float] = field(default_factory=dict)
-    words_familiarity_scores: dict[WordToken, float] = field(default_factory=dict)
-    words_familiarity_positional_scores: dict[WordToken, float] = field(default_factory=dict)
-    focus_words: dict[WordToken, float] = field(default_factory=dict)
+    new_words_flags: bytes = b''
+    focus_words_flags: bytes = b''
 
     num_words: int = 0
-    unique_words: set[WordToken] = field(default_factory=set)
-    seen_words: list[WordToken] = field(default_factory=list)
-    new_words: list[WordToken] = field(default_factory=list)
+    num_new_words: int = 0
+    num_focus_words: int = 0
 
     lowest_familiarity_word: tuple[WordToken, float] = (WordToken(""), 0)
     lowest_fr_least_familiar_word: tuple[WordToken, float, float] = (WordToken(""), 0, 0)
@@ -48,10 +65,6 @@ class FieldMetrics:
     highest_ue_word: tuple[WordToken, float] = (WordToken(""), 0)
     most_obscure_word: tuple[WordToken, float] = (WordToken(""), 0)
 
-    fr_scores: list[float] = field(default_factory=list)
-    internal_fr_scores: list[float] = field(default_factory=list)
-    ue_scores: list[float] = field(default_factory=list)
-
     ideal_new_words_count_score: float = 0
     ideal_focus_words_count_score: float = 0
     ideal_words_count_score: float = 0
@@ -68,6 +81,65 @@ class FieldMetrics:
     internal_fr_score: float = 0
     ue_score: float = 0
 
+    def __get_words_scores(self, values: Sequence[float]) -> dict[WordToken, float]:
+        if not values:
+            return {}
+        return dict(zip(self.words, values))
+
+    def __get_occurrences_scores(self, values: Sequence[float]) -> list[float]:
+        return [value for value, word_count in zip(values, self.words_count) for _ in range(word_count)]
+
+    @property
+    def words_fr_scores(self) -> dict[WordToken, float]:
+        return self.__get_words_scores(self.fr_values)
+
+    @property
+    def words_internal_fr_scores(self) -> dict[WordToken, float]:
+        return self.__get_words_scores(self.internal_fr_values)
+
+    @property
+    def words_ue_scores(self) -> dict[WordToken, float]:
+        return self.__get_words_scores(self.ue_values)
+
+    @property
+    def words_familiarity_scores(self) -> dict[WordToken, float]:
+        return self.__get_words_scores(self.familiarity_values)
+
+    @property
+    def words_familiarity_positional_scores(self) -> dict[WordToken, float]:
+        return self.__get_words_scores(self.familiarity_positional_values)
+
+    @property
+    def words_familiarity_sweetspot_scores(self) -> dict[WordToken, float]:
+        return self.__get_words_scores(self.familiarity_sweetspot_values)
+
+    @property
+    def fr_scores(self) -> list[float]:
+        return self.__get_occurrences_scores(self.fr_values)
+
+    @property
+    def internal_fr_scores(self) -> list[float]:
+        return self.__get_occurrences_scores(self.internal_fr_values)
+
+    @property
+    def ue_scores(self) -> list[float]:
+        return self.__get_occurrences_scores(self.ue_values)
+
+    @property
+    def seen_words(self) -> list[WordToken]:  # words that exist in at least one reviewed card
+        return [word for word, is_new in zip(self.words, self.new_words_flags) if not is_new]
+
+    @property
+    def new_words(self) -> list[WordToken]:
+        return [word for word, is_new in zip(self.words, self.new_words_flags) if is_new]
+
+    @property
+    def focus_words(self) -> dict[WordToken, float]:  # non-mature words, sorted by familiarity
+        if not self.num_focus_words:
+            return {}
+        focus_words = [(word, familiarity) for word, is_focus, familiarity in zip(self.words, self.focus_words_flags, self.familiarity_values) if is_focus]
+        return dict(sorted(focus_words, key=lambda item: item[1]))
+
 
 class CardRanker:
 
@@ -75,12 +147,79 @@ class CardRanker:
     ranking_factors_span: dict[str, float]
     target_name: str
     ranking_factors_stats: Optional[dict[str, dict[str, float]]]
+    ranking_factors_scaling: Optional[dict[str, tuple[float, float, float]]]  # lowest and highest value, and weight of each factor used in the ranking
     ideal_word_count_min: int
     ideal_word_count_max: int
 
     field_all_empty: dict[str, bool]
     note_model_has_n_field: dict[str, bool]
 
+    # inputs computed (per word) for the fields of a note, and the inputs they depend on
+    ranking_inputs_dependencies: ClassVar[dict[str, tuple[str, ...]]] = {
+        'word_frequency': (),
+        'internal_word_frequency': (),
+        'lowest_internal_fr_word': (),
+        'lexical_underexposure': ('familiarity',),
+        'familiarity': (),
+        'familiarity_positional': (),
+        'familiarity_sweetspot': (),
+        'most_obscure_word': ('word_frequency', 'familiarity_positional'),
+        'focus_words': ('familiarity',),
+        'new_words': (),
+        'lowest_fr_least_familiar_word': ('word_frequency', 'familiarity'),
+    }
+
+    # inputs needed by each ranking factor
+    ranking_factors_inputs: ClassVar[dict[str, tuple[str, ...]]] = {
+        'word_frequency': ('word_frequency',),
+        'internal_word_frequency': ('internal_word_frequency',),
+        'familiarity': ('familiarity_positional',),
+        'familiarity_sweetspot': ('familiarity_sweetspot',),
+        'lexical_underexposure': ('lexical_underexposure',),
+        'ideal_focus_word_count': ('focus_words',),
+        'ideal_word_count': (),
+        'reinforce_learning_words': ('new_words', 'focus_words'),
+        'most_obscure_word': ('most_obscure_word',),
+        'lowest_fr_least_familiar_word': ('lowest_fr_least_familiar_word',),
+        'lowest_word_frequency': ('word_frequency',),
+        'lowest_internal_word_frequency': ('lowest_internal_fr_word',),
+        'lowest_familiarity': ('familiarity',),
+        'new_words': ('new_words',),
+        'no_new_words': ('new_words',),
+        'ideal_new_word_count': ('new_words',),
+        'proper_introduction': ('lowest_fr_least_familiar_word', 'new_words', 'focus_words', 'familiarity_positional'),
+        'proper_introduction_dispersed': ('lowest_fr_least_familiar_word', 'new_words', 'focus_words', 'familiarity_positional'),
+    }
+
+    # inputs needed to set the meta data of note fields (fm_seen_words, fm_focus_words, fm_debug_info, etc.)
+    fields_meta_data_inputs: ClassVar[tuple[str, ...]] = (
+        'word_frequency', 'familiarity', 'familiarity_positional', 'most_obscure_word', 'focus_words', 'new_words', 'lowest_fr_least_familiar_word'
+    )
+
+    # inputs read by the meta data fields of notes (without the '_static' and '_[n]' suffix of the field name)
+    fields_meta_data_fields_inputs: ClassVar[dict[str, tuple[str, ...]]] = {
+        'fm_seen_words': ('new_words',),
+        'fm_new_words': ('new_words',),
+        'fm_unseen_words': ('new_words',),
+        'fm_focus_words': ('focus_words',),
+        'fm_main_focus_word': ('focus_words',),
+        'fm_lowest_fr_word': ('word_frequency',),
+        'fm_lowest_internal_fr_word': ('lowest_internal_fr_word',),
+        'fm_lowest_familiarity_word': ('familiarity',),
+    }
+    FIELD_NAME_SUFFIX_PATTERN: ClassVar[re.Pattern[str]] = re.compile(r'(_static)?(_\d+)?$')
+
+    ranking_inputs: frozenset[str]
+
+    # fields with debug info, only created for notes of note types that have the field
+    debug_info_fields: ClassVar[tuple[str, ...]] = ('fm_debug_info', 'fm_debug_ranking_info', 'fm_debug_words_info')
+    note_model_debug_info_fields: dict[NotetypeId, tuple[str, ...]]
+
+    # debug info of note fields (per target), with the hash of the content it was created from
+    debug_info_cached: ClassVar[LruCache[tuple[str, NoteId, str], tuple[int, str]]] = LruCache(max_size=64*1024*1024, get_size=lambda item: len(item[1]))
+
+    use_numpy: ClassVar[bool] = np is not None
+
     def __init__(self, target_corpus_data: TargetCorpusData, target_name: str, language_data: LanguageData,
                  modified_dirty_notes: dict[NoteId, Optional[Note]]) -> None:
 
@@ -88,12 +227,15 @@ class CardRanker:
         self.language_data = language_data
         self.modified_dirty_notes = modified_dirty_notes
         self.ranking_factors_stats = None
+        self.ranking_factors_scaling = None
         self.ranking_factors_span = self.get_default_ranking_factors_span()
         self.target_name = target_name
         self.ideal_word_count_min = 1
         self.ideal_word_count_max = 5
         self.field_all_empty = {}
         self.note_model_has_n_field = {}
+        self.note_model_debug_info_fields = {}
+        self.ranking_inputs = frozenset(self.ranking_inputs_dependencies.keys())
 
     @staticmethod
     def get_default_ranking_factors_span() -> dict[str, float]:
@@ -144,36 +286,40 @@ class CardRanker:
     @staticmethod
     def __calc_proper_introduction_score(field_metrics: FieldMetrics, field_data: NoteFieldContentData) -> tuple[Optional[WordToken], float]:
 
-        if not field_data.field_value_tokenized or field_metrics.lowest_fr_least_familiar_word[0] == "":
+        if not field_data.field_value_token_ids or field_metrics.lowest_fr_least_familiar_word[0] == "":
             return (None, 0)
 
-        assert len(field_metrics.words_familiarity_positional_scores) == len(field_metrics.words_fr_scores)
-        assert field_metrics.lowest_fr_least_familiar_word[0] in field_data.field_value_tokenized
+        words = field_metrics.words
+        field_value_tokenized = field_data.field_value_tokenized
+
+        assert len(field_metrics.familiarity_positional_values) == len(field_metrics.fr_values) == len(words)
+        assert field_metrics.lowest_fr_least_familiar_word[0] in words
 
         # get new word
         intro_word = field_metrics.lowest_fr_least_familiar_word[0]
+        intro_word_unique_index = words.index(intro_word)
 
         # position of new word in field
-        intro_word_index = field_data.field_value_tokenized.index(intro_word)
+        intro_word_index = field_value_tokenized.index(intro_word)
         intro_word_position_score = 1 / (1 + (intro_word_index / 4))
 
         # single new word factor
-        num_new_words = len(field_metrics.new_words)
+        num_new_words = field_metrics.num_new_words
         single_new_word_score = 0.0 if num_new_words > 1 else 1.0
 
         # no repeat factor
-        intro_word_no_repeat_factor = 1 / field_data.field_value_tokenized.count(intro_word)
-        general_no_repeat_factor = 1 / (1 + (field_metrics.num_words - len(field_metrics.unique_words)))
+        intro_word_no_repeat_factor = 1 / field_metrics.words_count[intro_word_unique_index]
+        general_no_repeat_factor = 1 / (1 + (field_metrics.num_words - len(words)))
         no_repeat_score = (intro_word_no_repeat_factor + general_no_repeat_factor + 1) / 3
 
         # non-obscurity of other words
 
-        other_words = [word for word in field_metrics.words_fr_scores.keys() if word != intro_word]
+        other_words_indices = [index for index in range(len(words)) if index != intro_word_unique_index]
         non_obscurity_others_words_score = 0.0
 
-        if other_words:
-            lowest_wf_other_words = min(field_metrics.words_fr_scores[word] for word in other_words)
-            lowest_familiarity_other_words = min(field_metrics.words_familiarity_positional_scores[word] for word in other_words)
+        if other_words_indices:
+            lowest_wf_other_words = min(field_metrics.fr_values[index] for index in other_words_indices)
+            lowest_familiarity_other_words = min(field_metrics.familiarity_positional_values[index] for index in other_words_indices)
             non_obscurity_others_words_score = (min(lowest_wf_other_words, lowest_familiarity_other_words) +
                                                 (lowest_wf_other_words + lowest_familiarity_other_words) / 2) / 2
 
@@ -198,13 +344,26 @@ class CardRanker:
 
         # boost weight of lowest_word_frequency if there are not enough reviewed cards for other factors to be useful
 
-        if len(target_cards.reviewed_cards) < 50 and len(self.ranking_factors_span) == len(self.get_default_ranking_factors_span()):
+        if len(target_cards.card_table.reviewed_indices) < 50 and len(self.ranking_factors_span) == len(self.get_default_ranking_factors_span()):
             self.ranking_factors_span['lowest_word_frequency'] = max(fsum(self.ranking_factors_span.values()), self.ranking_factors_span['lowest_word_frequency'])
 
-        # get ranking factors for notes
+        # only compute the inputs needed by the used ranking factors (and the meta data of note fields)
+
+        fields_meta_data_needed = self.target_may_need_fields_meta_data(target_cards)
+        self.ranking_inputs = self.get_ranking_inputs(self.ranking_factors_span, fields_meta_data_needed)
 
-        notes_metrics = self.__get_notes_field_metrics(target_cards.notes_ids_all_cards, target_cards.notes_ids_new_cards_set)
-        notes_ranking_factors = self.__get_notes_ranking_factors(target_cards.notes_ids_all_cards, notes_metrics)
+        # get ranking factors for notes in reorder scope (other notes only need the metrics read by the meta data of note fields)
+
+        if fields_meta_data_needed:
+            fields_names = (field['name'] for note_model in target_cards.get_models_from_all_cards().values() for field in note_model['flds'])
+            meta_data_inputs = self.get_fields_meta_data_inputs(fields_names, self.ranking_inputs)
+            notes_ids_metrics = target_cards.notes_ids_all_cards
+        else:
+            meta_data_inputs = frozenset()
+            notes_ids_metrics = reorder_scope_target_cards.notes_ids_new_cards
+
+        notes_metrics = self.__get_notes_field_metrics(notes_ids_metrics, reorder_scope_target_cards.notes_ids_new_cards_set, meta_data_inputs)
+        notes_ranking_factors = self.__get_notes_ranking_factors(reorder_scope_target_cards.notes_ids_new_cards, notes_metrics)
 
         # normalize ranking of notes in reorder scope
 
@@ -212,20 +371,73 @@ class CardRanker:
 
         # set meta data that will be saved in note fields
         def set_fields_meta_data_for_notes() -> int:
-            notes_all_card = target_cards.get_notes_from_all_cards()
+            notes_all_card = target_cards.get_notes_with_fm_fields_from_all_cards()
             return self.__set_fields_meta_data_for_notes(notes_all_card, target_cards.notes_ids_new_cards_set, notes_ranking_scores_normalized, notes_metrics)
 
         # cards ranking based on note ranking
 
+        card_table = reorder_scope_target_cards.card_table
         card_rankings: dict[CardId, float] = {}
-        for card in reorder_scope_target_cards.new_cards:
-            card_rankings[card.id] = notes_rankings[card.nid]
+        for card_index in card_table.new_indices:
+            card_rankings[card_table.get_card_id(card_index)] = notes_rankings[card_table.get_note_id(card_index)]
 
         # done
         return card_rankings, set_fields_meta_data_for_notes
 
+    def calc_cards_ranking_incremental(self, target_cards: TargetCards, cards_ids: Sequence[CardId],
+                                       ranking_factors_scaling: dict[str, tuple[float, float, float]]) -> tuple[dict[CardId, float], Callable[[], int]]:
+        """
+        Ranking of only the given (new) cards, such as the cards added since a previous ranking.
+
+        The ranking factors are scaled using the lowest and highest values of the previous ranking (see ranking_factors_scaling),
+        making the ranking of the given cards comparable to the ranking of the cards already ranked.
+        """
+
+        ranking_factors_weight = {ranking_factor: weight for ranking_factor, (_, _, weight) in ranking_factors_scaling.items()}
+
+        fields_meta_data_needed = self.target_may_need_fields_meta_data(target_cards)
+        self.ranking_inputs = self.get_ranking_inputs(ranking_factors_weight, fields_meta_data_needed)
+
+        # get ranking factors for notes of given cards
+
+        card_table = target_cards.card_table
+        cards_ids_set = set(cards_ids)
+        cards_notes_ids: dict[CardId, NoteId] = {}
+        for card_index in card_table.new_indices:
+            if (card_id := card_table.get_card_id(card_index)) in cards_ids_set:
+                cards_notes_ids[card_id] = card_table.get_note_id(card_index)
+
+        notes_ids = sorted(set(cards_notes_ids.values()))
+        notes_ids_set = set(notes_ids)
+
+        notes_metrics = self.__get_notes_field_metrics(notes_ids, notes_ids_set, frozenset())
+        notes_ranking_factors = self.__get_notes_ranking_factors(notes_ids, notes_metrics)
+
+        # scale ranking factors the same way as the previous ranking (values outside its range are not clipped)
+
+        notes_ranking_scores_scaled: dict[str, dict[NoteId, float]] = {}
+        for ranking_factor, (lowest_val, highest_val, _) in ranking_factors_scaling.items():
+            factor_scores = notes_ranking_factors[ranking_factor]
+            notes_ranking_scores_scaled[ranking_factor] = {note_id: (factor_scores[note_id]-lowest_val)/(highest_val-lowest_val) for note_id in notes_ids}
+
+        notes_rankings: dict[NoteId, float] = {}
+        for note_id in notes_ids:
+            notes_rankings[note_id] = fsum(notes_ranking_scores_scaled[ranking_factor][note_id]*weight for ranking_factor, weight in ranking_factors_weight.items())
+
+        # set meta data that will be saved in note fields (only for notes of given cards)
+        def set_fields_meta_data_for_notes() -> int:
+            notes_all_card = target_cards.get_notes_with_fm_fields_from_all_cards()
+            notes = {note_id: note for note_id, note in notes_all_card.items() if note_id in notes_ids_set}
+            return self.__set_fields_meta_data_for_notes(notes, notes_ids_set, notes_ranking_scores_scaled, notes_metrics)
+
+        # done
+        return {card_id: notes_rankings[note_id] for card_id, note_id in cards_notes_ids.items()}, set_fields_meta_data_for_notes
+
     def __calc_notes_ranking(self, notes_ranking_scores: dict[str, dict[NoteId, float]], reorder_scope_target_cards: TargetCards) -> tuple[dict[str, dict[NoteId, float]], dict[NoteId, float]]:
 
+        if self.use_numpy and np is not None:
+            return self.__calc_notes_ranking_numpy(notes_ranking_scores, reorder_scope_target_cards)
+
         notes_ranking_scores_normalized: dict[str, dict[NoteId, float]] = {}
 
         notes_ids = reorder_scope_target_cards.notes_ids_new_cards_set
@@ -234,6 +446,7 @@ class CardRanker:
             notes_ranking_scores_normalized[ranking_factor] = {note_id: ranking_val for (note_id, ranking_val) in factor_scores.items() if note_id in notes_ids}
 
         useable_factors: set[str] = set()
+        factors_range: dict[str, tuple[float, float]] = {}
 
         # perform Z-score standardization, then 0 to 1 normalization
 
@@ -248,6 +461,7 @@ class CardRanker:
             if not std_dev > 0:
                 continue
 
+            factors_range[attribute] = (min(values), max(values))
             lowest_val = 0.0
 
             for note_id in notes_scores.keys():
@@ -273,7 +487,7 @@ class CardRanker:
         self.ranking_factors_stats = defaultdict(dict)
         for attribute in self.ranking_factors_span.keys():
             if attribute not in notes_ranking_scores_normalized:
-                raise Exception("Span set for unknown ranking factor '{}'.".format(attribute))
+                raise ValueError("Span set for unknown ranking factor '{}'.".format(attribute))
             vals = notes_ranking_scores_normalized[attribute].values()
             self.ranking_factors_stats[attribute]['weight'] = self.ranking_factors_span[attribute]
             self.ranking_factors_stats[attribute]['avg'] = fmean(vals)
@@ -300,6 +514,13 @@ class CardRanker:
             total_value = fsum(ranking_factors.values())
             notes_rankings[note_id] = total_value/ranking_factors_span_sum
 
+        # scaling of ranking factors (z-score standardization followed by 0 to 1 normalization equals min-max scaling)
+
+        self.ranking_factors_scaling = {}
+        for attribute, span in self.ranking_factors_span.items():
+            if span > 0 and attribute in useable_factors:
+                self.ranking_factors_scaling[attribute] = (*factors_range[attribute], span/ranking_factors_span_sum)
+
         # filter out factors not used in notes_rankings
 
         useable_notes_ranking_scores_normalized = {attr: notes_ranking_scores_normalized[attr] for attr in notes_ranking_scores_normalized if attr in useable_factors}
@@ -308,6 +529,137 @@ class CardRanker:
 
         return useable_notes_ranking_scores_normalized, notes_rankings
 
+    def __calc_notes_ranking_numpy(self, notes_ranking_scores: dict[str, dict[NoteId, float]], reorder_scope_target_cards: TargetCards) -> tuple[dict[str, dict[NoteId, float]], dict[NoteId, float]]:
+
+        notes_ids_set = reorder_scope_target_cards.notes_ids_new_cards_set
+        ranking_factors = list(notes_ranking_scores.keys())
+        notes_ids = [note_id for note_id in next(iter(notes_ranking_scores.values()), {}) if note_id in notes_ids_set]
+
+        # notes x factors matrix
+
+        notes_scores = np.empty((len(notes_ids), len(ranking_factors)), dtype=np.float64)
+        for factor_index, ranking_factor in enumerate(ranking_factors):
+            factor_scores = notes_ranking_scores[ranking_factor]
+            notes_scores[:, factor_index] = np.fromiter((factor_scores[note_id] for note_id in notes_ids), dtype=np.float64, count=len(notes_ids))
+
+        below_zero_factors = np.flatnonzero(notes_scores.min(axis=0) < 0)
+        if len(below_zero_factors) > 0:
+            raise ValueError("Below zero value found in ranking factor {}.".format(ranking_factors[below_zero_factors[0]]))
+
+        # perform Z-score standardization, then 0 to 1 normalization
+
+        std_dev = notes_scores.std(axis=0)
+        has_std_dev = std_dev > 0
+
+        standardized = (notes_scores - notes_scores.mean(axis=0)) / np.where(has_std_dev, std_dev, 1.0)
+        standardized -= np.minimum(standardized.min(axis=0), 0.0)
+        highest_val = standardized.max(axis=0)
+        useable = has_std_dev & (highest_val > 0)
+
+        notes_scores_normalized = np.where(has_std_dev, standardized / np.where(highest_val > 0, highest_val, 1.0), notes_scores)
+
+        # set stats
+
+        self.ranking_factors_stats = defaultdict(dict)
+        for attribute in self.ranking_factors_span:
+            if attribute not in notes_ranking_scores:
+                raise ValueError("Span set for unknown ranking factor '{}'.".format(attribute))
+            vals = notes_scores_normalized[:, ranking_factors.index(attribute)]
+            self.ranking_factors_stats[attribute]['weight'] = self.ranking_factors_span[attribute]
+            self.ranking_factors_stats[attribute]['avg'] = float(vals.mean())
+            self.ranking_factors_stats[attribute]['median'] = float(np.median(vals))
+
+        # ranking factors span and final ranking value for notes
+
+        factors_span = np.array([self.ranking_factors_span.get(ranking_factor, 0.0) for ranking_factor in ranking_factors], dtype=np.float64)
+        factors_span[~useable] = 0
+
+        notes_rankings_values = np.zeros(len(notes_ids), dtype=np.float64)
+        if factors_span.any():
+            notes_rankings_values = (notes_scores_normalized * factors_span).sum(axis=1) / fsum(self.ranking_factors_span.values())
+
+        notes_rankings: dict[NoteId, float] = dict.fromkeys(notes_ids_set, 0.0)
+        notes_rankings.update(zip(notes_ids, notes_rankings_values.tolist()))
+
+        # scaling of ranking factors (z-score standardization followed by 0 to 1 normalization equals min-max scaling)
+
+        lowest_vals = notes_scores.min(axis=0).tolist()
+        highest_vals = notes_scores.max(axis=0).tolist()
+        ranking_factors_span_sum = fsum(self.ranking_factors_span.values())
+
+        self.ranking_factors_scaling = {}
+        for factor_index, ranking_factor in enumerate(ranking_factors):
+            if factors_span[factor_index] > 0:
+                span = self.ranking_factors_span[ranking_factor]
+                self.ranking_factors_scaling[ranking_factor] = (lowest_vals[factor_index], highest_vals[factor_index], span/ranking_factors_span_sum)
+
+        # filter out factors not used in notes_rankings
+
+        useable_notes_ranking_scores_normalized = {
+            ranking_factor: dict(zip(notes_ids, notes_scores_normalized[:, factor_index].tolist()))
+            for factor_index, ranking_factor in enumerate(ranking_factors) if useable[factor_index]
+        }
+
+        # done
+
+        return useable_notes_ranking_scores_normalized, notes_rankings
+
+    @staticmethod
+    def get_sorted_cards_ids(cards_ids: Sequence[CardId], card_rankings: dict[CardId, float]) -> list[CardId]:
+
+        if CardRanker.use_numpy and np is not None:
+            cards_rankings_values = np.fromiter((card_rankings[card_id] for card_id in cards_ids), dtype=np.float64, count=len(cards_ids))
+            return [cards_ids[index] for index in np.argsort(-cards_rankings_values, kind='stable').tolist()]
+
+        return sorted(cards_ids, key=card_rankings.__getitem__, reverse=True)
+
+    @classmethod
+    def get_ranking_inputs(cls, ranking_factors_span: dict[str, float], fields_meta_data_needed: bool) -> frozenset[str]:
+
+        required_inputs: list[str] = []
+
+        for factor_name, factor_span in ranking_factors_span.items():
+            if factor_span > 0:
+                required_inputs.extend(cls.ranking_factors_inputs.get(factor_name, ()))
+
+        if fields_meta_data_needed:
+            required_inputs.extend(cls.fields_meta_data_inputs)
+
+        return cls.__with_inputs_dependencies(required_inputs)
+
+    @classmethod
+    def get_fields_meta_data_inputs(cls, fields_names: Iterable[str], ranking_inputs: frozenset[str]) -> frozenset[str]:
+        """
+        Inputs read by the given meta data fields of notes (limited to the given ranking inputs). The debug info fields read all inputs.
+        """
+
+        required_inputs: list[str] = []
+
+        for field_name in fields_names:
+            if field_name in cls.debug_info_fields:
+                return ranking_inputs
+            required_inputs.extend(cls.fields_meta_data_fields_inputs.get(cls.FIELD_NAME_SUFFIX_PATTERN.sub('', field_name), ()))
+
+        return cls.__with_inputs_dependencies(required_inputs) & ranking_inputs
+
+    @classmethod
+    def __with_inputs_dependencies(cls, required_inputs: list[str]) -> frozenset[str]:
+
+        inputs: set[str] = set()
+
+        while required_inputs:
+            input_name = required_inputs.pop()
+            if input_name not in inputs:
+                inputs.add(input_name)
+                required_inputs.extend(cls.ranking_inputs_dependencies[input_name])
+
+        return frozenset(inputs)
+
+    @property
+    def skipped_inputs(self) -> list[str]:
+
+        return [input_name for input_name in self.ranking_inputs_dependencies if input_name not in self.ranking_inputs]
+
     def __is_factor_used(self, factor_name: str) -> bool:
 
         try:
@@ -326,7 +678,10 @@ class CardRanker:
 
         return clean_note_found and target_cards.has_notes_with_fm_fields()
 
-    def __get_notes_field_metrics(self, notes_ids_all_cards: Sequence[NoteId], notes_ids_new_cards: set[NoteId]) -> dict[NoteId, list[FieldMetrics]]:
+    def __get_notes_field_metrics(self, notes_ids_all_cards: Sequence[NoteId], notes_ids_ranked: set[NoteId], meta_data_inputs: frozenset[str]) -> dict[NoteId, list[FieldMetrics]]:
+        """
+        Field metrics of the given notes. Notes that don't get ranked only get the metrics of the meta data inputs.
+        """
 
         notes_metrics: dict[NoteId, list[FieldMetrics]] = {note_id: [] for note_id in notes_ids_all_cards}
         bucked_size = fmean([1, (self.ideal_word_count_min+self.ideal_word_count_max)/4])
@@ -339,42 +694,43 @@ class CardRanker:
             # get scores per note field and append to note metrics
 
             note_fields_defined_in_target = self.corpus_data.targeted_fields_per_note[note_id]
+            note_inputs = self.ranking_inputs if note_id in notes_ids_ranked else meta_data_inputs
 
             for field_data in note_fields_defined_in_target:
 
                 # get metrics for field
-                field_metrics = self.__get_field_metrics_from_field_data(field_data, field_data.corpus_segment_id)
+                field_metrics = self.__get_field_metrics_from_field_data(field_data, field_data.corpus_segment_id, note_inputs)
 
                 # add to field metrics for note, add more to field_metrics below
                 notes_metrics[note_id].append(field_metrics)
                 notes_metrics_index = len(notes_metrics[note_id])-1
 
-                # some metrics are not needed for reviewed cards
-                if note_id not in notes_ids_new_cards:
+                # some metrics are only needed for ranking
+                if note_id not in notes_ids_ranked:
                     continue
 
                 # ideal new words count
-                field_ideal_new_words_count_score = self.__calc_ideal_np1_score(len(field_metrics.new_words))
+                field_ideal_new_words_count_score = self.__calc_ideal_np1_score(field_metrics.num_new_words)
                 field_metrics.ideal_new_words_count_score = field_ideal_new_words_count_score
 
                 # ideal focus words count
-                field_ideal_focus_words_count_score = self.__calc_ideal_np1_score(len(field_metrics.focus_words))
+                field_ideal_focus_words_count_score = self.__calc_ideal_np1_score(field_metrics.num_focus_words)
                 field_metrics.ideal_focus_words_count_score = field_ideal_focus_words_count_score
 
                 # ideal word count
-                field_ideal_word_count_score = self.__calc_ideal_word_count_score(len(field_data.field_value_tokenized), self.ideal_word_count_min, self.ideal_word_count_max)
+                field_ideal_word_count_score = self.__calc_ideal_word_count_score(len(field_data.field_value_token_ids), self.ideal_word_count_min, self.ideal_word_count_max)
                 field_metrics.ideal_words_count_score = field_ideal_word_count_score
 
                 # new words
-                field_new_words_score = 1 if len(field_metrics.new_words) > 0 else 0
+                field_new_words_score = 1 if field_metrics.num_new_words > 0 else 0
                 field_metrics.new_words_score = field_new_words_score
-                field_no_new_words_score = 1 if len(field_metrics.new_words) == 0 else 0
+                field_no_new_words_score = 1 if field_metrics.num_new_words == 0 else 0
                 field_metrics.no_new_words_score = field_no_new_words_score
 
                 # proper introduction
                 if set_proper_introduction or set_proper_introduction_dispersed:
                     (new_word, proper_introduction_score) = self.__calc_proper_introduction_score(field_metrics, field_data)
-                    if len(field_metrics.new_words) == 0:
+                    if field_metrics.num_new_words == 0:
                         field_metrics.proper_introduction_score = 1
                     else:
                         field_metrics.proper_introduction_score = proper_introduction_score
@@ -384,36 +740,39 @@ class CardRanker:
 
                 # reinforce learning words (note has no new words, but has at least one learning / non-mature word)
                 field_metrics.reinforce_learning_words_score = 0
-                if len(field_metrics.new_words) == 0 and len(field_metrics.focus_words) > 0:
+                if field_metrics.num_new_words == 0 and field_metrics.num_focus_words > 0:
                     field_metrics.reinforce_learning_words_score = 1
 
                 # familiarity scores (push down)
-                if len(field_metrics.words_familiarity_positional_scores) > 0:
-                    familiarity_positional_scores = field_metrics.words_familiarity_positional_scores.values()
+                if len(field_metrics.familiarity_positional_values) > 0:
+                    familiarity_positional_scores = field_metrics.familiarity_positional_values
                     field_familiarity_score = (median(familiarity_positional_scores) + (min(familiarity_positional_scores)*99)) / 100
                     field_metrics.familiarity_score = field_familiarity_score
 
                 # familiarity sweetspot scores (push up)
-                if len(field_metrics.words_familiarity_sweetspot_scores) > 0:
-                    familiarity_sweetspot_scores = field_metrics.words_familiarity_sweetspot_scores.values()
+                if len(field_metrics.familiarity_sweetspot_values) > 0:
+                    familiarity_sweetspot_scores = field_metrics.familiarity_sweetspot_values
                     bucked_score = min([bucked_size, fsum(familiarity_sweetspot_scores)]) / bucked_size
                     field_familiarity_sweetspot_score = ((bucked_score*2) + fmean(familiarity_sweetspot_scores) + max(familiarity_sweetspot_scores)) / 4
                     field_metrics.familiarity_sweetspot_score = field_familiarity_sweetspot_score
 
                 # word frequency scores (push down)
-                if (len(field_metrics.fr_scores) > 0):
-                    field_fr_score = (median(field_metrics.fr_scores) + (min(field_metrics.fr_scores)*99)) / 100
+                if len(field_metrics.fr_values) > 0:
+                    fr_scores = field_metrics.fr_scores
+                    field_fr_score = (median(fr_scores) + (min(fr_scores)*99)) / 100
                     field_metrics.fr_score = field_fr_score
 
                 # internal word frequency scores (push down)
-                if (len(field_metrics.internal_fr_scores) > 0):
-                    field_internal_fr_score = (median(field_metrics.internal_fr_scores) + (min(field_metrics.internal_fr_scores)*99)) / 100
+                if len(field_metrics.internal_fr_values) > 0:
+                    internal_fr_scores = field_metrics.internal_fr_scores
+                    field_internal_fr_score = (median(internal_fr_scores) + (min(internal_fr_scores)*99)) / 100
                     field_metrics.internal_fr_score = field_internal_fr_score
 
                 # underexposure scores (push up)
-                if (len(field_metrics.ue_scores) > 0):
-                    bucked_score = min([bucked_size, fsum(field_metrics.ue_scores)]) / bucked_size
-                    field_ue_score = ((bucked_score*2) + fmean(field_metrics.ue_scores) + max(field_metrics.ue_scores)) / 4
+                if len(field_metrics.ue_values) > 0:
+                    ue_scores = field_metrics.ue_scores
+                    bucked_score = min([bucked_size, fsum(ue_scores)]) / bucked_size
+                    field_ue_score = ((bucked_score*2) + fmean(ue_scores) + max(ue_scores)) / 4
                     if field_ue_score > 0 and field_metrics.lowest_familiarity_word[1] > 2.5 and (ue_devalue := log(field_metrics.lowest_familiarity_word[1])) > 1.0:
                         field_ue_score = field_ue_score / ue_devalue
                     field_metrics.ue_score = field_ue_score
@@ -429,95 +788,97 @@ class CardRanker:
 
         return notes_metrics
 
-    def __get_field_metrics_from_field_data(self, field_data: NoteFieldContentData, corpus_segment_id: CorpusSegmentId) -> FieldMetrics:
+    def __get_field_metrics_from_field_data(self, field_data: NoteFieldContentData, corpus_segment_id: CorpusSegmentId, ranking_inputs: frozenset[str]) -> FieldMetrics:
 
-        field_metrics = FieldMetrics()
         content_metrics = self.corpus_data.content_metrics[corpus_segment_id]
-        set_lexical_underexposure = self.__is_factor_used('lexical_underexposure')
-        set_familiarity_sweetspot = self.__is_factor_used('familiarity_sweetspot')
-        set_internal_word_frequency = self.__is_factor_used('internal_word_frequency')
-        set_lowest_internal_word_frequency = self.__is_factor_used('lowest_internal_word_frequency')
         ignored_words = self.language_data.get_ignored_words(field_data.target_language_data_id)
-
-        for word in field_data.field_value_tokenized:
-
-            # skip if word is in ignore list
-            if word in ignored_words:
-                continue
-
-            # word frequency
-            word_fr = content_metrics.word_frequency.get(word, 0)
-            field_metrics.fr_scores.append(word_fr)
-            field_metrics.words_fr_scores[word] = word_fr
-
-            # lowest fr word
-            if field_metrics.lowest_fr_word[0] == "" or word_fr < field_metrics.lowest_fr_word[1]:
-                field_metrics.lowest_fr_word = (word, word_fr)
-
-            # internal word frequency
-            if set_internal_word_frequency:
-                word_internal_fr = content_metrics.internal_word_frequency.get(word, 0)
-                field_metrics.internal_fr_scores.append(word_internal_fr)
-                field_metrics.words_internal_fr_scores[word] = word_internal_fr
-
-            # lowest internal fr word
-            if set_lowest_internal_word_frequency:
-                word_internal_fr = content_metrics.internal_word_frequency.get(word, 0)
-                if field_metrics.lowest_internal_fr_word[0] == "" or word_internal_fr < field_metrics.lowest_internal_fr_word[1]:
-                    field_metrics.lowest_internal_fr_word = (word, word_internal_fr)
-
-            # lexical underexposure
-            if set_lexical_underexposure:
-                word_ue = content_metrics.words_underexposure.get(word, 0)
-                field_metrics.ue_scores.append(word_ue)
-                field_metrics.words_ue_scores[word] = word_ue
-
-                # most underexposure word
-                if field_metrics.highest_ue_word[0] == "" or word_ue > field_metrics.highest_ue_word[1]:
-                    field_metrics.highest_ue_word = (word, word_ue)
-
-            #  familiarity score of words
-            word_familiarity_score = content_metrics.words_familiarity.get(word, 0)
-            field_metrics.words_familiarity_scores[word] = word_familiarity_score
-
-            words_familiarity_positional = content_metrics.words_familiarity_positional.get(word, 0)
-            field_metrics.words_familiarity_positional_scores[word] = words_familiarity_positional
-
-            # lowest familiarity word
-            if field_metrics.lowest_familiarity_word[0] == "" or word_familiarity_score < field_metrics.lowest_familiarity_word[1]:
-                field_metrics.lowest_familiarity_word = (word, word_familiarity_score)
-
-            # familiarity sweetspot score of words in sweetspot range
-            if set_familiarity_sweetspot:
-                word_familiarity_sweetspot_score = content_metrics.words_familiarity_sweetspot.get(word, 0)
-                field_metrics.words_familiarity_sweetspot_scores[word] = word_familiarity_sweetspot_score
-
-            # most obscure word (lowest ubiquity)
-            word_ubiquity_score = max(word_fr, words_familiarity_positional)
-            if field_metrics.most_obscure_word[0] == "" or word_ubiquity_score < field_metrics.most_obscure_word[1]:
-                field_metrics.most_obscure_word = (word, word_ubiquity_score)
-
-            # focus words
-            if word not in content_metrics.mature_words:
-                field_metrics.focus_words[word] = word_familiarity_score
-
-            # set unique, seen and new words
-            if word not in field_metrics.unique_words:
-                field_metrics.unique_words.add(word)
-                if word in content_metrics.reviewed_words:
-                    field_metrics.seen_words.append(word)  # word seen, word exist in at least one reviewed card
-                else:
-                    field_metrics.new_words.append(word)
-
-            # set lowest fr of least familiar word
-            if field_metrics.lowest_fr_least_familiar_word[0] == "" or word_familiarity_score < field_metrics.lowest_fr_least_familiar_word[2]:
-                field_metrics.lowest_fr_least_familiar_word = (word, word_fr, word_familiarity_score)
-            elif word_familiarity_score == field_metrics.lowest_fr_least_familiar_word[2]:
-                if word_fr < field_metrics.lowest_fr_least_familiar_word[1]:
-                    field_metrics.lowest_fr_least_familiar_word = (word, word_fr, word_familiarity_score)
-
-        field_metrics.num_words = len(field_data.field_value_tokenized)
-        field_metrics.focus_words = dict(sorted(field_metrics.focus_words.items(), key=lambda item: item[1]))
+        vocabulary_tokens = field_data.vocabulary.tokens
+
+        # unique words of field (in order of first occurrence), skipping words in ignore list
+
+        field_token_ids = field_data.field_value_token_ids
+        tokens_count = dict.fromkeys(field_token_ids, 1)
+
+        if len(tokens_count) < len(field_token_ids):
+            tokens_count = dict.fromkeys(tokens_count, 0)
+            for token_id in field_token_ids:
+                tokens_count[token_id] += 1
+
+        if ignored_words:
+            tokens_count = {token_id: count for token_id, count in tokens_count.items() if vocabulary_tokens[token_id] not in ignored_words}
+
+        words = [vocabulary_tokens[token_id] for token_id in tokens_count]
+
+        field_metrics = FieldMetrics(words, list(tokens_count.values()), num_words=len(field_token_ids))
+
+        if not words:
+            return field_metrics
+
+        # word frequency
+        if 'word_frequency' in ranking_inputs:
+            word_frequency = content_metrics.word_frequency
+            fr_values = [word_frequency.get(word, 0) for word in words]
+            field_metrics.fr_values = fr_values
+            lowest_index = fr_values.index(min(fr_values))
+            field_metrics.lowest_fr_word = (words[lowest_index], fr_values[lowest_index])
+
+        # internal word frequency
+        if 'internal_word_frequency' in ranking_inputs or 'lowest_internal_fr_word' in ranking_inputs:
+            internal_word_frequency = content_metrics.internal_word_frequency
+            internal_fr_values = [internal_word_frequency.get(word, 0) for word in words]
+            if 'internal_word_frequency' in ranking_inputs:
+                field_metrics.internal_fr_values = internal_fr_values
+            if 'lowest_internal_fr_word' in ranking_inputs:
+                lowest_index = internal_fr_values.index(min(internal_fr_values))
+                field_metrics.lowest_internal_fr_word = (words[lowest_index], internal_fr_values[lowest_index])
+
+        # lexical underexposure
+        if 'lexical_underexposure' in ranking_inputs:
+            words_underexposure = content_metrics.words_underexposure
+            ue_values = [words_underexposure.get(word, 0) for word in words]
+            field_metrics.ue_values = ue_values
+            highest_index = ue_values.index(max(ue_values))
+            field_metrics.highest_ue_word = (words[highest_index], ue_values[highest_index])
+
+        # familiarity score of words
+        if 'familiarity' in ranking_inputs:
+            words_familiarity = content_metrics.words_familiarity
+            familiarity_values = [words_familiarity.get(word, 0) for word in words]
+            field_metrics.familiarity_values = familiarity_values
+            lowest_index = familiarity_values.index(min(familiarity_values))
+            field_metrics.lowest_familiarity_word = (words[lowest_index], familiarity_values[lowest_index])
+
+        if 'familiarity_positional' in ranking_inputs:
+            words_familiarity_positional = content_metrics.words_familiarity_positional
+            field_metrics.familiarity_positional_values = [words_familiarity_positional.get(word, 0) for word in words]
+
+        # familiarity sweetspot score of words in sweetspot range
+        if 'familiarity_sweetspot' in ranking_inputs:
+            words_familiarity_sweetspot = content_metrics.words_familiarity_sweetspot
+            field_metrics.familiarity_sweetspot_values = [words_familiarity_sweetspot.get(word, 0) for word in words]
+
+        # most obscure word (lowest ubiquity)
+        if 'most_obscure_word' in ranking_inputs:
+            ubiquity_values = list(map(max, field_metrics.fr_values, field_metrics.familiarity_positional_values))
+            lowest_index = ubiquity_values.index(min(ubiquity_values))
+            field_metrics.most_obscure_word = (words[lowest_index], ubiquity_values[lowest_index])
+
+        # focus words
+        if 'focus_words' in ranking_inputs:
+            mature_words = content_metrics.mature_words
+            field_metrics.focus_words_flags = bytes([word not in mature_words for word in words])
+            field_metrics.num_focus_words = sum(field_metrics.focus_words_flags)
+
+        # seen and new words (seen if word exist in at least one reviewed card)
+        if 'new_words' in ranking_inputs:
+            reviewed_words = content_metrics.reviewed_words
+            field_metrics.new_words_flags = bytes([word not in reviewed_words for word in words])
+            field_metrics.num_new_words = sum(field_metrics.new_words_flags)
+
+        # lowest fr of least familiar word
+        if 'lowest_fr_least_familiar_word' in ranking_inputs:
+            (lowest_familiarity, lowest_fr, lowest_index) = min(zip(field_metrics.familiarity_values, field_metrics.fr_values, range(len(words))))
+            field_metrics.lowest_fr_least_familiar_word = (words[lowest_index], lowest_fr, lowest_familiarity)
 
         return field_metrics
 
@@ -566,7 +927,7 @@ class CardRanker:
             notes_ranking_factors['lexical_underexposure'][note_id] = fmean(field_metrics.ue_score for field_metrics in note_metrics)
             notes_ranking_factors['familiarity_sweetspot'][note_id] = fmean(field_metrics.familiarity_sweetspot_score for field_metrics in note_metrics)
 
-            has_new_words = any(len(field_metrics.new_words) > 0 for field_metrics in note_metrics)
+            has_new_words = any(field_metrics.num_new_words > 0 for field_metrics in note_metrics)
             if has_new_words:
                 notes_ranking_factors['reinforce_learning_words'][note_id] = 0
             else:
@@ -642,6 +1003,7 @@ class CardRanker:
 
             if update_note_data:
                 self.modified_dirty_notes[note_id] = note
+                self.corpus_data.target_cards.keep_modified_note(note)
                 num_updated_notes += 1
             elif lock_note_data:  # lock to keep it as it is
                 self.modified_dirty_notes[note_id] = None
@@ -743,6 +1105,13 @@ class CardRanker:
 
         return note_data
 
+    def __get_note_debug_info_fields(self, note: Note) -> tuple[str, ...]:
+
+        if note.mid not in self.note_model_debug_info_fields:
+            self.note_model_debug_info_fields[note.mid] = tuple(field_name for field_name in self.debug_info_fields if field_name in note)
+
+        return self.note_model_debug_info_fields[note.mid]
+
     def __get_new_debug_info_for_notes(self, notes: dict[NoteId, Note], notes_metrics: dict[NoteId, list[FieldMetrics]], notes_ranking_scores: dict[str, dict[NoteId, float]],
                                        notes_ids_new_cards: set[NoteId], reorder_scope_notes_ids: set[NoteId]) -> dict[NoteId, dict[str, str]]:
 
@@ -756,6 +1125,8 @@ class CardRanker:
         set_internal_word_frequency = self.__is_factor_used('internal_word_frequency')
         set_lowest_internal_word_frequency = self.__is_factor_used('lowest_internal_word_frequency')
 
+        used_ranking_factors = {k: v for k, v in notes_ranking_scores.items() if k in self.ranking_factors_span and self.ranking_factors_span[k] > 0}
+
         def debug_info_float(score: float) -> str:
             return f"{score:.3g}"
 
@@ -775,101 +1146,147 @@ class CardRanker:
         debug_info_not_in_reorder_scope = f'<< Not in reorder scope of target {self.target_name} >>'
         debug_info_no_new_cards = f'<< No new cards in main scope of target {self.target_name} >>'
 
-        for note_id, note in notes.items():
+        # the content each debug info field is created from (the html is only created again if the hash of the content changed)
+
+        debug_info_options = (set_lexical_underexposure, set_familiarity_sweetspot, set_ideal_new_word_count, set_proper_introduction,
+                              set_proper_introduction_dispersed, set_internal_word_frequency, set_lowest_internal_word_frequency)
+        ranking_factors_span = tuple((factor_name, self.ranking_factors_span[factor_name]) for factor_name in used_ranking_factors)
+
+        def get_debug_info_content(note_id: NoteId, note_metrics: list[FieldMetrics]) -> tuple:
+            return (debug_info_options, tuple((
+                field_metrics.fr_score, field_metrics.familiarity_score, field_metrics.most_obscure_word, field_metrics.ideal_focus_words_count_score,
+                field_metrics.ideal_words_count_score, field_metrics.lowest_fr_least_familiar_word, field_metrics.lowest_fr_word, field_metrics.internal_fr_score,
+                field_metrics.lowest_internal_fr_word, field_metrics.ue_score, field_metrics.highest_ue_word, field_metrics.familiarity_sweetspot_score,
+                field_metrics.ideal_new_words_count_score, field_metrics.proper_introduction_score, field_metrics.proper_introduction_dispersed_score
+            ) for field_metrics in note_metrics))
+
+        def get_debug_ranking_info_content(note_id: NoteId, note_metrics: list[FieldMetrics]) -> tuple:
+            if note_id not in notes_ids_new_cards or note_id not in reorder_scope_notes_ids:
+                return (note_id in notes_ids_new_cards,)
+            return (ranking_factors_span, tuple(factor_values[note_id] for factor_values in used_ranking_factors.values()))
+
+        def get_debug_words_info_content(note_id: NoteId, note_metrics: list[FieldMetrics]) -> tuple:
+            return tuple((
+                tuple(field_metrics.words), tuple(field_metrics.ue_values), tuple(field_metrics.fr_values), tuple(field_metrics.internal_fr_values),
+                tuple(field_metrics.familiarity_sweetspot_values), tuple(field_metrics.familiarity_values)
+            ) for field_metrics in note_metrics)
+
+        # html of each debug info field
+
+        def get_debug_info(note_id: NoteId, note_metrics: list[FieldMetrics]) -> str:
+
+            debug_info: dict[str, list[str]] = {
+                'fr_scores': [debug_info_float(field_metrics.fr_score) for field_metrics in note_metrics],
+                #'internal_fr_scores': [debug_info_float(field_metrics.internal_fr_score) for field_metrics in note_metrics],
+                'familiarity_scores': [debug_info_float(field_metrics.familiarity_score) for field_metrics in note_metrics],
+                'most_obscure_word': [debug_info_tuple_single(field_metrics.most_obscure_word) for field_metrics in note_metrics],
+                'ideal_focus_word_count': [debug_info_float(field_metrics.ideal_focus_words_count_score) for field_metrics in note_metrics],
+                'ideal_word_count': [debug_info_float(field_metrics.ideal_words_count_score) for field_metrics in note_metrics],
+                'lowest_fr_least_familiar_word': [debug_info_tuple_double(field_metrics.lowest_fr_least_familiar_word) for field_metrics in note_metrics],
+                'lowest_fr_word': [debug_info_tuple_single(field_metrics.lowest_fr_word) for field_metrics in note_metrics],
+                #'lowest_internal_fr_word': [debug_info_tuple_single(field_metrics.lowest_internal_fr_word) for field_metrics in note_metrics],
+            }
+            if set_internal_word_frequency:
+                debug_info['internal_fr_scores'] = [debug_info_float(field_metrics.internal_fr_score) for field_metrics in note_metrics]
+            if set_lowest_internal_word_frequency:
+                debug_info['lowest_internal_fr_word'] = [debug_info_tuple_single(field_metrics.lowest_internal_fr_word) for field_metrics in note_metrics]
+            if set_lexical_underexposure:
+                debug_info['ue_scores'] = [debug_info_float(field_metrics.ue_score) for field_metrics in note_metrics]
+                debug_info['highest_ue_word'] = [debug_info_tuple_single(field_metrics.highest_ue_word) for field_metrics in note_metrics]
+            if set_familiarity_sweetspot:
+                debug_info['familiarity_sweetspot_scores'] = [debug_info_float(field_metrics.familiarity_sweetspot_score) for field_metrics in note_metrics]
+            if set_ideal_new_word_count:
+                debug_info['ideal_new_words_count_scores'] = [debug_info_float(field_metrics.ideal_new_words_count_score) for field_metrics in note_metrics]
+            if set_proper_introduction:
+                debug_info['proper_introduction_scores'] = [debug_info_float(field_metrics.proper_introduction_score) for field_metrics in note_metrics]
+            if set_proper_introduction_dispersed:
+                debug_info['proper_introduction_dispersed_scores'] = [debug_info_float(field_metrics.proper_introduction_dispersed_score) for field_metrics in note_metrics]
+
+            fm_debug_info_pieces: list[str] = [target_title_html]
+            for info_name, info_val in debug_info.items():
+                if info_val:
+                    fields_info = " | ".join(field_info for field_info in info_val)
+                    fm_debug_info_pieces.append(f"{info_name}: {fields_info}<br />\n")
+            return "".join(fm_debug_info_pieces)
+
+        def get_debug_ranking_info(note_id: NoteId, note_metrics: list[FieldMetrics]) -> str:
+
+            if note_id not in notes_ids_new_cards:
+                return debug_info_no_new_cards
+            if note_id not in reorder_scope_notes_ids:
+                return debug_info_not_in_reorder_scope
+
+            fm_debug_ranking_info_pieces: list[str] = [target_title_html]
+            ranking_scores = dict(sorted(used_ranking_factors.items(), key=lambda item: (item[1][note_id]*self.ranking_factors_span[item[0]]), reverse=True))
+            for factor_name, factor_values in ranking_scores.items():
+                factor_value = factor_values[note_id]
+                factor_span = self.ranking_factors_span[factor_name]
+                factor_score = factor_value*factor_span
+                fm_debug_ranking_info_pieces.append(f"{factor_name}: {factor_value:.3f} <span style=\"opacity:0.5;\">x {factor_span} = {factor_score:.3f}</span><br />\n")
+            return "".join(fm_debug_ranking_info_pieces)
+
+        def get_debug_words_info(note_id: NoteId, note_metrics: list[FieldMetrics]) -> str:
+
+            fields_words_ue_scores_sorted = []
+            fields_words_fr_scores_sorted = []
+            fields_words_internal_fr_scores_sorted = []
+            fields_words_familiarity_sweetspot_scores_sorted = []
+            fields_words_familiarity_scores_sorted = []
+
+            for field_metrics in note_metrics:
+                fields_words_ue_scores_sorted.append(
+                    dict(sorted(field_metrics.words_ue_scores.items(), key=lambda item: item[1], reverse=True))
+                )
+                fields_words_fr_scores_sorted.append(
+                    dict(sorted(field_metrics.words_fr_scores.items(), key=lambda item: item[1], reverse=True))
+                )
+                fields_words_internal_fr_scores_sorted.append(
+                    dict(sorted(field_metrics.words_internal_fr_scores.items(), key=lambda item: item[1], reverse=True))
+                )
+                fields_words_familiarity_sweetspot_scores_sorted.append(
+                    dict(sorted(field_metrics.words_familiarity_sweetspot_scores.items(), key=lambda item: item[1], reverse=True))
+                )
+                fields_words_familiarity_scores_sorted.append(
+                    dict(sorted(field_metrics.words_familiarity_scores.items(), key=lambda item: item[1], reverse=True))
+                )
 
-            note_metrics = notes_metrics[note_id]
+            return (
+                f"{target_title_html}"
+                f"words_ue_scores: {debug_info_list_dict(fields_words_ue_scores_sorted)}<br />\n"
+                f"words_fr_scores: {debug_info_list_dict(fields_words_fr_scores_sorted)}<br />\n"
+                f"words_internal_fr_scores: {debug_info_list_dict(fields_words_internal_fr_scores_sorted)}<br />\n"
+                f"familiarity_sweetspot_scores: {debug_info_list_dict(fields_words_familiarity_sweetspot_scores_sorted)}<br />\n"
+                f"familiarity_scores: {debug_info_list_dict(fields_words_familiarity_scores_sorted)}<br />\n"
+            )
+
+        debug_info_fields: dict[str, tuple[Callable[[NoteId, list[FieldMetrics]], tuple], Callable[[NoteId, list[FieldMetrics]], str]]] = {
+            'fm_debug_info': (get_debug_info_content, get_debug_info),
+            'fm_debug_ranking_info': (get_debug_ranking_info_content, get_debug_ranking_info),
+            'fm_debug_words_info': (get_debug_words_info_content, get_debug_words_info),
+        }
+
+        for note_id, note in notes.items():
 
             note_data: dict[str, str] = {}
+            notes_debug_info[note_id] = note_data
 
-            # set fm_debug_info
-            if 'fm_debug_info' in note:
-                debug_info: dict[str, list[str]] = {
-                    'fr_scores': [debug_info_float(field_metrics.fr_score) for field_metrics in note_metrics],
-                    #'internal_fr_scores': [debug_info_float(field_metrics.internal_fr_score) for field_metrics in note_metrics],
-                    'familiarity_scores': [debug_info_float(field_metrics.familiarity_score) for field_metrics in note_metrics],
-                    'most_obscure_word': [debug_info_tuple_single(field_metrics.most_obscure_word) for field_metrics in note_metrics],
-                    'ideal_focus_word_count': [debug_info_float(field_metrics.ideal_focus_words_count_score) for field_metrics in note_metrics],
-                    'ideal_word_count': [debug_info_float(field_metrics.ideal_words_count_score) for field_metrics in note_metrics],
-                    'lowest_fr_least_familiar_word': [debug_info_tuple_double(field_metrics.lowest_fr_least_familiar_word) for field_metrics in note_metrics],
-                    'lowest_fr_word': [debug_info_tuple_single(field_metrics.lowest_fr_word) for field_metrics in note_metrics],
-                    #'lowest_internal_fr_word': [debug_info_tuple_single(field_metrics.lowest_internal_fr_word) for field_metrics in note_metrics],
-                }
-                if set_internal_word_frequency:
-                    debug_info['internal_fr_scores'] = [debug_info_float(field_metrics.internal_fr_score) for field_metrics in note_metrics]
-                if set_lowest_internal_word_frequency:
-                    debug_info['lowest_internal_fr_word'] = [debug_info_tuple_single(field_metrics.lowest_internal_fr_word) for field_metrics in note_metrics]
-                if set_lexical_underexposure:
-                    debug_info['ue_scores'] = [debug_info_float(field_metrics.ue_score) for field_metrics in note_metrics]
-                    debug_info['highest_ue_word'] = [debug_info_tuple_single(field_metrics.highest_ue_word) for field_metrics in note_metrics]
-                if set_familiarity_sweetspot:
-                    debug_info['familiarity_sweetspot_scores'] = [debug_info_float(field_metrics.familiarity_sweetspot_score) for field_metrics in note_metrics]
-                if set_ideal_new_word_count:
-                    debug_info['ideal_new_words_count_scores'] = [debug_info_float(field_metrics.ideal_new_words_count_score) for field_metrics in note_metrics]
-                if set_proper_introduction:
-                    debug_info['proper_introduction_scores'] = [debug_info_float(field_metrics.proper_introduction_score) for field_metrics in note_metrics]
-                if set_proper_introduction_dispersed:
-                    debug_info['proper_introduction_dispersed_scores'] = [debug_info_float(field_metrics.proper_introduction_dispersed_score) for field_metrics in note_metrics]
-
-                fm_debug_info_pieces: list[str] = [target_title_html]
-                for info_name, info_val in debug_info.items():
-                    if info_val:
-                        fields_info = " | ".join(field_info for field_info in info_val)
-                        fm_debug_info_pieces.append(f"{info_name}: {fields_info}<br />\n")
-                note_data['fm_debug_info'] = "".join(fm_debug_info_pieces)
-
-            # set fm_debug_ranking_info
-            if 'fm_debug_ranking_info' in note:
-                if note_id in notes_ids_new_cards:
-                    if not note.id in reorder_scope_notes_ids:
-                        note_data['fm_debug_ranking_info'] = debug_info_not_in_reorder_scope
-                    else:
-                        fm_debug_ranking_info_pieces: list[str] = [target_title_html]
-                        used_ranking_factors = {k: v for k, v in notes_ranking_scores.items() if k in self.ranking_factors_span and self.ranking_factors_span[k] > 0}
-                        ranking_scores = dict(sorted(used_ranking_factors.items(), key=lambda item: (item[1][note.id]*self.ranking_factors_span[item[0]]), reverse=True))
-                        for factor_name, factor_values in ranking_scores.items():
-                            factor_value = factor_values[note.id]
-                            factor_span = self.ranking_factors_span[factor_name]
-                            factor_score = factor_value*factor_span
-                            fm_debug_ranking_info_pieces.append(f"{factor_name}: {factor_value:.3f} <span style=\"opacity:0.5;\">x {factor_span} = {factor_score:.3f}</span><br />\n")
-                        note_data['fm_debug_ranking_info'] = "".join(fm_debug_ranking_info_pieces)
-                else:
-                    note_data['fm_debug_ranking_info'] = debug_info_no_new_cards
-
-            # set fm_debug_words_info
-            if 'fm_debug_words_info' in note:
-
-                fields_words_ue_scores_sorted = []
-                fields_words_fr_scores_sorted = []
-                fields_words_internal_fr_scores_sorted = []
-                fields_words_familiarity_sweetspot_scores_sorted = []
-                fields_words_familiarity_scores_sorted = []
-
-                for field_metrics in note_metrics:
-                    fields_words_ue_scores_sorted.append(
-                        dict(sorted(field_metrics.words_ue_scores.items(), key=lambda item: item[1], reverse=True))
-                    )
-                    fields_words_fr_scores_sorted.append(
-                        dict(sorted(field_metrics.words_fr_scores.items(), key=lambda item: item[1], reverse=True))
-                    )
-                    fields_words_internal_fr_scores_sorted.append(
-                        dict(sorted(field_metrics.words_internal_fr_scores.items(), key=lambda item: item[1], reverse=True))
-                    )
-                    fields_words_familiarity_sweetspot_scores_sorted.append(
-                        dict(sorted(field_metrics.words_familiarity_sweetspot_scores.items(), key=lambda item: item[1], reverse=True))
-                    )
-                    fields_words_familiarity_scores_sorted.append(
-                        dict(sorted(field_metrics.words_familiarity_scores.items(), key=lambda item: item[1], reverse=True))
-                    )
-
-                note_data['fm_debug_words_info'] = (
-                    f"{target_title_html}"
-                    f"words_ue_scores: {debug_info_list_dict(fields_words_ue_scores_sorted)}<br />\n"
-                    f"words_fr_scores: {debug_info_list_dict(fields_words_fr_scores_sorted)}<br />\n"
-                    f"words_internal_fr_scores: {debug_info_list_dict(fields_words_internal_fr_scores_sorted)}<br />\n"
-                    f"familiarity_sweetspot_scores: {debug_info_list_dict(fields_words_familiarity_sweetspot_scores_sorted)}<br />\n"
-                    f"familiarity_scores: {debug_info_list_dict(fields_words_familiarity_scores_sorted)}<br />\n"
-                )
+            # only for fields the note (type) actually has
+            note_debug_info_fields = self.__get_note_debug_info_fields(note)
 
-            notes_debug_info[note_id] = note_data
+            if not note_debug_info_fields:
+                continue
+
+            note_metrics = notes_metrics[note_id]
+
+            for field_name in note_debug_info_fields:
+                (get_content, get_html) = debug_info_fields[field_name]
+                content_hash = hash(get_content(note_id, note_metrics))
+                cache_key = (self.target_name, note_id, field_name)
+                cached_debug_info = CardRanker.debug_info_cached.get(cache_key)
+                if cached_debug_info is not None and cached_debug_info[0] == content_hash:
+                    note_data[field_name] = cached_debug_info[1]
+                    continue
+                note_data[field_name] = get_html(note_id, note_metrics)
+                CardRanker.debug_info_cached.put(cache_key, (content_hash, note_data[field_name]))
 
         return notes_debug_info
@@ -37,6 +37,7 @@ ConfiguredTargetKeys = Literal[
     'ideal_word_count',
     'ranking_factors',
     'corpus_segmentation_strategy',
+    'incremental_ranking',
     'notes'
 ]
 
@@ -56,6 +57,7 @@ class ConfiguredTargetDict(TypedDict, total=False):
     ideal_word_count: tuple[int, int]
     ranking_factors: dict[str, float]
     corpus_segmentation_strategy: str
+    incremental_ranking: int
     notes: list[ConfiguredTargetNote]
 
 
@@ -81,7 +83,7 @@ class ValidConfiguredTarget(dict):
         ...
 
     @overload
-    def __getitem__(self, key: Literal['maturity_min_num_cards', 'maturity_min_num_notes']) -> int:
+    def __getitem__(self, key: Literal['maturity_min_num_cards', 'maturity_min_num_notes', 'incremental_ranking']) -> int:
         ...
 
     @overload
@@ -117,7 +119,7 @@ class ValidConfiguredTarget(dict):
         ...
 
     @overload
-    def __setitem__(self, key: Literal['maturity_min_num_cards', 'maturity_min_num_notes'], value: int) -> None:
+    def __setitem__(self, key: Literal['maturity_min_num_cards', 'maturity_min_num_notes', 'incremental_ranking'], value: int) -> None:
         ...
 
     @overload
@@ -0,0 +1,351 @@
+"""
+FrequencyMan by Rick Zuidhoek. Licensed under the GNU GPL-3.0.
+See <https://www.gnu.org/licenses/gpl-3.0.html> for details.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional, cast
+
+from .target_corpus_data import SegmentIndex
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+    from pathlib import Path
+
+    from anki.notes import NoteId
+
+    from .language_data import LangDataId, LangId
+    from .target_corpus_data import CorpusSegmentId
+    from .text_processing import WordToken
+
+SNAPSHOT_FORMAT_VERSION = 2
+
+SNAPSHOT_MAGIC = b'FMCS'
+SNAPSHOT_HEADER_SIZE = struct.Struct('<4sI')  # magic + length of json header
+SNAPSHOT_ALIGNMENT = 8
+SNAPSHOT_STRINGS_SEPARATOR = '\x1f'  # not part of field values (separates the fields of notes in Anki) or word tokens
+
+
+@dataclass
+class SegmentSnapshot:
+    lang_id: LangId
+    lang_data_id: LangDataId
+    index: SegmentIndex
+    words_familiarity: dict[int, float]  # by token id
+    word_frequency: dict[int, float]  # by token id
+
+
+@dataclass
+class CorpusSnapshot:
+    """
+    Computed corpus data of a target (fields content, token ids, segment indexes, familiarity and frequency).
+    """
+
+    vocabularies: dict[LangId, list[WordToken]]
+    targeted_fields: list[tuple[NoteId, list[tuple[CorpusSegmentId, str, str, LangDataId, LangId, Sequence[int]]]]]
+    segments: dict[CorpusSegmentId, SegmentSnapshot]
+
+
+class _SnapshotWriter:
+
+    blocks: list[bytes]
+    size: int
+
+    def __init__(self) -> None:
+        self.blocks = []
+        self.size = 0
+
+    def __add_block(self, data: bytes) -> int:
+
+        offset = self.size
+        self.blocks.append(data)
+        self.size += len(data)
+
+        if (padding := -self.size % SNAPSHOT_ALIGNMENT) > 0:
+            self.blocks.append(bytes(padding))
+            self.size += padding
+
+        return offset
+
+    def add_array(self, values: Sequence[Any], typecode: str) -> list[int]:
+
+        if not isinstance(values, array) or values.typecode != typecode:
+            values = array(typecode, values)
+
+        return [self.__add_block(values.tobytes()), len(values)]
+
+    def add_strings(self, values: Sequence[str]) -> list[int]:
+
+        data = SNAPSHOT_STRINGS_SEPARATOR.join(values).encode('utf-8')
+        return [self.__add_block(data), len(data), len(values)]
+
+    def add_mapping(self, mapping: dict[int, Any], typecode: str) -> dict[str, list[int]]:
+
+        return {
+            'keys': self.add_array(list(mapping.keys()), 'I'),
+            'values': self.add_array(list(mapping.values()), typecode)
+        }
+
+    def add_sequences_mapping(self, mapping: Mapping[int, Sequence[Any]], typecode: str) -> dict[str, list[int]]:
+
+        offsets = array('I', [0])
+        values = array(typecode)
+        for sequence in mapping.values():
+            values.extend(sequence)
+            offsets.append(len(values))
+
+        return {
+            'keys': self.add_array(list(mapping.keys()), 'I'),
+            'offsets': self.add_array(offsets, 'I'),
+            'values': self.add_array(values, typecode)
+        }
+
+
+class _SnapshotReader:
+
+    buffer: memoryview
+    data_start: int
+
+    def __init__(self, buffer: memoryview, data_start: int) -> None:
+        self.buffer = buffer
+        self.data_start = data_start
+
+    def get_array(self, ref: list[int], typecode: str) -> array[Any]:
+
+        (offset, length) = ref
+        values = array(typecode)
+        start = self.data_start + offset
+        end = start + (length * values.itemsize)
+
+        if end > len(self.buffer):
+            raise ValueError("Array block outside of snapshot data.")
+
+        values.frombytes(self.buffer[start:end])
+        return values
+
+    def get_strings(self, ref: list[int]) -> list[str]:
+
+        (offset, length, num_strings) = ref
+        start = self.data_start + offset
+        end = start + length
+
+        if end > len(self.buffer):
+            raise ValueError("Strings block outside of snapshot data.")
+
+        if num_strings == 0:
+            return []
+
+        values = str(self.buffer[start:end], 'utf-8').split(SNAPSHOT_STRINGS_SEPARATOR)
+
+        if len(values) != num_strings:
+            raise ValueError("Unexpected number of strings in snapshot data.")
+
+        return values
+
+    def get_mapping(self, ref: dict[str, list[int]], typecode: str) -> dict[int, Any]:
+
+        return dict(zip(self.get_array(ref['keys'], 'I'), self.get_array(ref['values'], typecode)))
+
+    def get_sequences_mapping(self, ref: dict[str, list[int]], typecode: str) -> dict[int, array[Any]]:
+
+        keys = self.get_array(ref['keys'], 'I')
+        offsets = self.get_array(ref['offsets'], 'I')
+        values = self.get_array(ref['values'], typecode)
+
+        return {key: values[offsets[i]:offsets[i+1]] for i, key in enumerate(keys)}
+
+
+class CorpusSnapshotStore:
+    """
+    Stores corpus snapshots as files: a json header followed by the raw data of all arrays and texts (field values and vocabularies).
+
+    The json header only holds the structure and references to the data, so loading doesn't parse the text of the corpus as json.
+    Only the most recent snapshot is kept per target, and snapshots of targets that no longer exist are removed.
+    """
+
+    snapshots_dir: Path
+
+    def __init__(self, snapshots_dir: Path) -> None:
+
+        self.snapshots_dir = snapshots_dir
+
+    @staticmethod
+    def get_snapshot_key(key_parts: Sequence[Any]) -> str:
+
+        key_str = json.dumps([SNAPSHOT_FORMAT_VERSION]+[str(key_part) for key_part in key_parts])
+        return hashlib.md5(key_str.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_target_key(target_index_num: int) -> str:
+
+        return "target{}".format(target_index_num)
+
+    def __get_file_path(self, target_key: str, snapshot_key: str) -> Path:
+
+        return self.snapshots_dir / "{}_{}.snapshot".format(target_key, snapshot_key)
+
+    def save(self, target_key: str, snapshot_key: str, snapshot: CorpusSnapshot) -> None:
+
+        writer = _SnapshotWriter()
+        token_ids_refs: dict[int, list[int]] = {}
+        field_values_indices: dict[str, int] = {}
+        targeted_fields: list[tuple[NoteId, list[tuple[CorpusSegmentId, str, int, LangDataId, LangId, list[int]]]]] = []
+
+        for note_id, note_fields in snapshot.targeted_fields:
+            note_fields_refs: list[tuple[CorpusSegmentId, str, int, LangDataId, LangId, list[int]]] = []
+            for corpus_segment_id, field_name, field_value, lang_data_id, lang_id, token_ids in note_fields:
+                token_ids_ref = token_ids_refs.get(id(token_ids))
+                if token_ids_ref is None:  # token ids are shared by fields with the same value
+                    token_ids_ref = writer.add_array(token_ids, 'I')
+                    token_ids_refs[id(token_ids)] = token_ids_ref
+                field_value_index = field_values_indices.setdefault(field_value, len(field_values_indices))
+                note_fields_refs.append((corpus_segment_id, field_name, field_value_index, lang_data_id, lang_id, token_ids_ref))
+            targeted_fields.append((note_id, note_fields_refs))
+
+        segments: list[dict[str, Any]] = []
+
+        for corpus_segment_id, segment in snapshot.segments.items():
+            index = segment.index
+            segments.append({
+                'id': corpus_segment_id,
+                'lang_id': segment.lang_id,
+                'lang_data_id': segment.lang_data_id,
+                'token_counts': writer.add_mapping(index.token_counts, 'I'),
+                'all_words_presence': writer.add_sequences_mapping(index.all_words_presence, 'd'),
+                'cards_postings': writer.add_sequences_mapping(index.cards_postings, 'I'),
+                'notes_postings': writer.add_sequences_mapping(index.notes_postings, 'I'),
+                'reviewed_cards_indices': writer.add_sequences_mapping(index.reviewed_cards_indices, 'I'),
+                'reviewed_token_ids': writer.add_array(index.reviewed_token_ids, 'I'),
+                'reviewed_presence_scores': writer.add_array(index.reviewed_presence_scores, 'd'),
+                'reviewed_cards_familiarity_factors': writer.add_array(index.reviewed_cards_familiarity_factors, 'd'),
+                'words_familiarity': writer.add_mapping(segment.words_familiarity, 'd'),
+                'word_frequency': writer.add_mapping(segment.word_frequency, 'd')
+            })
+
+        header = json.dumps({
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'snapshot_key': snapshot_key,
+            'vocabularies': {lang_id: writer.add_strings(vocabulary) for lang_id, vocabulary in snapshot.vocabularies.items()},
+            'field_values': writer.add_strings(list(field_values_indices.keys())),
+            'targeted_fields': targeted_fields,
+            'segments': segments
+        }).encode('utf-8')
+        header += b' ' * (-(SNAPSHOT_HEADER_SIZE.size + len(header)) % SNAPSHOT_ALIGNMENT)
+
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+        file_path = self.__get_file_path(target_key, snapshot_key)
+        tmp_file_path = file_path.with_suffix('.tmp')
+
+        with open(tmp_file_path, 'wb') as file:
+            file.write(SNAPSHOT_HEADER_SIZE.pack(SNAPSHOT_MAGIC, len(header)))
+            file.write(header)
+            file.writelines(writer.blocks)
+
+        os.replace(tmp_file_path, file_path)
+        self.__remove_other_snapshots(target_key, file_path)
+
+    def __remove_other_snapshots(self, target_key: str, keep_file_path: Path) -> None:
+
+        for file_path in self.snapshots_dir.glob("{}_*.snapshot".format(target_key)):
+            if file_path != keep_file_path:
+                self.__remove_snapshot_file(file_path)
+
+    def remove_snapshots_of_other_targets(self, target_keys: Iterable[str]) -> None:
+        """
+        Remove the snapshots of targets that are not in the given target keys (such as targets removed from the target list).
+        """
+
+        if not self.snapshots_dir.is_dir():
+            return
+
+        kept_target_keys = set(target_keys)
+
+        for file_path in self.snapshots_dir.glob("*_*.snapshot"):
+            if file_path.stem.rsplit('_', 1)[0] not in kept_target_keys:
+                self.__remove_snapshot_file(file_path)
+
+    @staticmethod
+    def __remove_snapshot_file(file_path: Path) -> None:
+
+        try:
+            file_path.unlink()
+        except OSError:  # possibly still opened by another process
+            pass
+
+    def load(self, target_key: str, snapshot_key: str) -> Optional[CorpusSnapshot]:
+
+        file_path = self.__get_file_path(target_key, snapshot_key)
+
+        try:
+            data = file_path.read_bytes()
+        except OSError:
+            return None
+
+        try:
+            with memoryview(data) as buffer:
+                return self.__read_snapshot(buffer, snapshot_key)
+        except (ValueError, KeyError, IndexError, TypeError, struct.error):  # outdated or damaged snapshot file
+            return None
+
+    @staticmethod
+    def __read_snapshot(buffer: memoryview, snapshot_key: str) -> Optional[CorpusSnapshot]:
+
+        (magic, header_length) = SNAPSHOT_HEADER_SIZE.unpack_from(buffer)
+
+        if magic != SNAPSHOT_MAGIC:
+            return None
+
+        data_start = SNAPSHOT_HEADER_SIZE.size + header_length
+        header = json.loads(bytes(buffer[SNAPSHOT_HEADER_SIZE.size:data_start]))
+
+        if header['format_version'] != SNAPSHOT_FORMAT_VERSION or header['snapshot_key'] != snapshot_key:
+            return None
+
+        reader = _SnapshotReader(buffer, data_start)
+        field_values = reader.get_strings(header['field_values'])
+        token_ids_arrays: dict[tuple[int, int], Sequence[int]] = {}
+        targeted_fields: list[tuple[NoteId, list[tuple[CorpusSegmentId, str, str, LangDataId, LangId, Sequence[int]]]]] = []
+
+        for note_id, note_fields_refs in header['targeted_fields']:
+            note_fields: list[tuple[CorpusSegmentId, str, str, LangDataId, LangId, Sequence[int]]] = []
+            for corpus_segment_id, field_name, field_value_index, lang_data_id, lang_id, token_ids_ref in note_fields_refs:
+                token_ids = token_ids_arrays.get(tuple(token_ids_ref))
+                if token_ids is None:
+                    token_ids = reader.get_array(token_ids_ref, 'I')
+                    token_ids_arrays[tuple(token_ids_ref)] = token_ids
+                note_fields.append((corpus_segment_id, field_name, field_values[field_value_index], lang_data_id, lang_id, token_ids))
+            targeted_fields.append((note_id, note_fields))
+
+        segments: dict[CorpusSegmentId, SegmentSnapshot] = {}
+
+        for segment in header['segments']:
+            index = SegmentIndex(
+                token_counts=reader.get_mapping(segment['token_counts'], 'I'),
+                all_words_presence=reader.get_sequences_mapping(segment['all_words_presence'], 'd'),
+                cards_postings=reader.get_sequences_mapping(segment['cards_postings'], 'I'),
+                notes_postings=reader.get_sequences_mapping(segment['notes_postings'], 'I'),
+                reviewed_cards_indices=reader.get_sequences_mapping(segment['reviewed_cards_indices'], 'I'),
+                reviewed_token_ids=reader.get_array(segment['reviewed_token_ids'], 'I'),
+                reviewed_presence_scores=reader.get_array(segment['reviewed_presence_scores'], 'd'),
+                reviewed_cards_familiarity_factors=reader.get_array(segment['reviewed_cards_familiarity_factors'], 'd')
+            )
+            segments[segment['id']] = SegmentSnapshot(
+                lang_id=segment['lang_id'],
+                lang_data_id=segment['lang_data_id'],
+                index=index,
+                words_familiarity=reader.get_mapping(segment['words_familiarity'], 'd'),
+                word_frequency=reader.get_mapping(segment['word_frequency'], 'd')
+            )
+
+        return CorpusSnapshot(
+            vocabularies={lang_id: cast('list[WordToken]', reader.get_strings(vocabulary_ref)) for lang_id, vocabulary_ref in header['vocabularies'].items()},
+            targeted_fields=targeted_fields,
+            segments=segments
+        )
@@ -0,0 +1,114 @@
+"""
+FrequencyMan by Rick Zuidhoek. Licensed under the GNU GPL-3.0.
+See <https://www.gnu.org/licenses/gpl-3.0.html> for details.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Callable, Generic, Optional, TypeVar
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+
+class LruCache(Generic[K, V]):
+    """
+    Least recently used cache, bounded by a number of items and/or an (approximate) total size.
+
+    Pinned items are never evicted (until the cache is cleared). Clearing the cache also resets the counters.
+    """
+
+    max_items: Optional[int]
+    max_size: Optional[int]
+    get_size: Callable[[V], int]
+
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(self, max_items: Optional[int] = None, max_size: Optional[int] = None, get_size: Optional[Callable[[V], int]] = None) -> None:
+
+        self.max_items = max_items
+        self.max_size = max_size
+        self.get_size = get_size if get_size is not None else (lambda _: 1)
+
+        self.__items: OrderedDict[K, tuple[V, int]] = OrderedDict()
+        self.__pinned_items: dict[K, tuple[V, int]] = {}
+        self.clear()
+
+    def __contains__(self, key: K) -> bool:
+        return key in self.__items or key in self.__pinned_items
+
+    def __len__(self) -> int:
+        return len(self.__items) + len(self.__pinned_items)
+
+    def get(self, key: K) -> Optional[V]:
+
+        item = self.__items.get(key)
+
+        if item is not None:
+            self.__items.move_to_end(key)
+        else:
+            item = self.__pinned_items.get(key)
+
+        if item is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return item[0]
+
+    def put(self, key: K, value: V, pinned: bool = False) -> None:
+
+        if key in self.__items:
+            self.size -= self.__items.pop(key)[1]
+        elif key in self.__pinned_items:
+            self.size -= self.__pinned_items[key][1]
+            pinned = True
+
+        item_size = self.get_size(value)
+        self.size += item_size
+
+        if pinned:
+            self.__pinned_items[key] = (value, item_size)
+        else:
+            self.__items[key] = (value, item_size)
+
+        self.__evict()
+
+    def discard(self, key: K) -> None:
+
+        item = self.__items.pop(key, None) or self.__pinned_items.pop(key, None)
+
+        if item is not None:
+            self.size -= item[1]
+
+    def set_limits(self, max_items: Optional[int], max_size: Optional[int]) -> None:
+
+        self.max_items = max_items
+        self.max_size = max_size
+        self.__evict()
+
+    def clear(self) -> None:
+
+        self.__items.clear()
+        self.__pinned_items.clear()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __is_over_limit(self) -> bool:
+
+        if self.max_items is not None and len(self) > self.max_items:
+            return True
+        return self.max_size is not None and self.size > self.max_size
+
+    def __evict(self) -> None:
+
+        while self.__items and self.__is_over_limit():
+            (_, (_, item_size)) = self.__items.popitem(last=False)
+            self.size -= item_size
+            self.evictions += 1
@@ -9,12 +9,14 @@ from enum import Enum
 import hashlib
 import json
 from typing import Any, Callable, TypeVar
+from collections.abc import Sequence
 from time import time
 
 from .sql_db_file import SqlDbFile
 from .utilities import override
 
 T = TypeVar('T')
+K = TypeVar('K')
 
 
 class SerializationType(Enum):
@@ -110,21 +112,60 @@ class PersistentCacher:
             raise Exception("Cannot call num_items_stored() if save_buffer is not empty")
         return self.db.count_rows("cache_items")
 
-    def get_item(self, cache_id: str, producer: Callable[..., T]) -> T:
+    def __get_stored_item(self, cache_id: str) -> tuple[bool, Any]:
 
         if (hashed_cache_id := self._hash_id_hex(cache_id)) in self._pre_loaded_cache:
-            return self._pre_loaded_cache[hashed_cache_id]
+            return (True, self._pre_loaded_cache[hashed_cache_id])
 
         result = self.db.query('SELECT value, storage_type, created_at FROM cache_items WHERE id = ?', self._hash_id_bin(cache_id))
         row = result.fetch_row()
 
         if row:
-            return PersistentCacher.deserialize(row['value'], SerializationType(row['storage_type']))
+            return (True, PersistentCacher.deserialize(row['value'], SerializationType(row['storage_type'])))
+
+        return (False, None)
+
+    def get_item(self, cache_id: str, producer: Callable[..., T]) -> T:
+
+        is_stored, item = self.__get_stored_item(cache_id)
+
+        if is_stored:
+            return item
 
         item = producer()
         self.save_item(cache_id, item)
         return item
 
+    def get_items(self, items_input: dict[str, K], producer: Callable[[list[K]], Sequence[T]]) -> dict[str, T]:
+        """
+        Get multiple items at once. The producer is called (once) with the input of all items not found in the cache,
+        and should return the produced items in the same order.
+        """
+
+        items: dict[str, T] = {}
+        missing_cache_ids: list[str] = []
+
+        for cache_id in items_input:
+            is_stored, item = self.__get_stored_item(cache_id)
+            if is_stored:
+                items[cache_id] = item
+            else:
+                missing_cache_ids.append(cache_id)
+
+        if not missing_cache_ids:
+            return items
+
+        produced_items = producer([items_input[cache_id] for cache_id in missing_cache_ids])
+
+        if len(produced_items) != len(missing_cache_ids):
+            raise ValueError("Producer returned {} items, expected {}!".format(len(produced_items), len(missing_cache_ids)))
+
+        for cache_id, item in zip(missing_cache_ids, produced_items):
+            self.save_item(cache_id, item)
+            items[cache_id] = item
+
+        return items
+
     def delete_item(self, cache_id: str) -> None:
         self.db.delete_row('cache_items', 'id = ?', self._hash_id_bin(cache_id))
         self.db.commit()
@@ -183,6 +224,10 @@ class NullPersistentCacher(PersistentCacher):
     def get_item(self, cache_id: str, producer: Callable[..., T]) -> T:
         return producer()
 
+    @override
+    def get_items(self, items_input: dict[str, K], producer: Callable[[list[K]], Sequence[T]]) -> dict[str, T]:
+        return dict(zip(items_input.keys(), producer(list(items_input.values()))))
+
     @override
     def delete_item(self, cache_id: str) -> None:
         pass
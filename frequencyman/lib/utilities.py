@@ -5,6 +5,7 @@ See <https://www.gnu.org/licenses/gpl-3.0.html> for details.
 
 from __future__ import annotations
 
+from bisect import bisect_right
 import io
 import cProfile
 from contextlib import contextmanager
@@ -24,7 +25,7 @@ from aqt.utils import showInfo
 from typing_extensions import dataclass_transform
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable, Iterator
+    from collections.abc import Iterable, Iterator, Sequence
 
 var_dump_count = 0
 
@@ -287,6 +288,33 @@ def remove_bottom_percent_dict(input_dict: dict[K, float], percent_remove: float
     return dict(list(input_dict.items())[0:keep_offset_end])
 
 
+def get_longest_non_decreasing_subsequence(values: Sequence[int]) -> list[int]:
+    """Indices of the (first found) longest non-decreasing subsequence of the values."""
+
+    tails_values: list[int] = []  # lowest last value of subsequences of each length
+    tails_indices: list[int] = []
+    previous_indices: list[int] = []
+
+    for index, value in enumerate(values):
+        length = bisect_right(tails_values, value)
+        if length == len(tails_values):
+            tails_values.append(value)
+            tails_indices.append(index)
+        else:
+            tails_values[length] = value
+            tails_indices[length] = index
+        previous_indices.append(tails_indices[length-1] if length > 0 else -1)
+
+    subsequence: list[int] = []
+    index = tails_indices[-1] if tails_indices else -1
+    while index >= 0:
+        subsequence.append(index)
+        index = previous_indices[index]
+
+    subsequence.reverse()
+    return subsequence
+
+
 ShowResultType = Literal["information", "warning", "error"]
 
 def show_result(message: str, title: str, type: ShowResultType, parent: QWidget) -> bool:
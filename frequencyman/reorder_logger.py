@@ -211,7 +211,7 @@ class ReorderLogger:
             'reorder_id': reorder_id,
             'target_index': target.index_num,
             'num_cards': len(target_cards.all_cards_ids),
-            'num_new_cards': len(target_cards.new_cards),
+            'num_new_cards': len(target_cards.new_cards_ids),
             'num_cards_repositioned': target_reorder_result.num_cards_repositioned,
             'num_notes': len(target_cards.notes_ids_all_cards),
             'num_new_notes': len(target_cards.notes_ids_new_cards),
@@ -5,19 +5,24 @@ See <https://www.gnu.org/licenses/gpl-3.0.html> for details.
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional, TypedDict, get_args
+from bisect import bisect_right
+from collections import defaultdict
+import hashlib
+import json
+from typing import TYPE_CHECKING, ClassVar, Optional, TypedDict, cast, get_args
 
 from .configured_target import ConfiguredTargetKeys, ValidConfiguredTarget
-from .lib.utilities import get_float, is_numeric_value, override
+from .lib.utilities import get_float, get_longest_non_decreasing_subsequence, is_numeric_value, override
 from .card_ranker import CardRanker
 from .target_cards import TargetCards
 from .target_corpus_data import CorpusSegmentationStrategy, MaturityRequirements, TargetCorpusData
+from .corpus_snapshots import CorpusSnapshotStore
 from .tokenizers import get_user_provided_tokenizer
-from .language_data import LanguageData
+from .language_data import LanguageData, get_lang_data_dir
 
 if TYPE_CHECKING:
     from typing_extensions import Self
-    from collections.abc import Sequence, Hashable
+    from collections.abc import Callable, Sequence, Hashable
     from anki.cards import CardId
     from anki.notes import Note, NoteId
     from anki.collection import Collection, OpChangesWithCount
@@ -34,6 +39,7 @@ class TargetReorderResult:
     sorted_cards_ids: Sequence[CardId]
     target_cards: Optional[TargetCards]
     repositioning_anki_op_changes: Optional[OpChangesWithCount]
+    next_position: int  # position (due) after the last card of the target
 
     def __init__(self, success: bool, error: Optional[str] = None) -> None:
 
@@ -47,18 +53,26 @@ class TargetReorderResult:
         self.sorted_cards_ids = []
         self.target_cards = None
         self.repositioning_anki_op_changes = None
+        self.next_position = 0
 
-    def with_repositioning_data(self, sorted_cards_ids: Sequence[CardId], num_cards_repositioned: int,
+    def with_repositioning_data(self, sorted_cards_ids: Sequence[CardId], num_cards_repositioned: int, next_position: int,
                                 target_cards: TargetCards, repositioning_anki_op_changes: OpChangesWithCount) -> Self:
 
         self.sorted_cards_ids = sorted_cards_ids
         self.num_cards_repositioned = num_cards_repositioned
         self.cards_repositioned = num_cards_repositioned > 0
+        self.next_position = next_position
         self.target_cards = target_cards
         self.repositioning_anki_op_changes = repositioning_anki_op_changes
 
         return self
 
+    def with_next_position(self, next_position: int) -> Self:
+
+        self.next_position = next_position
+
+        return self
+
     @override
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({', '.join(f'{k}={v}' for k, v in vars(self).items())})"
@@ -69,6 +83,16 @@ class TargetCacheData(TypedDict):
     corpus: dict[tuple, TargetCorpusData]
 
 
+class StoredRankingResult(TypedDict, total=False):
+    key: str
+    sorted_cards_ids: list[CardId]
+    # only stored when incremental ranking is used
+    settings_key: str
+    card_rankings: list[float]
+    ranking_factors_scaling: dict[str, tuple[float, float, float]]
+    num_incremental: int
+
+
 class Target:
 
     config_target: ValidConfiguredTarget
@@ -83,9 +107,14 @@ class Target:
     corpus_data: Optional[TargetCorpusData]
     corpus_data_config_key: tuple
     cache_data: Optional[TargetCacheData] # reorder process cache
+    corpus_snapshots: Optional[CorpusSnapshotStore]
 
     main_scope_query: str
     reorder_scope_query: Optional[str]
+    __saved_ranking: Optional[tuple[str, StoredRankingResult, str, TargetCards]]  # ranking saved by the last reorder, with its settings key and cards
+
+    # max fraction of new cards added since the previous reorder for an incremental ranking (else the target is fully ranked again)
+    incremental_ranking_max_added: ClassVar[float] = 0.1
 
     def __init__(self, config_target: ValidConfiguredTarget, index_num: int, col: Collection, language_data: LanguageData, cacher: PersistentCacher) -> None:
 
@@ -100,9 +129,11 @@ class Target:
         self.name = self.__get_name()
         self.corpus_data = None
         self.cache_data = None
+        self.corpus_snapshots = None
 
         self.main_scope_query = self.config_target.construct_main_scope_query()
         self.reorder_scope_query = self.config_target.get_reorder_scope_query()
+        self.__saved_ranking = None
 
     def __get_name(self) -> str:
 
@@ -147,14 +178,18 @@ class Target:
 
     def get_corpus_data_non_cached(self, target_cards: TargetCards) -> TargetCorpusData:
 
-        if self.corpus_data and self.corpus_data_config_key != self.__get_config_key(target_cards):
-            self.corpus_data = None
+        config_key = self.__get_config_key(target_cards)
+        previous_corpus_data: Optional[TargetCorpusData] = None
 
         if self.corpus_data:
-            return self.corpus_data
+            if self.corpus_data_config_key == config_key and not self.corpus_data.has_modified_cards() and not self.corpus_data.get_modified_notes_ids():
+                return self.corpus_data
+            if self.corpus_data_config_key[1:] == config_key[1:]:  # same configuration, only the (order of) cards changed
+                previous_corpus_data = self.corpus_data
+            self.corpus_data = None
 
         self.corpus_data = TargetCorpusData(target_cards, self.config_target.get_config_fields_per_note_type(), self.language_data, self.cacher)
-        self.corpus_data_config_key = self.__get_config_key(target_cards)
+        self.corpus_data_config_key = config_key
 
         # familiarity_sweetspot_point
         configured_familiarity_sweetspot_point = self.config_target.get('familiarity_sweetspot_point')
@@ -190,12 +225,143 @@ class Target:
             elif corpus_segmentation_strategy == 'by_note_model_id_and_field_name':
                 self.corpus_data.segmentation_strategy = CorpusSegmentationStrategy.BY_NOTE_MODEL_ID_AND_FIELD_NAME
 
-        # create corpus data
-        self.corpus_data.create_data()
+        # create corpus data (from snapshot if still valid, otherwise by updating previous corpus data or from scratch)
+        target_key = CorpusSnapshotStore.get_target_key(self.index_num)
+        snapshot_key = self.__get_snapshot_key(target_cards) if self.corpus_snapshots is not None and len(target_cards) > 0 else None
+        snapshot = self.corpus_snapshots.load(target_key, snapshot_key) if self.corpus_snapshots is not None and snapshot_key is not None else None
+
+        if snapshot is not None:
+            self.corpus_data.create_data_from_snapshot(snapshot)
+        elif previous_corpus_data is not None:
+            self.corpus_data.update_data(previous_corpus_data)
+        else:
+            self.corpus_data.create_data()
+
+        if snapshot is None and self.corpus_snapshots is not None and snapshot_key is not None:
+            self.corpus_snapshots.save(target_key, snapshot_key, self.corpus_data.get_snapshot())
 
         # done
         return self.corpus_data
 
+    def __get_snapshot_key(self, target_cards: TargetCards) -> str:
+
+        key_parts: list[Hashable] = [key_part for key_part in self.__get_config_key(target_cards) if key_part is not self.col and key_part is not self.language_data]
+
+        # modification of notes of the target and of note types
+        key_parts.append(str(self.col.db.first(
+            "SELECT COUNT(*), MAX(mod), TOTAL(mod), MAX(usn) FROM notes WHERE id IN (SELECT value FROM json_each(?))",
+            json.dumps(target_cards.notes_ids_all_cards)
+        )))
+        key_parts.append(self.col.db.scalar("SELECT MAX(mtime_secs) FROM notetypes"))
+
+        # familiarity of reviewed cards (changes daily for overdue cards)
+        key_parts.append(self.__get_reviewed_cards_hash(target_cards))
+
+        # language data files and tokenizers
+        key_parts.extend(self.__get_language_data_key_parts())
+
+        return CorpusSnapshotStore.get_snapshot_key(key_parts)
+
+    def __get_ranking_factors_span(self) -> dict[str, float]:
+
+        ranking_factors_span = CardRanker.get_default_ranking_factors_span()
+
+        # Use any custom ranking weights defined in target definition
+        for attribute in ranking_factors_span.keys():
+            if (target_setting_val := get_float(self.config_target.get('ranking_'+attribute))) is not None:
+                ranking_factors_span[attribute] = target_setting_val
+
+        # Use custom ranking weight object
+        if 'ranking_factors' in self.config_target:
+            if isinstance(self.config_target['ranking_factors'], dict) and len(self.config_target['ranking_factors']) > 0:
+                ranking_factors_span = {}
+                for factor in CardRanker.get_default_ranking_factors_span().keys():
+                    if factor in self.config_target['ranking_factors']:
+                        ranking_factors_span[factor] = float(self.config_target['ranking_factors'][factor])
+
+        return ranking_factors_span
+
+    def __get_ranking_settings_key(self, target_cards: TargetCards) -> str:
+        """
+        Key of the settings the ranking of the cards depends on (configuration of the target, note types and language data).
+        """
+
+        key_parts: list[Hashable] = [key_part for key_part in self.__get_config_key(target_cards)[1:] if key_part is not self.col and key_part is not self.language_data]
+        key_parts.append(str(self.__get_ranking_factors_span()))
+        key_parts.append(str(self.config_target.get('ideal_word_count')))
+        key_parts.append(self.reorder_scope_query)
+        key_parts.append(self.col.db.scalar("SELECT MAX(mtime_secs) FROM notetypes"))
+
+        # language data files and tokenizers
+        key_parts.extend(self.__get_language_data_key_parts())
+
+        return CorpusSnapshotStore.get_snapshot_key(key_parts)
+
+    def __get_ranking_key(self, target_cards: TargetCards, ranking_settings_key: str) -> str:
+        """
+        Key of everything the ranking of the cards depends on, except the order of the new cards (which is compared separately).
+
+        Only uses the number and modification time of the notes and cards, not their content. Notes and cards modified by the reorder
+        itself (meta data fields and positions) are included by updating the key once the reorder is done (update_saved_ranking_key).
+        """
+
+        key_parts: list[Hashable] = [ranking_settings_key]
+        key_parts.append(str(self.col.db.first(
+            "SELECT COUNT(*), MAX(mod), TOTAL(mod) FROM notes WHERE id IN (SELECT value FROM json_each(?))",
+            json.dumps(target_cards.notes_ids_all_cards)
+        )))
+        key_parts.append(str(self.col.db.first(
+            "SELECT COUNT(*), MAX(mod), TOTAL(mod) FROM cards WHERE id IN (SELECT value FROM json_each(?))",
+            json.dumps(list(target_cards.all_cards_ids))
+        )))
+
+        # familiarity of overdue cards changes daily
+        key_parts.append(self.col.sched.today)
+
+        return CorpusSnapshotStore.get_snapshot_key(key_parts)
+
+    def update_saved_ranking_key(self) -> None:
+        """
+        Update the key of the ranking saved by the last reorder to the notes and cards as modified by the reorder (of all targets),
+        so the next reorder can reuse the ranking if nothing else changed.
+        """
+
+        if self.__saved_ranking is None:
+            return
+
+        (ranking_cache_id, ranking_result, ranking_settings_key, target_cards) = self.__saved_ranking
+        ranking_result['key'] = self.__get_ranking_key(target_cards, ranking_settings_key)
+        self.cacher.save_item(ranking_cache_id, ranking_result)
+        self.__saved_ranking = (ranking_cache_id, ranking_result, ranking_settings_key, target_cards)
+        self.__saved_ranking = None
+
+    @staticmethod
+    def __get_reviewed_cards_hash(target_cards: TargetCards) -> str:
+
+        reviewed_cards_hash = hashlib.md5()
+        card_table = target_cards.card_table
+        for card_index in card_table.reviewed_indices:
+            reviewed_cards_hash.update(repr((
+                card_table.ids[card_index], card_table.ivls[card_index], card_table.reps[card_index], card_table.ease_factors[card_index],
+                card_table.days_overdue[card_index], card_table.is_suspended[card_index], card_table.is_leech[card_index]
+            )).encode('utf-8'))
+
+        return reviewed_cards_hash.hexdigest()
+
+    def __get_language_data_key_parts(self) -> list[Hashable]:
+
+        key_parts: list[Hashable] = []
+
+        for lang_data_id in sorted(self.config_target.get_language_data_ids()):
+            key_parts.append(lang_data_id)
+            key_parts.append(get_user_provided_tokenizer(LanguageData.get_lang_id_from_data_id(lang_data_id)).name())
+            if (lang_data_dir := get_lang_data_dir(self.language_data.data_dir, lang_data_id)) is not None:
+                for file_path in sorted(lang_data_dir.rglob('*')):
+                    file_stats = file_path.stat()
+                    key_parts.append((file_path.name, file_stats.st_mtime_ns, file_stats.st_size))
+
+        return key_parts
+
     def __get_config_key(self, target_cards: TargetCards) -> tuple[Hashable, ...]:
 
         cache_key: list[Hashable] = [
@@ -243,6 +409,8 @@ class Target:
         if self.cache_data is None:
             raise ValueError("Cache data object required for reordering!")
 
+        self.__saved_ranking = None
+
         if "note:" not in self.main_scope_query:
             error_msg = "No valid note type defined. At least one note is required for reordering!"
             event_logger.add_entry(error_msg)
@@ -276,19 +444,6 @@ class Target:
         else:
             event_logger.add_entry("Found {:n} new cards in a target collection of {:n} cards.".format(num_new_cards, len(target_cards.all_cards_ids)))
 
-        # Get corpus data
-        with event_logger.add_benchmarked_entry("Creating corpus data from target cards."):
-            target_corpus_data = self.get_corpus_data(target_cards)
-
-        # Check tokenizers used
-        for lang_id in [LanguageData.get_lang_id_from_data_id(lang_data_id) for lang_data_id in self.config_target.get_language_data_ids()]:
-            tokenizer_used = get_user_provided_tokenizer(lang_id)
-            name_tokenizer_used = tokenizer_used.name()
-            if not name_tokenizer_used.startswith("Default"):
-                event_logger.add_entry("Used tokenizer '{}' for '{}'.".format(name_tokenizer_used, lang_id))
-            if not lang_id in tokenizer_used.supported_languages():
-                event_logger.add_entry("Language '{}' not supported by tokenizer '{}'.".format(lang_id, name_tokenizer_used))
-
         # If reorder scope is defined, use it for reordering
         reorder_scope_query = self.reorder_scope_query
         reorder_scope_target_cards = target_cards
@@ -299,7 +454,7 @@ class Target:
                 return TargetReorderResult(success=False, error="Reorder scope query yielded no results!")
             elif len(new_target_cards.new_cards_ids) == 0:
                 event_logger.add_entry("Reorder scope query yielded no new cards to reorder!")
-                return TargetReorderResult(success=True)
+                return TargetReorderResult(success=True).with_next_position(repositioning_starting_from)
             elif new_target_cards.all_cards_ids == target_cards.all_cards_ids:
                 event_logger.add_entry("Reorder scope had no effect (same result as main scope of target)!")
             else:
@@ -311,66 +466,331 @@ class Target:
                 else:
                     event_logger.add_entry("Using reorder scope query, but it did not reduce the amount of new cards in target.")
 
+        # Use the ranking of the previous reorder if nothing changed that affects the ranking
+        ranking_cache_id = "ranking_result_target{}".format(self.index_num)
+        ranking_settings_key = self.__get_ranking_settings_key(target_cards)
+        ranking_key = self.__get_ranking_key(target_cards, ranking_settings_key)
+        previous_ranking = self.__get_stored_ranking_result(ranking_cache_id)
+
+        if previous_ranking is not None and previous_ranking.get('key') == ranking_key and previous_ranking.get('sorted_cards_ids') == list(reorder_scope_target_cards.new_cards_ids):
+            event_logger.add_entry("Target is unchanged since the previous reorder.")
+            # lock notes, to keep the meta data (set by the previous reorder) from being overwritten by other targets
+            for note_id in target_cards.get_notes_ids_with_fm_fields_from_all_cards():
+                if note_id not in modified_dirty_notes:
+                    modified_dirty_notes[note_id] = None
+            event_logger.add_entry("Repositioning {:n} cards not needed for this target.".format(len(reorder_scope_target_cards.new_cards_ids)))
+            return TargetReorderResult(success=True).with_next_position(self.__get_next_position(reorder_scope_target_cards.new_cards_ids, repositioning_starting_from))
+
+        # Only rank the cards added since the previous reorder, if enabled and the previous ranking is still usable
+        incremental_ranking = int(self.config_target['incremental_ranking']) if 'incremental_ranking' in self.config_target and shift_existing else 0
+        added_cards_ids: Optional[list[CardId]] = None
+
+        if incremental_ranking > 0 and previous_ranking is not None and previous_ranking.get('settings_key') == ranking_settings_key:
+            if previous_ranking.get('num_incremental', 0) < incremental_ranking:
+                added_cards_ids = self.__get_added_cards_ids(reorder_scope_target_cards, previous_ranking['sorted_cards_ids'])
+            else:
+                event_logger.add_entry("Fully ranking target again after {:n} incremental reorders.".format(previous_ranking['num_incremental']))
+
+        # Get corpus data
+        with event_logger.add_benchmarked_entry("Creating corpus data from target cards."):
+            target_corpus_data = self.get_corpus_data(target_cards)
+
+        # Check tokenizers used
+        for lang_id in [LanguageData.get_lang_id_from_data_id(lang_data_id) for lang_data_id in self.config_target.get_language_data_ids()]:
+            tokenizer_used = get_user_provided_tokenizer(lang_id)
+            name_tokenizer_used = tokenizer_used.name()
+            if not name_tokenizer_used.startswith("Default"):
+                event_logger.add_entry("Used tokenizer '{}' for '{}'.".format(name_tokenizer_used, lang_id))
+            if not lang_id in tokenizer_used.supported_languages():
+                event_logger.add_entry("Language '{}' not supported by tokenizer '{}'.".format(lang_id, name_tokenizer_used))
+
         # Sort cards
-        with event_logger.add_benchmarked_entry("Ranking cards and creating a new sorted list."):
-
-            card_ranker = CardRanker(target_corpus_data, self.name, self.language_data, modified_dirty_notes)
-
-            # Use any custom ranking weights defined in target definition
-            for attribute in card_ranker.ranking_factors_span.keys():
-                if (target_setting_val := get_float(self.config_target.get('ranking_'+attribute))) is not None:
-                    card_ranker.ranking_factors_span[attribute] = target_setting_val
-
-            # Use custom ranking weight object
-            if 'ranking_factors' in self.config_target:
-                if isinstance(self.config_target['ranking_factors'], dict) and len(self.config_target['ranking_factors']) > 0:
-                    card_ranker.ranking_factors_span = {}
-                    for factor in CardRanker.get_default_ranking_factors_span().keys():
-                        if factor in self.config_target['ranking_factors']:
-                            card_ranker.ranking_factors_span[factor] = float(self.config_target['ranking_factors'][factor])
-
-            # use custom ideal_word_count
-            if 'ideal_word_count' in self.config_target:
-                if isinstance(self.config_target['ideal_word_count'], (list, tuple)) and len(self.config_target['ideal_word_count']) == 2:
-                    if all(isinstance(val, int) for val in self.config_target['ideal_word_count']):
-                        card_ranker.ideal_word_count_min = self.config_target['ideal_word_count'][0]
-                        card_ranker.ideal_word_count_max = self.config_target['ideal_word_count'][1]
-
-            # Calculate ranking and sort cards
-            card_rankings, set_fields_meta_data_for_notes = card_ranker.calc_cards_ranking(target_cards, reorder_scope_target_cards)
-            sorted_cards = sorted(reorder_scope_target_cards.new_cards, key=lambda card: card_rankings[card.id], reverse=True)
-            sorted_cards_ids = [card.id for card in sorted_cards]
+        card_ranker = self.__create_card_ranker(target_corpus_data, modified_dirty_notes)
+
+        if added_cards_ids is not None and previous_ranking is not None:
+            with event_logger.add_benchmarked_entry("Ranking {:n} cards added since the previous reorder.".format(len(added_cards_ids))):
+                (sorted_cards_ids, sorted_cards_rankings, set_fields_meta_data_for_notes) = self.__rank_added_cards(card_ranker, added_cards_ids, previous_ranking, target_cards, reorder_scope_target_cards)
+            ranking_factors_scaling = previous_ranking['ranking_factors_scaling']
+            num_incremental = previous_ranking.get('num_incremental', 0)+1
+        else:
+            with event_logger.add_benchmarked_entry("Ranking cards and creating a new sorted list."):
+                card_rankings, set_fields_meta_data_for_notes = card_ranker.calc_cards_ranking(target_cards, reorder_scope_target_cards)
+                sorted_cards_ids = card_ranker.get_sorted_cards_ids(reorder_scope_target_cards.new_cards_ids, card_rankings)
+            sorted_cards_rankings = [card_rankings[card_id] for card_id in sorted_cards_ids] if incremental_ranking > 0 else []
+            ranking_factors_scaling = card_ranker.ranking_factors_scaling or {}
+            num_incremental = 0
+
+        ranking_result: StoredRankingResult = {'key': ranking_key, 'sorted_cards_ids': sorted_cards_ids}
+        if incremental_ranking > 0:
+            ranking_result.update({
+                'settings_key': ranking_settings_key,
+                'card_rankings': sorted_cards_rankings,
+                'ranking_factors_scaling': ranking_factors_scaling,
+                'num_incremental': num_incremental
+            })
+        self.cacher.save_item(ranking_cache_id, ranking_result)
+        self.__saved_ranking = (ranking_cache_id, ranking_result, ranking_settings_key, target_cards)
+
+        if card_ranker.skipped_inputs:
+            event_logger.add_entry("Skipped ranking inputs not needed for the used ranking factors: {}.".format(", ".join(card_ranker.skipped_inputs)))
 
         # set meta data that will be saved in note fields
         if card_ranker.target_may_need_fields_meta_data(target_cards):
             with event_logger.add_benchmarked_entry("Processing meta data for note fields."):
                 set_fields_meta_data_for_notes()
 
+        # Insert added cards (meta data of notes of the other cards is kept as it is)
+        if added_cards_ids is not None:
+            for note_id in target_cards.get_notes_ids_with_fm_fields_from_all_cards():
+                if note_id not in modified_dirty_notes:
+                    modified_dirty_notes[note_id] = None
+            return self.__insert_cards(sorted_cards_ids, added_cards_ids, target_cards, event_logger)
+
         # Reposition cards
         repositioning_required = reorder_scope_target_cards.new_cards_ids != sorted_cards_ids
 
         if not repositioning_required:
             event_logger.add_entry("Repositioning {:n} cards not needed for this target.".format(len(sorted_cards_ids)))
-            return TargetReorderResult(success=True)
+            return TargetReorderResult(success=True).with_next_position(self.__get_next_position(sorted_cards_ids, repositioning_starting_from))
 
         return self.__reposition_cards(sorted_cards_ids, target_cards, shift_existing, repositioning_starting_from, event_logger)
 
+    def __get_stored_ranking_result(self, ranking_cache_id: str) -> Optional[StoredRankingResult]:
+        """
+        Ranking result stored by the previous reorder of the target, or None if there is none (or it is not usable).
+        """
+
+        ranking_result = self.cacher.get_item(ranking_cache_id, lambda: None)
+
+        if not isinstance(ranking_result, dict) or not isinstance(ranking_result.get('key'), str) or not isinstance(ranking_result.get('sorted_cards_ids'), list):
+            return None
+
+        return cast('StoredRankingResult', ranking_result)
+
+    def __create_card_ranker(self, target_corpus_data: TargetCorpusData, modified_dirty_notes: dict[NoteId, Optional[Note]]) -> CardRanker:
+
+        card_ranker = CardRanker(target_corpus_data, self.name, self.language_data, modified_dirty_notes)
+        card_ranker.ranking_factors_span = self.__get_ranking_factors_span()
+
+        # use custom ideal_word_count
+        if 'ideal_word_count' in self.config_target:
+            if isinstance(self.config_target['ideal_word_count'], (list, tuple)) and len(self.config_target['ideal_word_count']) == 2:
+                if all(isinstance(val, int) for val in self.config_target['ideal_word_count']):
+                    card_ranker.ideal_word_count_min = self.config_target['ideal_word_count'][0]
+                    card_ranker.ideal_word_count_max = self.config_target['ideal_word_count'][1]
+
+        return card_ranker
+
+    @staticmethod
+    def __get_added_cards_ids(reorder_scope_target_cards: TargetCards, previous_sorted_cards_ids: Sequence[CardId]) -> Optional[list[CardId]]:
+        """
+        New cards added since the previous reorder, or None if the previous ranking can not be used to insert them
+        (the previously ranked cards are no longer in the same order, or too many cards were added).
+        """
+
+        new_cards_ids = reorder_scope_target_cards.new_cards_ids
+        previous_cards_ids_set = set(previous_sorted_cards_ids)
+        added_cards_ids = [card_id for card_id in new_cards_ids if card_id not in previous_cards_ids_set]
+
+        if not 0 < len(added_cards_ids) <= len(new_cards_ids)*Target.incremental_ranking_max_added:
+            return None
+
+        new_cards_ids_set = set(new_cards_ids)
+        if [card_id for card_id in new_cards_ids if card_id in previous_cards_ids_set] != [card_id for card_id in previous_sorted_cards_ids if card_id in new_cards_ids_set]:
+            return None
+
+        return added_cards_ids
+
+    @staticmethod
+    def __rank_added_cards(card_ranker: CardRanker, added_cards_ids: list[CardId], previous_ranking: StoredRankingResult, target_cards: TargetCards,
+                           reorder_scope_target_cards: TargetCards) -> tuple[list[CardId], list[float], Callable[[], int]]:
+        """
+        Rank only the added cards and merge them into the sorted list (and rankings) of the previous reorder.
+        """
+
+        ranking_factors_scaling = {factor: (lowest_val, highest_val, weight) for factor, (lowest_val, highest_val, weight) in previous_ranking['ranking_factors_scaling'].items()}
+        added_cards_rankings, set_fields_meta_data_for_notes = card_ranker.calc_cards_ranking_incremental(target_cards, added_cards_ids, ranking_factors_scaling)
+        sorted_added_cards_ids = card_ranker.get_sorted_cards_ids(added_cards_ids, added_cards_rankings)
+
+        # previously ranked cards that are still new
+        new_cards_ids_set = set(reorder_scope_target_cards.new_cards_ids)
+        ranked_cards = [(card_id, ranking) for card_id, ranking in zip(previous_ranking['sorted_cards_ids'], previous_ranking['card_rankings']) if card_id in new_cards_ids_set]
+        ranked_cards_negated_rankings = [-ranking for (_, ranking) in ranked_cards]
+
+        # insert each added card after the previously ranked cards with the same or a higher ranking
+        cards_inserted_before: dict[int, list[CardId]] = defaultdict(list)
+        for card_id in sorted_added_cards_ids:
+            cards_inserted_before[bisect_right(ranked_cards_negated_rankings, -added_cards_rankings[card_id])].append(card_id)
+
+        sorted_cards_ids: list[CardId] = []
+        sorted_cards_rankings: list[float] = []
+        for index in range(len(ranked_cards)+1):
+            for card_id in cards_inserted_before.get(index, []):
+                sorted_cards_ids.append(card_id)
+                sorted_cards_rankings.append(added_cards_rankings[card_id])
+            if index < len(ranked_cards):
+                sorted_cards_ids.append(ranked_cards[index][0])
+                sorted_cards_rankings.append(ranked_cards[index][1])
+
+        return sorted_cards_ids, sorted_cards_rankings, set_fields_meta_data_for_notes
+
+    def __get_cards_position(self, cards_ids: Sequence[CardId]) -> dict[CardId, int]:
+        """
+        Current position (due) of the given new cards, which may have been changed by the repositioning of previous targets.
+        """
+
+        return dict(self.col.db.all("SELECT id, due FROM cards WHERE id IN (SELECT value FROM json_each(?))", json.dumps(cards_ids)))
+
+    def __get_next_position(self, cards_ids: Sequence[CardId], repositioning_starting_from: int) -> int:
+        """
+        Position (due) after the last of the given cards when they keep their current position, but not before the starting position.
+        """
+
+        return max(repositioning_starting_from, max(self.__get_cards_position(cards_ids).values(), default=-1)+1)
+
+    def __insert_cards(self, sorted_cards_ids: Sequence[CardId], inserted_cards_ids: Sequence[CardId], target_cards: TargetCards,
+                       event_logger: EventLogger) -> TargetReorderResult:
+        """
+        Reposition only the inserted cards, placing each consecutive group of them before the card that follows it in the sorted list
+        (existing cards are shifted, keeping the order of all other cards).
+        """
+
+        cards_due = self.__get_cards_position(sorted_cards_ids)
+        inserted_cards_ids_set = set(inserted_cards_ids)
+
+        # groups of consecutive inserted cards, with the due position to insert them at
+        inserted_groups: list[tuple[int, list[CardId]]] = []
+        group: list[CardId] = []
+        for card_id in sorted_cards_ids:
+            if card_id in inserted_cards_ids_set:
+                group.append(card_id)
+            elif group:
+                inserted_groups.append((cards_due[card_id], group))
+                group = []
+
+        # trailing group goes right after the last card that is not inserted (inserted cards may start out after cards of other targets)
+        last_existing_card_id = next(card_id for card_id in reversed(sorted_cards_ids) if card_id not in inserted_cards_ids_set)
+        position_after_existing = cards_due[last_existing_card_id]+1
+        if group:
+            inserted_groups.append((position_after_existing, group))
+
+        # every inserted card ends up before the position after the last card
+        next_position = position_after_existing+len(inserted_cards_ids)
+
+        with event_logger.add_benchmarked_entry("Inserting {:n} cards into the order of the previous reorder.".format(len(inserted_cards_ids))):
+
+            # insert last group first, as inserting shifts the position of the cards after it
+            for (inserting_starting_from, group) in reversed(inserted_groups):
+                repositioning_anki_op_changes = self.col.sched.reposition_new_cards(
+                    card_ids=group,
+                    starting_from=inserting_starting_from,
+                    step_size=1,
+                    randomize=False,
+                    shift_existing=True
+                )
+
+            return TargetReorderResult(success=True).with_repositioning_data(
+                sorted_cards_ids=sorted_cards_ids,
+                target_cards=target_cards,
+                num_cards_repositioned=len(inserted_cards_ids),
+                next_position=next_position,
+                repositioning_anki_op_changes=repositioning_anki_op_changes
+            )
+
+    def __get_cards_new_position(self, sorted_cards_ids: Sequence[CardId], shift_existing: bool, repositioning_starting_from: int) -> Optional[tuple[dict[CardId, int], int]]:
+        """
+        New position (due) of the cards that need to be moved to get the sorted order, and the position after the last card.
+
+        Cards keep their position if it leaves room for the cards before and after it, between the starting position and the first position
+        of other new cards (the longest non-decreasing subsequence of current position minus position in the sorted list). Returns None if the
+        sorted cards don't fit in that range, which requires the other cards to be shifted.
+        """
+
+        num_cards = len(sorted_cards_ids)
+        cards_due = self.__get_cards_position(sorted_cards_ids)
+
+        # range of the offset (position minus index in sorted list) of cards keeping their position
+        lowest_offset = repositioning_starting_from
+        highest_offset: Optional[int] = repositioning_starting_from  # without shifting, positions are the same as when repositioning all cards
+        if shift_existing:
+            other_cards_lowest_due = self.col.db.scalar(
+                "SELECT MIN(due) FROM cards WHERE type = 0 AND due >= ? AND id NOT IN (SELECT value FROM json_each(?))",
+                repositioning_starting_from, json.dumps(sorted_cards_ids)
+            )
+            highest_offset = other_cards_lowest_due-num_cards if other_cards_lowest_due is not None else None
+            if highest_offset is not None and highest_offset < lowest_offset:
+                return None
+
+        cards_offset = [cards_due[card_id]-index for index, card_id in enumerate(sorted_cards_ids)]
+        keepable_indices = [index for index, offset in enumerate(cards_offset) if lowest_offset <= offset and (highest_offset is None or offset <= highest_offset)]
+        kept_indices = {keepable_indices[index] for index in get_longest_non_decreasing_subsequence([cards_offset[index] for index in keepable_indices])}
+
+        # cards before the first kept card are placed right before it, other cards right after the previous kept card
+        offset = cards_offset[min(kept_indices)] if kept_indices else lowest_offset
+        cards_new_position: dict[CardId, int] = {}
+
+        for index, card_id in enumerate(sorted_cards_ids):
+            if index in kept_indices:
+                offset = cards_offset[index]
+            elif cards_due[card_id] != offset+index:
+                cards_new_position[card_id] = offset+index
+
+        return cards_new_position, offset+num_cards
+
     def __reposition_cards(self, sorted_cards_ids: Sequence[CardId], target_cards: TargetCards, shift_existing: bool,
                            repositioning_starting_from: int, event_logger: EventLogger) -> TargetReorderResult:
 
-        with event_logger.add_benchmarked_entry("Repositioning {:n} cards for this target.".format(len(sorted_cards_ids))):
+        cards_new_position = self.__get_cards_new_position(sorted_cards_ids, shift_existing, repositioning_starting_from)
 
-            repositioning_anki_op_changes = self.col.sched.reposition_new_cards(
-                card_ids=sorted_cards_ids,
-                starting_from=repositioning_starting_from,
-                step_size=1,
-                randomize=False,
-                shift_existing=shift_existing
-            )
+        # reposition all cards (shifting other cards) if the cards don't fit in place
+        if cards_new_position is None:
+            with event_logger.add_benchmarked_entry("Repositioning {:n} cards for this target.".format(len(sorted_cards_ids))):
+
+                repositioning_anki_op_changes = self.col.sched.reposition_new_cards(
+                    card_ids=sorted_cards_ids,
+                    starting_from=repositioning_starting_from,
+                    step_size=1,
+                    randomize=False,
+                    shift_existing=shift_existing
+                )
+
+                return TargetReorderResult(success=True).with_repositioning_data(
+                    sorted_cards_ids=sorted_cards_ids,
+                    target_cards=target_cards,
+                    num_cards_repositioned=len(sorted_cards_ids),
+                    next_position=repositioning_starting_from+len(sorted_cards_ids),
+                    repositioning_anki_op_changes=repositioning_anki_op_changes
+                )
+
+        # only reposition the cards that moved, per group of cards with consecutive positions
+        (moved_cards_position, next_position) = cards_new_position
+
+        if not moved_cards_position:
+            event_logger.add_entry("Repositioning {:n} cards not needed for this target.".format(len(sorted_cards_ids)))
+            return TargetReorderResult(success=True).with_next_position(next_position)
+
+        moved_groups: list[tuple[int, list[CardId]]] = []
+        for card_id, position in moved_cards_position.items():
+            if moved_groups and moved_groups[-1][0]+len(moved_groups[-1][1]) == position:
+                moved_groups[-1][1].append(card_id)
+            else:
+                moved_groups.append((position, [card_id]))
+
+        with event_logger.add_benchmarked_entry("Repositioning {:n} of {:n} cards for this target.".format(len(moved_cards_position), len(sorted_cards_ids))):
+
+            for (repositioning_group_starting_from, group) in moved_groups:
+                repositioning_anki_op_changes = self.col.sched.reposition_new_cards(
+                    card_ids=group,
+                    starting_from=repositioning_group_starting_from,
+                    step_size=1,
+                    randomize=False,
+                    shift_existing=False
+                )
 
             return TargetReorderResult(success=True).with_repositioning_data(
                 sorted_cards_ids=sorted_cards_ids,
                 target_cards=target_cards,
-                num_cards_repositioned=len(sorted_cards_ids),
+                num_cards_repositioned=len(moved_cards_position),
+                next_position=next_position,
                 repositioning_anki_op_changes=repositioning_anki_op_changes
             )
@@ -5,16 +5,20 @@ See <https://www.gnu.org/licenses/gpl-3.0.html> for details.
 
 from __future__ import annotations
 
+from array import array
 from datetime import datetime
-from functools import cache
-from typing import Callable, ClassVar, Optional, TYPE_CHECKING
+from functools import cache, cached_property
+import json
+import sys
+from typing import Callable, ClassVar, Optional, TYPE_CHECKING, Union, cast
 
 from anki.utils import int_time
 
+from .lib.lru_cache import LruCache
 from .lib.utilities import dataclass_with_slots
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Iterable, Sequence
     from anki.notes import Note, NoteId
     from anki.models import NotetypeId, NotetypeDict
     from anki.cards import CardId
@@ -66,22 +70,142 @@ class TargetCard:
         return _from_card
 
 
+@dataclass_with_slots(frozen=True)
+class TargetNote:
+    id: NoteId
+    mid: NotetypeId
+    fields: list[str]  # field values (in order of the fields of the note type)
+    tags: list[str]
+    mod: int
+
+
+def get_note_size(note: Union[Note, TargetNote]) -> int:
+    """
+    Approximate memory size of a note in bytes (its field values and tags, plus a fixed overhead).
+    """
+
+    return 1_000 + sum(sys.getsizeof(field) for field in note.fields) + sum(sys.getsizeof(tag) for tag in note.tags)
+
+
+class CardTable:
+    """
+    Attributes of cards as columns (parallel typed arrays), with the new and reviewed cards as indices (instead of copies).
+    """
+
+    NO_DAYS_OVERDUE: ClassVar[int] = -1
+
+    ids: array[int]
+    nids: array[int]
+    types: array[int]
+    queues: array[int]
+    ivls: array[int]
+    reps: array[int]
+    ease_factors: array[int]
+    dues: array[int]
+    is_leech: array[int]
+    is_suspended: array[int]
+    days_overdue: array[int]  # NO_DAYS_OVERDUE if not (over)due
+
+    new_indices: array[int]
+    reviewed_indices: array[int]
+
+    def __init__(self) -> None:
+
+        self.ids = array('q')
+        self.nids = array('q')
+        self.types = array('b')
+        self.queues = array('b')
+        self.ivls = array('q')
+        self.reps = array('q')
+        self.ease_factors = array('q')
+        self.dues = array('q')
+        self.is_leech = array('B')
+        self.is_suspended = array('B')
+        self.days_overdue = array('q')
+        self.new_indices = array('I')
+        self.reviewed_indices = array('I')
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, card_row: tuple[int, int, int, int, int, int, int, int], is_leech: bool, days_overdue: Optional[int]) -> None:
+        """
+        Add a card from a row with its id, nid, type, queue, ivl, reps, factor and due (as selected from the cards table).
+        """
+
+        card_id, note_id, card_type, card_queue, ivl, reps, ease_factor, due = card_row
+        is_new = card_queue == 0
+        is_reviewed = card_queue != 0 and card_type == 2
+        assert not (is_new and is_reviewed)
+
+        if is_new:
+            self.new_indices.append(len(self.ids))
+        if is_reviewed:
+            self.reviewed_indices.append(len(self.ids))
+
+        self.ids.append(card_id)
+        self.nids.append(note_id)
+        self.types.append(card_type)
+        self.queues.append(card_queue)
+        self.ivls.append(ivl)
+        self.reps.append(reps)
+        self.ease_factors.append(ease_factor)
+        self.dues.append(due)
+        self.is_leech.append(is_leech)
+        self.is_suspended.append(card_queue == -1)
+        self.days_overdue.append(self.NO_DAYS_OVERDUE if days_overdue is None else days_overdue)
+
+    @staticmethod
+    def from_cards(cards: Iterable[TargetCard]) -> CardTable:
+
+        card_table = CardTable()
+        for card in cards:
+            card_table.append((card.id, card.nid, card.type, card.queue, card.ivl, card.reps, card.ease_factor, card.due), card.is_leech, card.days_overdue)
+        return card_table
+
+    def get_card_id(self, index: int) -> CardId:
+        return cast('CardId', self.ids[index])
+
+    def get_note_id(self, index: int) -> NoteId:
+        return cast('NoteId', self.nids[index])
+
+    def get_card(self, index: int) -> TargetCard:
+
+        days_overdue = self.days_overdue[index]
+
+        return TargetCard(
+            self.get_card_id(index),
+            self.get_note_id(index),
+            self.types[index],
+            self.queues[index],
+            self.ivls[index],
+            self.reps[index],
+            self.ease_factors[index],
+            self.dues[index],
+            bool(self.is_leech[index]),
+            bool(self.is_suspended[index]),
+            None if days_overdue == self.NO_DAYS_OVERDUE else days_overdue
+        )
+
+    def get_cards(self, indices: Iterable[int]) -> list[TargetCard]:
+
+        return [self.get_card(index) for index in indices]
+
+
 class TargetCards:
 
     col: Collection
 
     all_cards_ids: Sequence[CardId]
-    all_cards: Sequence[TargetCard]
-    new_cards: Sequence[TargetCard]
+    card_table: CardTable
     new_cards_ids: Sequence[CardId]
-    reviewed_cards: Sequence[TargetCard]
 
     notes_ids_all_cards: Sequence[NoteId]
     notes_ids_new_cards_set: set[NoteId]
     notes_ids_new_cards: Sequence[NoteId]
 
-    notes_from_cards_cached: ClassVar[dict[NoteId, Note]] = {}
-    leech_card_ids_cached: ClassVar[set[CardId]] = set()
+    notes_from_cards_cached: ClassVar[LruCache[NoteId, Note]] = LruCache(max_size=256*1024*1024, get_size=get_note_size)
+    notes_data_cached: ClassVar[LruCache[NoteId, TargetNote]] = LruCache(max_size=256*1024*1024, get_size=get_note_size)
     cache_lock: Optional[Collection] = None
 
     def __init__(self, all_cards_ids: Sequence[CardId], col: Collection) -> None:
@@ -91,119 +215,192 @@ class TargetCards:
 
         if not TargetCards.cache_lock or TargetCards.cache_lock != col:
             TargetCards.cache_lock = col
-            TargetCards.notes_from_cards_cached.clear()
-            TargetCards.leech_card_ids_cached.clear()
+            TargetCards.clear_notes_cache()
 
         self.__get_cards_from_db()
 
-    def __get_leech_cards_ids(self) -> set[CardId]:
+    @staticmethod
+    def clear_notes_cache() -> None:
+
+        TargetCards.notes_from_cards_cached.clear()
+        TargetCards.notes_data_cached.clear()
+
+    @staticmethod
+    def set_notes_cache_limits(max_items: Optional[int], max_size: Optional[int]) -> None:
+        """
+        Limit the number of notes and/or the (approximate) size in bytes of both the Note objects cache and the notes data cache.
+        """
+
+        TargetCards.notes_from_cards_cached.set_limits(max_items, max_size)
+        TargetCards.notes_data_cached.set_limits(max_items, max_size)
+
+    @staticmethod
+    def keep_modified_note(note: Note) -> None:
+        """
+        Keep a modified note in the cache (it will not be evicted), so the modified version is used by all targets.
+        """
+
+        TargetCards.notes_from_cards_cached.put(note.id, note, pinned=True)
+
+    @staticmethod
+    def __get_cards_query() -> str:
+        """
+        Query for the cards of the (json encoded) card ids, with the leech status of the card taken from the tags of its note.
+
+        Like Anki's 'tag:leech' search, this matches the tag 'leech' (case insensitive) and its child tags ('leech::*').
+        """
 
-        if len(self.leech_card_ids_cached) == 0:
-            self.leech_card_ids_cached.update(self.col.find_cards('tag:leech'))
+        tags = "(' ' || n.tags || ' ')"
+        is_leech = "({} LIKE '% leech %' OR {} LIKE '% leech::%')".format(tags, tags)
 
-        return self.leech_card_ids_cached
+        return (
+            "SELECT c.id, c.nid, c.type, c.queue, c.ivl, c.reps, c.factor, c.due, {} "
+            "FROM cards c LEFT JOIN notes n ON n.id = c.nid "
+            "WHERE c.id IN (SELECT value FROM json_each(?)) ORDER BY c.due ASC, c.id ASC"
+        ).format(is_leech)
 
     def __get_cards_from_db(self) -> None:
 
         if not self.col.db:
             raise Exception("No database connection found when trying to get cards from database!")
 
-        card_ids_str = ",".join(map(str, self.all_cards_ids))
-        cards = self.col.db.execute("SELECT id, nid, type, queue, ivl, reps, factor, due FROM cards WHERE id IN ({}) ORDER BY due ASC".format(card_ids_str))
+        # bind all card ids as a single (json) parameter, instead of formatting them into a huge 'IN (...)' list that needs to be parsed
+        cards_ids_json = json.dumps(list(self.all_cards_ids))
+        cards = self.col.db.execute(self.__get_cards_query(), cards_ids_json)
 
-        all_cards: list[TargetCard] = []
-        new_cards: list[TargetCard] = []
-        new_cards_ids: list[CardId] = []
-        reviewed_cards: list[TargetCard] = []
-        notes_ids_all_cards: set[NoteId] = set()
-        notes_ids_new_cards: set[NoteId] = set()
-        leech_cards_ids = self.__get_leech_cards_ids()
+        card_table = CardTable()
         get_days_overdue = TargetCard.get_days_overdue(self.col)
 
         for card_row in cards:
 
-            card_id, note_id, card_type, card_queue, card_ivl, card_reps, card_factor, card_due = card_row
-            is_leech = card_id in leech_cards_ids
-            is_suspended = card_queue == -1
-            is_new = card_queue == 0
+            card_type, card_queue, card_due, is_leech = card_row[2], card_row[3], card_row[7], card_row[8]
             is_reviewed = card_queue != 0 and card_type == 2
-            assert not (is_new and is_reviewed)
 
             if is_reviewed:
                 days_overdue = get_days_overdue(card_queue, card_type, card_due)
             else:
                 days_overdue = None
 
-            card = TargetCard(card_id, note_id, card_type, card_queue, card_ivl, card_reps, card_factor, card_due, is_leech, is_suspended, days_overdue)
+            card_table.append(card_row[:8], bool(is_leech), days_overdue)
 
-            if is_new:
-                new_cards.append(card)
-                new_cards_ids.append(card.id)
-                notes_ids_new_cards.add(card.nid)
-            if is_reviewed:
-                reviewed_cards.append(card)
-            all_cards.append(card)
-            notes_ids_all_cards.add(card.nid)
-
-        self.all_cards = all_cards
-        self.new_cards = new_cards
-        self.new_cards_ids = new_cards_ids
-        self.reviewed_cards = reviewed_cards
-        self.notes_ids_all_cards = sorted(notes_ids_all_cards)
-        self.notes_ids_new_cards_set = notes_ids_new_cards
+        self.card_table = card_table
+        self.new_cards_ids = [card_table.get_card_id(index) for index in card_table.new_indices]
+        self.notes_ids_all_cards = cast('list[NoteId]', sorted(set(card_table.nids)))
+        self.notes_ids_new_cards_set = {card_table.get_note_id(index) for index in card_table.new_indices}
         self.notes_ids_new_cards = sorted(self.notes_ids_new_cards_set)
 
-        if len(self.all_cards_ids) != len(self.all_cards):
-            raise Exception("Could not get cards from database!")
+        if len(self.all_cards_ids) != len(card_table):
+            raise LookupError("Could not get cards from database!")
+
+    @cached_property
+    def all_cards(self) -> Sequence[TargetCard]:
+
+        return self.card_table.get_cards(range(len(self.card_table)))
+
+    @cached_property
+    def new_cards(self) -> Sequence[TargetCard]:
+
+        all_cards = self.all_cards
+        return [all_cards[index] for index in self.card_table.new_indices]
+
+    @cached_property
+    def reviewed_cards(self) -> Sequence[TargetCard]:
+
+        all_cards = self.all_cards
+        return [all_cards[index] for index in self.card_table.reviewed_indices]
 
     def get_note(self, note_id: NoteId) -> Note:
 
-        if note_id not in self.notes_from_cards_cached:
-            self.notes_from_cards_cached[note_id] = self.col.get_note(note_id)
+        note = self.notes_from_cards_cached.get(note_id)
 
-        return self.notes_from_cards_cached[note_id]
+        if note is None:
+            note = self.col.get_note(note_id)
+            self.notes_from_cards_cached.put(note_id, note)
 
-    @cache
-    def get_notes_from_all_cards(self) -> dict[NoteId, Note]:
+        return note
+
+    def get_notes_data(self, notes_ids: Iterable[NoteId]) -> dict[NoteId, TargetNote]:
+        """
+        Fields and attributes of notes, queried directly from the database (in one query), without creating Note objects.
+        """
+
+        notes_ids = list(notes_ids)
+        notes_data: dict[NoteId, TargetNote] = {}
+        notes_ids_not_cached: list[NoteId] = []
+
+        for note_id in notes_ids:
+            # cached (possibly modified) note objects take precedence over the database
+            if note_id in self.notes_from_cards_cached:
+                note = self.get_note(note_id)
+                notes_data[note_id] = TargetNote(note.id, note.mid, list(note.fields), list(note.tags), note.mod)
+            elif (note_data := self.notes_data_cached.get(note_id)) is not None:
+                notes_data[note_id] = note_data
+            else:
+                notes_ids_not_cached.append(note_id)
 
-        notes_from_all_cards: dict[NoteId, Note] = {}
+        notes_query = "SELECT id, mid, flds, tags, mod FROM notes WHERE id IN (SELECT value FROM json_each(?))"
+        for note_id, note_type_id, note_fields, note_tags, note_mod in self.col.db.execute(notes_query, json.dumps(notes_ids_not_cached)):
+            note_data = TargetNote(note_id, note_type_id, note_fields.split("\x1f"), note_tags.split(), note_mod)
+            self.notes_data_cached.put(note_id, note_data)
+            notes_data[note_id] = note_data
 
-        for card in self.all_cards:
-            if card.nid not in notes_from_all_cards:
-                notes_from_all_cards[card.nid] = self.get_note(card.nid)
+        if len(notes_data) != len(set(notes_ids)):
+            raise LookupError("Could not get notes from database!")
 
-        notes_from_all_cards = {k: v for k, v in sorted(notes_from_all_cards.items(), key=lambda item: item[0])}
+        return {note_id: notes_data[note_id] for note_id in notes_ids}
 
-        assert self.notes_ids_all_cards == list(notes_from_all_cards.keys())
+    def get_notes_data_from_all_cards(self) -> dict[NoteId, TargetNote]:
 
-        return notes_from_all_cards
+        return self.get_notes_data(self.notes_ids_all_cards)
 
     @cache
-    def get_notes_from_new_cards(self) -> dict[NoteId, Note]:
+    def get_notes_types_ids_from_all_cards(self) -> dict[NoteId, NotetypeId]:
+
+        notes_types_ids: dict[NoteId, NotetypeId] = {}
 
-        notes_from_new_cards: dict[NoteId, Note] = {}
-        for card in self.new_cards:
-            if card.nid not in notes_from_new_cards:
-                notes_from_new_cards[card.nid] = self.get_note(card.nid)
+        for note_id, note_type_id in self.col.db.execute("SELECT id, mid FROM notes WHERE id IN (SELECT value FROM json_each(?))", json.dumps(self.notes_ids_all_cards)):
+            notes_types_ids[note_id] = note_type_id
 
-        notes_from_new_cards = {k: v for k, v in sorted(notes_from_new_cards.items(), key=lambda item: item[0])}
+        return {note_id: notes_types_ids[note_id] for note_id in self.notes_ids_all_cards}
 
-        assert self.notes_ids_new_cards == list(notes_from_new_cards.keys())
+    @cache
+    def get_notes_from_all_cards(self) -> dict[NoteId, Note]:
 
-        return notes_from_new_cards
+        return {note_id: self.get_note(note_id) for note_id in self.notes_ids_all_cards}
+
+    @cache
+    def get_notes_from_new_cards(self) -> dict[NoteId, Note]:
+
+        return {note_id: self.get_note(note_id) for note_id in self.notes_ids_new_cards}
 
     @cache
     def get_models_from_all_cards(self) -> dict[NotetypeId, NotetypeDict]:
 
         models: dict[NotetypeId, NotetypeDict] = {}
-        for note in self.get_notes_from_all_cards().values():
-            if note.mid not in models:
-                note_model = self.get_model(note.mid)
+        for note_type_id in self.get_notes_types_ids_from_all_cards().values():
+            if note_type_id not in models:
+                note_model = self.get_model(note_type_id)
                 if note_model:
-                    models[note.mid] = note_model
+                    models[note_type_id] = note_model
 
         return models
 
+    def get_notes_ids_with_fm_fields_from_all_cards(self) -> list[NoteId]:
+        """
+        Ids of notes of which the note type has 'fm_' fields to write meta data to.
+        """
+
+        models_with_fm_fields = {model_id for model_id, note_model in self.get_models_from_all_cards().items() if any(field['name'].startswith('fm_') for field in note_model['flds'])}
+
+        return [note_id for note_id, note_type_id in self.get_notes_types_ids_from_all_cards().items() if note_type_id in models_with_fm_fields]
+
+    def get_notes_with_fm_fields_from_all_cards(self) -> dict[NoteId, Note]:
+        """
+        Note objects (only created for notes of which the note type has 'fm_' fields to write meta data to).
+        """
+
+        return {note_id: self.get_note(note_id) for note_id in self.get_notes_ids_with_fm_fields_from_all_cards()}
+
     @cache
     def has_notes_with_fm_fields(self) -> bool:
 
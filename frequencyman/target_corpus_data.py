@@ -5,29 +5,37 @@ See <https://www.gnu.org/licenses/gpl-3.0.html> for details.
 
 from __future__ import annotations
 
+from array import array
 from collections import defaultdict
 from dataclasses import dataclass, field
+from enum import Enum
 from functools import cached_property
 from math import fsum
 from statistics import fmean, median
-from typing import NewType, Optional, Union, TYPE_CHECKING
-from enum import Enum
+from time import time
+from typing import TYPE_CHECKING, ClassVar, NewType, Optional, TypeVar, Union
 
+try:
+    import numpy as np
+except ImportError:  # numpy is optional (not bundled with Anki)
+    np = None  # type: ignore[assignment]
 
-from .language_data import LangId, LangDataId, LanguageData
-from .lib.utilities import (
-    dataclass_with_slots, normalize_dict_floats_values, normalize_dict_positional_floats_values,
-    remove_bottom_percent_dict, sort_dict_floats_values
-)
+from .language_data import LangDataId, LangId, LanguageData
+from .lib.utilities import dataclass_with_slots, normalize_dict_floats_values, normalize_dict_positional_floats_values, remove_bottom_percent_dict, sort_dict_floats_values
 from .text_processing import TextProcessing, WordToken
+from .vocabulary import Vocabulary
 
 if TYPE_CHECKING:
+    from collections.abc import Mapping, Sequence
+
     from anki.cards import CardId
-    from .lib.persistent_cacher import PersistentCacher
+    from anki.models import NotetypeDict, NotetypeId
     from anki.notes import NoteId
-    from collections.abc import Sequence
-    from .target_cards import TargetCard, TargetCards
-    from anki.models import NotetypeDict
+
+    from .corpus_snapshots import CorpusSnapshot
+    from .lib.persistent_cacher import PersistentCacher
+    from .target_cards import CardTable, TargetCard, TargetCards
+    from .text_processing import TokenizationPipeline
 
 
 class CorpusSegmentationStrategy(Enum):
@@ -38,6 +46,8 @@ class CorpusSegmentationStrategy(Enum):
 
 CorpusSegmentId = NewType('CorpusSegmentId', str)
 
+V = TypeVar('V')
+
 
 @dataclass_with_slots(frozen=True)
 class NoteFieldContentData:
@@ -46,7 +56,224 @@ class NoteFieldContentData:
     field_value: str
     target_language_data_id: LangDataId
     target_language_id: LangId
-    field_value_tokenized: Sequence[WordToken]
+    field_value_token_ids: Sequence[int]
+    vocabulary: Vocabulary
+
+    @property
+    def field_value_tokenized(self) -> list[WordToken]:
+        return self.vocabulary.get_tokens(self.field_value_token_ids)
+
+
+@dataclass_with_slots()
+class SegmentIndex:
+    """
+    Word occurrences of a corpus segment, keyed by token id.
+    """
+    token_counts: dict[int, int]  # number of occurrences in all notes (ordered by note id of first occurrence)
+    all_words_presence: Mapping[int, Sequence[float]]
+    cards_postings: Mapping[int, Sequence[int]]  # sorted and deduplicated indices of TargetCards.all_cards
+    notes_postings: Mapping[int, Sequence[int]]  # sorted and deduplicated indices of TargetCards.notes_ids_all_cards
+    reviewed_cards_indices: Mapping[int, Sequence[int]]  # index of reviewed card for every word occurrence
+    reviewed_token_ids: Sequence[int]  # flat arrays with an entry for every word occurrence in reviewed cards
+    reviewed_presence_scores: Sequence[float]
+    reviewed_cards_familiarity_factors: Sequence[float]
+
+
+class SegmentIndexBuilder:
+    """
+    Builds the SegmentIndex of a corpus segment in a single pass over the targeted fields of the target cards.
+    """
+
+    vocabulary: Vocabulary
+    cards_familiarity_factor: dict[CardId, float]
+    num_fields_visited: int
+
+    def __init__(self, vocabulary: Vocabulary, cards_familiarity_factor: dict[CardId, float]) -> None:
+
+        self.vocabulary = vocabulary
+        self.cards_familiarity_factor = cards_familiarity_factor
+        self.num_fields_visited = 0
+
+    def build(self, target_cards: TargetCards, targeted_fields_per_note: dict[NoteId, list[NoteFieldContentData]]) -> SegmentIndex:
+
+        token_lengths = self.vocabulary.token_lengths
+        calc_presence_scores = TextProcessing.calc_presence_scores
+        card_table = target_cards.card_table
+        is_reviewed_card = bytearray(len(card_table))
+        for card_index in card_table.reviewed_indices:
+            is_reviewed_card[card_index] = 1
+        notes_indices = {note_id: note_index for note_index, note_id in enumerate(target_cards.notes_ids_all_cards)}
+
+        token_counts: defaultdict[int, int] = defaultdict(int)
+        tokens_first_occurrence: dict[int, tuple[NoteId, int]] = {}
+        all_words_presence: defaultdict[int, list[float]] = defaultdict(list)
+        cards_postings: dict[int, array[int]] = {}
+        notes_postings: dict[int, array[int]] = {}
+        reviewed_cards_indices: defaultdict[int, array[int]] = defaultdict(lambda: array('I'))
+        reviewed_token_ids: array[int] = array('I')
+        reviewed_presence_scores: array[float] = array('d')
+        reviewed_cards_familiarity_factors: array[float] = array('d')
+
+        notes_presence_scores: dict[NoteId, list[tuple[int, float]]] = {}
+        num_occurrences = 0
+
+        for card_index, (card_id, card_nid) in enumerate(zip(card_table.ids, card_table.nids)):
+
+            note_presence_scores = notes_presence_scores.get(card_nid)
+
+            # first card of note, count words of note and calculate their presence scores (same for all cards of note)
+            if note_presence_scores is None:
+                note_presence_scores = []
+                note_index = notes_indices[card_nid]
+                for field_data in targeted_fields_per_note.get(card_nid, ()):
+                    self.num_fields_visited += 1
+                    token_ids = field_data.field_value_token_ids
+                    for token_id in token_ids:
+                        token_counts[token_id] += 1
+                        token_notes = notes_postings.get(token_id)
+                        if token_notes is None:
+                            notes_postings[token_id] = array('I', (note_index,))
+                        elif token_notes[-1] != note_index:
+                            token_notes.append(note_index)
+                        num_occurrences += 1
+                        first_occurrence = tokens_first_occurrence.get(token_id)
+                        if first_occurrence is None or card_nid < first_occurrence[0]:
+                            tokens_first_occurrence[token_id] = (card_nid, num_occurrences)
+                    note_presence_scores.extend(calc_presence_scores(token_ids, [token_lengths[token_id] for token_id in token_ids]))
+                notes_presence_scores[card_nid] = note_presence_scores
+
+            if is_reviewed_card[card_index]:
+                card_familiarity_factor = self.cards_familiarity_factor[card_id]
+                for token_id, word_presence_score in note_presence_scores:
+                    all_words_presence[token_id].append(word_presence_score)
+                    reviewed_cards_indices[token_id].append(card_index)
+                    reviewed_token_ids.append(token_id)
+                    reviewed_presence_scores.append(word_presence_score)
+                    reviewed_cards_familiarity_factors.append(card_familiarity_factor)
+            else:
+                for token_id, word_presence_score in note_presence_scores:
+                    all_words_presence[token_id].append(word_presence_score)
+
+            for token_id, _ in note_presence_scores:
+                token_cards = cards_postings.get(token_id)
+                if token_cards is None:
+                    cards_postings[token_id] = array('I', (card_index,))
+                elif token_cards[-1] != card_index:
+                    token_cards.append(card_index)
+
+        return SegmentIndex(
+            token_counts={token_id: token_counts[token_id] for token_id in sorted(tokens_first_occurrence, key=tokens_first_occurrence.__getitem__)},
+            all_words_presence=all_words_presence,
+            cards_postings=cards_postings,
+            notes_postings={token_id: array('I', sorted(token_notes)) for token_id, token_notes in notes_postings.items()},
+            reviewed_cards_indices=reviewed_cards_indices,
+            reviewed_token_ids=reviewed_token_ids,
+            reviewed_presence_scores=reviewed_presence_scores,
+            reviewed_cards_familiarity_factors=reviewed_cards_familiarity_factors
+        )
+
+
+class WordPostings:
+    """
+    Inverted index with the (sorted and deduplicated) indices of the cards and notes containing a word.
+    """
+
+    vocabulary: Vocabulary
+    cards: Sequence[TargetCard]
+    notes_ids: Sequence[NoteId]
+    __cards_postings: Mapping[int, Sequence[int]]
+    __notes_postings: Mapping[int, Sequence[int]]
+
+    def __init__(self, index: SegmentIndex, vocabulary: Vocabulary, target_cards: TargetCards) -> None:
+
+        self.vocabulary = vocabulary
+        self.cards = target_cards.all_cards
+        self.notes_ids = target_cards.notes_ids_all_cards
+        self.__cards_postings = index.cards_postings
+        self.__notes_postings = index.notes_postings
+
+    def __contains__(self, word: WordToken) -> bool:
+
+        token_id = self.vocabulary.find_id(word)
+        return token_id is not None and token_id in self.__cards_postings
+
+    def __len__(self) -> int:
+        return len(self.__cards_postings)
+
+    def words(self) -> list[WordToken]:
+
+        return self.vocabulary.get_tokens(self.__cards_postings.keys())
+
+    def get_cards_indices(self, word: WordToken) -> Sequence[int]:
+
+        token_id = self.vocabulary.find_id(word)
+        if token_id is None or token_id not in self.__cards_postings:
+            return array('I')
+        return self.__cards_postings[token_id]
+
+    def get_notes_indices(self, word: WordToken) -> Sequence[int]:
+
+        token_id = self.vocabulary.find_id(word)
+        if token_id is None or token_id not in self.__notes_postings:
+            return array('I')
+        return self.__notes_postings[token_id]
+
+    def num_cards(self, word: WordToken) -> int:
+
+        return len(self.get_cards_indices(word))
+
+    def num_notes(self, word: WordToken) -> int:
+
+        return len(self.get_notes_indices(word))
+
+    def get_cards(self, word: WordToken) -> list[TargetCard]:
+
+        cards = self.cards
+        return [cards[card_index] for card_index in self.get_cards_indices(word)]
+
+    def get_notes_ids(self, word: WordToken) -> list[NoteId]:
+
+        notes_ids = self.notes_ids
+        return [notes_ids[note_index] for note_index in self.get_notes_indices(word)]
+
+    def get_cards_with_all_words(self, words: Sequence[WordToken]) -> list[TargetCard]:
+
+        cards = self.cards
+        return [cards[card_index] for card_index in self.intersect_postings([self.get_cards_indices(word) for word in words])]
+
+    def get_notes_ids_with_all_words(self, words: Sequence[WordToken]) -> list[NoteId]:
+
+        notes_ids = self.notes_ids
+        return [notes_ids[note_index] for note_index in self.intersect_postings([self.get_notes_indices(word) for word in words])]
+
+    @staticmethod
+    def intersect_postings(postings: Sequence[Sequence[int]]) -> array[int]:
+        """
+        Intersection of sorted posting lists (starting with the shortest).
+        """
+
+        if not postings:
+            return array('I')
+
+        postings = sorted(postings, key=len)
+        result = postings[0]
+
+        for other in postings[1:]:
+            if not result:
+                break
+            intersection: array[int] = array('I')
+            other_index = 0
+            other_len = len(other)
+            for value in result:
+                while other_index < other_len and other[other_index] < value:
+                    other_index += 1
+                if other_index == other_len:
+                    break
+                if other[other_index] == value:
+                    intersection.append(value)
+            result = intersection
+
+        return array('I', result)
 
 
 @dataclass
@@ -58,6 +285,10 @@ class MaturityRequirements:
 
 @dataclass
 class SegmentContentMetrics:
+    """
+    Metrics of the content of a corpus segment. The index is built on token ids, while the word metrics (familiarity, frequency,
+    underexposure, etc.) are keyed by word token, as read by the card ranker, the reorder logger and the words overview.
+    """
 
     lang_id: LangId
     lang_data_id: LangDataId
@@ -66,9 +297,12 @@ class SegmentContentMetrics:
     target_cards: TargetCards
     language_data: LanguageData
     cards_familiarity_factor: dict[CardId, float]
+    vocabulary: Vocabulary
 
     targeted_fields_per_note: dict[NoteId, list[NoteFieldContentData]] = field(default_factory=lambda: defaultdict(list))
 
+    use_numpy: ClassVar[bool] = np is not None
+
     @cached_property
     def mature_words(self) -> set[WordToken]:
 
@@ -143,6 +377,16 @@ class SegmentContentMetrics:
 
     @cached_property
     def words_familiarity(self) -> dict[WordToken, float]:
+
+        if self.use_numpy and np is not None:
+            words_familiarity = self.__get_words_familiarity_numpy()
+        else:
+            words_familiarity = self.__get_words_familiarity_python()
+
+        return sort_dict_floats_values(words_familiarity)
+
+    def __get_words_familiarity_python(self) -> dict[WordToken, float]:
+
         words_familiarity: dict[WordToken, float] = {}
 
         for word_token, word_presence_scores in self.reviewed_words_presence.items():
@@ -154,22 +398,52 @@ class SegmentContentMetrics:
             )
             words_familiarity[word_token] = word_familiarity
 
-        return sort_dict_floats_values(words_familiarity)
+        return words_familiarity
+
+    def __get_words_familiarity_numpy(self) -> dict[WordToken, float]:
+
+        token_ids = self.index.reviewed_token_ids
+
+        if not token_ids:
+            return {}
+
+        weights = np.asarray(self.index.reviewed_presence_scores, dtype=np.float64) * np.asarray(self.index.reviewed_cards_familiarity_factors, dtype=np.float64)
+        familiarity_per_token_id = np.bincount(np.asarray(token_ids, dtype=np.uintc), weights=weights).tolist()
+
+        tokens = self.vocabulary.tokens
+        return {tokens[token_id]: familiarity_per_token_id[token_id] for token_id in dict.fromkeys(token_ids)}
+
+    @cached_property
+    def __words_familiarity_values(self) -> Sequence[float]:
+
+        if self.use_numpy and np is not None:
+            return np.fromiter(self.words_familiarity.values(), dtype=np.float64, count=len(self.words_familiarity))
+        return list(self.words_familiarity.values())
 
     @cached_property
     def words_familiarity_mean(self) -> float:
 
-        return fmean(self.words_familiarity.values()) if self.words_familiarity else 0
+        if not self.words_familiarity:
+            return 0
+        if self.use_numpy and np is not None:
+            return float(np.mean(self.__words_familiarity_values))
+        return fmean(self.__words_familiarity_values)
 
     @cached_property
     def words_familiarity_median(self) -> float:
 
-        return median(self.words_familiarity.values()) if self.words_familiarity else 0
+        if not self.words_familiarity:
+            return 0
+        if self.use_numpy and np is not None:
+            return float(np.median(self.__words_familiarity_values))
+        return median(self.__words_familiarity_values)
 
     @cached_property
     def words_familiarity_max(self) -> float:
 
-        return max(self.words_familiarity.values()) if self.words_familiarity else 0
+        if not self.words_familiarity:
+            return 0
+        return float(max(self.__words_familiarity_values))
 
     @cached_property
     def words_familiarity_positional(self) -> dict[WordToken, float]:
@@ -177,73 +451,55 @@ class SegmentContentMetrics:
         return normalize_dict_positional_floats_values(self.words_familiarity)
 
     @cached_property
-    def __reviewed_words_aggregates(self) -> tuple[dict[WordToken, list[float]], dict[WordToken, list[TargetCard]], dict[WordToken, list[float]]]:
+    def index(self) -> SegmentIndex:
 
-        reviewed_words_presence: defaultdict[WordToken, list[float]] = defaultdict(list)
-        reviewed_words: defaultdict[WordToken, list[TargetCard]] = defaultdict(list)
-        reviewed_words_cards_familiarity_factor: defaultdict[WordToken, list[float]] = defaultdict(list)
-        calc_word_presence_scores = TextProcessing.calc_word_presence_scores
+        return SegmentIndexBuilder(self.vocabulary, self.cards_familiarity_factor).build(self.target_cards, self.targeted_fields_per_note)
 
-        for card in self.target_cards.reviewed_cards:
-            cards_familiarity_factor = self.cards_familiarity_factor[card.id]
-            for field_data in self.targeted_fields_per_note[card.nid]:
-                for word_token, word_presence_score in calc_word_presence_scores(field_data.field_value_tokenized):
-                    reviewed_words_presence[word_token].append(word_presence_score)
-                    reviewed_words[word_token].append(card)
-                    reviewed_words_cards_familiarity_factor[word_token].append(cards_familiarity_factor)
+    def __get_words_dict(self, values_per_token_id: Mapping[int, V]) -> dict[WordToken, V]:
 
-        return reviewed_words_presence, reviewed_words, reviewed_words_cards_familiarity_factor
+        tokens = self.vocabulary.tokens
+        return {tokens[token_id]: values for token_id, values in values_per_token_id.items()}
+
+    def __group_by_reviewed_word(self, values: Sequence[float]) -> dict[WordToken, list[float]]:
+
+        values_per_token_id: defaultdict[int, list[float]] = defaultdict(list)
+
+        for token_id, value in zip(self.index.reviewed_token_ids, values):
+            values_per_token_id[token_id].append(value)
+
+        return self.__get_words_dict(values_per_token_id)
 
     @cached_property
     def reviewed_words_presence(self) -> dict[WordToken, list[float]]:
 
-        return self.__reviewed_words_aggregates[0]
+        return self.__group_by_reviewed_word(self.index.reviewed_presence_scores)
 
     @cached_property
     def reviewed_words_cards_familiarity_factor(self) -> dict[WordToken, list[float]]:
 
-        return self.__reviewed_words_aggregates[2]
+        return self.__group_by_reviewed_word(self.index.reviewed_cards_familiarity_factors)
 
     @cached_property
     def reviewed_words(self) -> dict[WordToken, list[TargetCard]]:
 
-        return self.__reviewed_words_aggregates[1]
+        cards = self.target_cards.all_cards
+        tokens = self.vocabulary.tokens
+        return {tokens[token_id]: [cards[card_index] for card_index in cards_indices] for token_id, cards_indices in self.index.reviewed_cards_indices.items()}
 
     @cached_property
-    def all_words_presence(self) -> dict[WordToken, list[float]]:
-
-        words_presence: dict[WordToken, list[float]] = defaultdict(list)
-        calc_word_presence_scores = TextProcessing.calc_word_presence_scores
+    def all_words_presence(self) -> dict[WordToken, Sequence[float]]:
 
-        for card in self.target_cards.all_cards:
-            for field_data in self.targeted_fields_per_note[card.nid]:
-
-                for word_token, word_presence_score in calc_word_presence_scores(field_data.field_value_tokenized):
-                    words_presence[word_token].append(word_presence_score)
-
-        return words_presence
+        return self.__get_words_dict(self.index.all_words_presence)
 
     @cached_property
-    def cards_per_word(self) -> dict[WordToken, list[TargetCard]]:
-
-        cards_per_word: dict[WordToken, list[TargetCard]] = defaultdict(list)
+    def word_postings(self) -> WordPostings:
 
-        for card in self.target_cards.all_cards:
-            for field_data in self.targeted_fields_per_note[card.nid]:
-                for word_token in field_data.field_value_tokenized:
-                    cards_per_word[word_token].append(card)
-
-        return cards_per_word
+        return WordPostings(self.index, self.vocabulary, self.target_cards)
 
     @cached_property
     def all_words(self) -> set[WordToken]:
 
-        return {
-            word_token
-            for field_data_list in self.targeted_fields_per_note.values()
-            for field_data in field_data_list
-            for word_token in field_data.field_value_tokenized
-        }
+        return set(self.vocabulary.get_tokens(self.index.token_counts.keys()))
 
     @cached_property
     def new_words(self) -> set[WordToken]:
@@ -269,12 +525,7 @@ class SegmentContentMetrics:
     @cached_property
     def internal_word_frequency(self) -> dict[WordToken, float]:
 
-        word_counts: dict[WordToken, int] = defaultdict(int)
-
-        for field_data_list in self.targeted_fields_per_note.values():
-            for field_data in field_data_list:
-                for word_token in field_data.field_value_tokenized:
-                    word_counts[word_token] += 1
+        word_counts = self.__get_words_dict(self.index.token_counts)
 
         word_presence: dict[WordToken, float] = {word: max(word_presence_scores) for word, word_presence_scores in self.all_words_presence.items()}
         max_presence = max(word_presence.values())
@@ -302,11 +553,15 @@ class TargetCorpusData:
 
     targeted_fields_per_note: dict[NoteId, list[NoteFieldContentData]]
     content_metrics: dict[CorpusSegmentId, SegmentContentMetrics]
+    vocabularies: dict[LangId, Vocabulary]
     maturity_requirements: MaturityRequirements
     familiarity_sweetspot_point: Union[float, str]
     suspended_card_value: float
     suspended_leech_card_value: float
     segmentation_strategy: CorpusSegmentationStrategy
+    created_at: int  # time at which the content of notes was read (in seconds, as the modification time of notes and cards)
+
+    use_numpy: ClassVar[bool] = np is not None
 
     target_cards: TargetCards
     target_fields_per_note_type: dict[str, dict[str, LangDataId]]
@@ -317,11 +572,13 @@ class TargetCorpusData:
 
         self.targeted_fields_per_note = {}
         self.content_metrics = {}
+        self.vocabularies = {}
         self.maturity_requirements = MaturityRequirements()
         self.familiarity_sweetspot_point = "~0.5"
         self.suspended_card_value = 0.25
         self.suspended_leech_card_value = 0.0
         self.segmentation_strategy = CorpusSegmentationStrategy.BY_LANG_DATA_ID
+        self.created_at = 0
 
         self.target_cards = target_cards
         self.language_data = language_data
@@ -337,28 +594,202 @@ class TargetCorpusData:
             return
 
         if len(self.content_metrics) > 0:
-            raise Exception("Data already created by TargetCorpusData.")
+            raise RuntimeError("Data already created by TargetCorpusData.")
 
+        self.created_at = int(time())
         self.__set_targeted_fields_data()
 
-    def __get_field_value_tokenized(self, field_value: str, lang_id: LangId) -> Sequence[WordToken]:
+    def update_data(self, previous_corpus_data: TargetCorpusData) -> None:
+        """
+        Create corpus data by reusing the content data (tokenized fields) of notes from previous corpus data (created with the same target configuration).
 
-        if field_value == "":
-            field_value_tokenized: Sequence[WordToken] = []
-        else:
-            cache_key = lang_id+"|"+field_value
-            field_value_tokenized = self.cacher.get_item(cache_key, lambda: TextProcessing.get_word_tokens_from_text(TextProcessing.get_plain_text(field_value), lang_id))
+        Only notes that have been modified since (or are new in the target) are read and tokenized again. This only saves reading and
+        tokenizing notes, no deltas are applied: all aggregates (familiarity, postings, etc.) are created again from the content data.
+        """
 
-        return field_value_tokenized
+        if len(self.target_cards) == 0:
+            return
+
+        if len(self.content_metrics) > 0:
+            raise RuntimeError("Data already created by TargetCorpusData.")
+
+        modified_notes_ids = previous_corpus_data.get_modified_notes_ids()
+        for note_id in modified_notes_ids:
+            self.target_cards.notes_data_cached.discard(note_id)
+        previous_notes_ids = set(previous_corpus_data.target_cards.notes_ids_all_cards)
+        reusable_notes_ids = {note_id for note_id in self.target_cards.notes_ids_all_cards if note_id in previous_notes_ids and note_id not in modified_notes_ids}
+
+        self.created_at = int(time())
+        self.vocabularies = previous_corpus_data.vocabularies  # token ids of vocabularies never change
+        self.__set_targeted_fields_data(previous_corpus_data.targeted_fields_per_note, reusable_notes_ids)
+
+    def get_modified_notes_ids(self) -> set[NoteId]:
+
+        return set(self.target_cards.col.db.list("SELECT id FROM notes WHERE mod >= ?", self.created_at))
+
+    def has_modified_cards(self) -> bool:
+
+        return self.target_cards.col.db.scalar("SELECT 1 FROM cards WHERE mod >= ? LIMIT 1", self.created_at) is not None
+
+    def get_snapshot(self) -> CorpusSnapshot:
+        """
+        Computed data of the corpus, to recreate it later (for the same target cards) using create_data_from_snapshot.
+        """
 
-    def __set_targeted_fields_data(self) -> None:
+        from .corpus_snapshots import CorpusSnapshot, SegmentSnapshot
+
+        segments: dict[CorpusSegmentId, SegmentSnapshot] = {}
+
+        for corpus_segment_id, metrics in self.content_metrics.items():
+            get_id = metrics.vocabulary.get_id  # words are all in the vocabulary already
+            segments[corpus_segment_id] = SegmentSnapshot(
+                lang_id=metrics.lang_id,
+                lang_data_id=metrics.lang_data_id,
+                index=metrics.index,
+                words_familiarity={get_id(word): value for word, value in metrics.words_familiarity.items()},
+                word_frequency={get_id(word): value for word, value in metrics.word_frequency.items()}
+            )
+
+        return CorpusSnapshot(
+            vocabularies={lang_id: vocabulary.tokens for lang_id, vocabulary in self.vocabularies.items()},
+            targeted_fields=[
+                (note_id, [
+                    (field_data.corpus_segment_id, field_data.field_name, field_data.field_value, field_data.target_language_data_id, field_data.target_language_id, field_data.field_value_token_ids)
+                    for field_data in note_fields
+                ])
+                for note_id, note_fields in self.targeted_fields_per_note.items()
+            ],
+            segments=segments
+        )
+
+    def create_data_from_snapshot(self, snapshot: CorpusSnapshot) -> None:
+        """
+        Create corpus data from a snapshot (created by get_snapshot for the same target cards and configuration).
+        """
+
+        if len(self.content_metrics) > 0:
+            raise RuntimeError("Data already created by TargetCorpusData.")
+
+        self.created_at = int(time())
+        cards_familiarity_factor = self.__get_cards_familiarity_factor(self.target_cards.card_table, self.suspended_card_value, self.suspended_leech_card_value, self.use_numpy)
+
+        for lang_id, tokens in snapshot.vocabularies.items():
+            vocabulary = Vocabulary(lang_id)
+            vocabulary.get_ids(tokens)
+            self.vocabularies[lang_id] = vocabulary
+
+        for corpus_segment_id, segment in snapshot.segments.items():
+            segment_content_metrics = SegmentContentMetrics(
+                segment.lang_id,
+                segment.lang_data_id,
+                self.maturity_requirements,
+                self.familiarity_sweetspot_point,
+                self.target_cards,
+                self.language_data,
+                cards_familiarity_factor,
+                self.vocabularies[segment.lang_id]
+            )
+            tokens = segment_content_metrics.vocabulary.tokens
+            segment_content_metrics.index = segment.index
+            segment_content_metrics.words_familiarity = {tokens[token_id]: value for token_id, value in segment.words_familiarity.items()}
+            segment_content_metrics.word_frequency = {tokens[token_id]: value for token_id, value in segment.word_frequency.items()}
+            self.content_metrics[corpus_segment_id] = segment_content_metrics
+
+        for note_id, note_fields in snapshot.targeted_fields:
+
+            card_note_fields_in_target: list[NoteFieldContentData] = []
+
+            for corpus_segment_id, field_name, field_val, lang_data_id, lang_id, field_value_token_ids in note_fields:
+
+                content_data = NoteFieldContentData(
+                    corpus_segment_id=corpus_segment_id,
+                    field_name=field_name,
+                    field_value=field_val,
+                    target_language_data_id=lang_data_id,
+                    target_language_id=lang_id,
+                    field_value_token_ids=field_value_token_ids,
+                    vocabulary=self.vocabularies[lang_id]
+                )
+
+                card_note_fields_in_target.append(content_data)
+                self.content_metrics[corpus_segment_id].targeted_fields_per_note[note_id].append(content_data)
+
+            self.targeted_fields_per_note[note_id] = card_note_fields_in_target
+
+    def __get_fields_values_tokenized(self, fields_values_per_lang: dict[LangId, set[str]]) -> dict[LangId, dict[str, Sequence[WordToken]]]:
+
+        fields_values_tokenized: dict[LangId, dict[str, Sequence[WordToken]]] = {}
+
+        for lang_id, field_values in fields_values_per_lang.items():
+
+            pipeline = TextProcessing.get_tokenization_pipeline(lang_id)
+            cache_keys = {lang_id+"|"+field_value: field_value for field_value in field_values if field_value != ""}
+
+            def tokenize_field_values(field_values: list[str], pipeline: TokenizationPipeline = pipeline) -> list[list[WordToken]]:
+                return pipeline.tokenize_many([TextProcessing.get_plain_text(field_value) for field_value in field_values])
+
+            tokenized_per_cache_key = self.cacher.get_items(cache_keys, tokenize_field_values)
+
+            lang_fields_values_tokenized: dict[str, Sequence[WordToken]] = {"": []}
+            for cache_key, field_value in cache_keys.items():
+                lang_fields_values_tokenized[field_value] = tokenized_per_cache_key[cache_key]
+            fields_values_tokenized[lang_id] = lang_fields_values_tokenized
+
+        return fields_values_tokenized
+
+    def __set_targeted_fields_data(self, reusable_targeted_fields_per_note: Optional[dict[NoteId, list[NoteFieldContentData]]] = None, reusable_notes_ids: Optional[set[NoteId]] = None) -> None:
 
         self.cacher.pre_load_all_items()
 
-        cards_familiarity_factor = self.__get_cards_familiarity_factor(self.target_cards.reviewed_cards, self.suspended_card_value, self.suspended_leech_card_value)
+        cards_familiarity_factor = self.__get_cards_familiarity_factor(self.target_cards.card_table, self.suspended_card_value, self.suspended_leech_card_value, self.use_numpy)
+
+        def set_segment_content_metrics(corpus_segment_id: CorpusSegmentId, lang_id: LangId, lang_data_id: LangDataId) -> None:
+
+            if lang_id not in self.vocabularies:
+                self.vocabularies[lang_id] = Vocabulary(lang_id)
+
+            if corpus_segment_id not in self.content_metrics:
+                segment_content_metrics = SegmentContentMetrics(
+                    lang_id,
+                    lang_data_id,
+                    self.maturity_requirements,
+                    self.familiarity_sweetspot_point,
+                    self.target_cards,
+                    self.language_data,
+                    cards_familiarity_factor,
+                    self.vocabularies[lang_id]
+                )
+                self.content_metrics[corpus_segment_id] = segment_content_metrics
+            elif self.content_metrics[corpus_segment_id].lang_id != lang_id:
+                raise Exception("Language id mismatch for segment '{}' and lang_id '{}'!".format(corpus_segment_id, lang_id))
+            elif self.content_metrics[corpus_segment_id].lang_data_id != lang_data_id:
+                raise Exception("Language data id mismatch for segment '{}' and lang_data_id '{}'!".format(corpus_segment_id, lang_data_id))
+
+        # collect targeted fields of all notes (reusing content data of unmodified notes if given)
+
+        targeted_fields: list[tuple[NoteId, list[tuple[CorpusSegmentId, str, str, LangDataId, LangId]]]] = []
+        reused_targeted_fields: dict[NoteId, list[NoteFieldContentData]] = {}
+        fields_values_per_lang: dict[LangId, set[str]] = defaultdict(set)
+
+        if reusable_notes_ids is None:
+            notes_data = self.target_cards.get_notes_data_from_all_cards()
+        else:
+            notes_data = self.target_cards.get_notes_data(note_id for note_id in self.target_cards.notes_ids_all_cards if note_id not in reusable_notes_ids)
+
+        targeted_fields_indices_per_note_type: dict[NotetypeId, list[tuple[int, str]]] = {}
 
-        for note in self.target_cards.get_notes_from_all_cards().values():
+        for note_id in self.target_cards.notes_ids_all_cards:
 
+            if reusable_targeted_fields_per_note is not None and reusable_notes_ids is not None and note_id in reusable_notes_ids:
+                if note_id not in reusable_targeted_fields_per_note:  # note type is not defined as target
+                    continue
+                for field_data in reusable_targeted_fields_per_note[note_id]:
+                    set_segment_content_metrics(field_data.corpus_segment_id, field_data.target_language_id, field_data.target_language_data_id)
+                reused_targeted_fields[note_id] = reusable_targeted_fields_per_note[note_id]
+                targeted_fields.append((note_id, []))
+                continue
+
+            note = notes_data[note_id]
             note_type = self.target_cards.get_model(note.mid)
 
             if (note_type is None):
@@ -368,45 +799,66 @@ class TargetCorpusData:
 
             target_note_fields = self.target_fields_per_note_type[note_type['name']]
 
+            # indices of targeted fields (in order of the fields of the note type)
+            if (targeted_fields_indices := targeted_fields_indices_per_note_type.get(note.mid)) is None:
+                targeted_fields_indices = [(field_index, field['name']) for field_index, field in enumerate(note_type['flds']) if field['name'] in target_note_fields]
+                targeted_fields_indices_per_note_type[note.mid] = targeted_fields_indices
+
+            note_fields_in_target: list[tuple[CorpusSegmentId, str, str, LangDataId, LangId]] = []
+
+            for field_index, field_name in targeted_fields_indices:
+
+                field_val = note.fields[field_index]
+                lang_data_id = target_note_fields[field_name]
+                lang_id = LanguageData.get_lang_id_from_data_id(lang_data_id)
+                corpus_segment_id = self.get_segment_id(lang_id, lang_data_id, field_name, note_type=note_type)
+
+                set_segment_content_metrics(corpus_segment_id, lang_id, lang_data_id)
+                note_fields_in_target.append((corpus_segment_id, field_name, field_val, lang_data_id, lang_id))
+                fields_values_per_lang[lang_id].add(field_val)
+
+            targeted_fields.append((note.id, note_fields_in_target))
+
+        # tokenize all field values (per language, in one batch)
+
+        fields_values_tokenized = self.__get_fields_values_tokenized(fields_values_per_lang)
+
+        # set content data (with tokens interned to ids, once per field value)
+
+        fields_values_token_ids: dict[LangId, dict[str, array[int]]] = defaultdict(dict)
+
+        for note_id, note_fields_in_target in targeted_fields:
+
+            if note_id in reused_targeted_fields:
+                for content_data in reused_targeted_fields[note_id]:
+                    self.content_metrics[content_data.corpus_segment_id].targeted_fields_per_note[note_id].append(content_data)
+                self.targeted_fields_per_note[note_id] = reused_targeted_fields[note_id]
+                continue
+
             card_note_fields_in_target: list[NoteFieldContentData] = []
 
-            for field_name, field_val in note.items():
-                if field_name in target_note_fields.keys():
-
-                    lang_data_id = target_note_fields[field_name]
-                    lang_id = LanguageData.get_lang_id_from_data_id(lang_data_id)
-                    corpus_segment_id = self.get_segment_id(lang_id, lang_data_id, field_name, note_type=note_type)
-
-                    content_data = NoteFieldContentData(
-                        corpus_segment_id=corpus_segment_id,
-                        field_name=field_name,
-                        field_value=field_val,
-                        field_value_tokenized=self.__get_field_value_tokenized(field_val, lang_id),
-                        target_language_data_id=lang_data_id,
-                        target_language_id=lang_id,
-                    )
-
-                    card_note_fields_in_target.append(content_data)
-
-                    if corpus_segment_id not in self.content_metrics:
-                        segment_content_metrics = SegmentContentMetrics(
-                            lang_id,
-                            lang_data_id,
-                            self.maturity_requirements,
-                            self.familiarity_sweetspot_point,
-                            self.target_cards,
-                            self.language_data,
-                            cards_familiarity_factor
-                        )
-                        self.content_metrics[corpus_segment_id] = segment_content_metrics
-                    elif self.content_metrics[corpus_segment_id].lang_id != lang_id:
-                        raise Exception("Language id mismatch for segment '{}' and lang_id '{}'!".format(corpus_segment_id, lang_id))
-                    elif self.content_metrics[corpus_segment_id].lang_data_id != lang_data_id:
-                        raise Exception("Language data id mismatch for segment '{}' and lang_data_id '{}'!".format(corpus_segment_id, lang_data_id))
-
-                    self.content_metrics[corpus_segment_id].targeted_fields_per_note[note.id].append(content_data)
-
-            self.targeted_fields_per_note[note.id] = card_note_fields_in_target
+            for corpus_segment_id, field_name, field_val, lang_data_id, lang_id in note_fields_in_target:
+
+                vocabulary = self.vocabularies[lang_id]
+                field_value_token_ids = fields_values_token_ids[lang_id].get(field_val)
+                if field_value_token_ids is None:
+                    field_value_token_ids = vocabulary.get_ids(fields_values_tokenized[lang_id][field_val])
+                    fields_values_token_ids[lang_id][field_val] = field_value_token_ids
+
+                content_data = NoteFieldContentData(
+                    corpus_segment_id=corpus_segment_id,
+                    field_name=field_name,
+                    field_value=field_val,
+                    target_language_data_id=lang_data_id,
+                    target_language_id=lang_id,
+                    field_value_token_ids=field_value_token_ids,
+                    vocabulary=vocabulary
+                )
+
+                card_note_fields_in_target.append(content_data)
+                self.content_metrics[corpus_segment_id].targeted_fields_per_note[note_id].append(content_data)
+
+            self.targeted_fields_per_note[note_id] = card_note_fields_in_target
 
 
     def get_segment_id(self, lang_id: LangId, lang_data_id: LangDataId, field_name: str, note_type: Optional[NotetypeDict] = None, note_name: Optional[str] = None) -> CorpusSegmentId:
@@ -449,9 +901,9 @@ class TargetCorpusData:
 
 
     @staticmethod
-    def __get_cards_familiarity_score(cards: Sequence[TargetCard]) -> dict[CardId, float]:
+    def __get_cards_familiarity_score(card_table: CardTable, cards_indices: Sequence[int]) -> dict[CardId, float]:
 
-        if not cards:
+        if not cards_indices:
             return {}
 
         # get scores
@@ -471,13 +923,20 @@ class TargetCorpusData:
 
             return normalized
 
-        for card in cards:
-            if card.reps < 1 or card.ivl < 1:
+        cards_ivl = card_table.ivls
+        cards_reps = card_table.reps
+        cards_ease_factor = card_table.ease_factors
+        cards_days_overdue = card_table.days_overdue
+
+        for card_index in cards_indices:
+            card_reps = cards_reps[card_index]
+            card_ivl = cards_ivl[card_index]
+            if card_reps < 1 or card_ivl < 1:
                 card_score = 0.0
             else:
-                card_interval_score = normalize_against_baseline(card.ivl, 300)
-                card_ease_score = normalize_against_baseline(card.ease_factor, 2500)
-                card_reps_score = normalize_against_baseline(card.reps, 12)
+                card_interval_score = normalize_against_baseline(card_ivl, 300)
+                card_ease_score = normalize_against_baseline(cards_ease_factor[card_index], 2500)
+                card_reps_score = normalize_against_baseline(card_reps, 12)
                 if card_reps_score > 1:
                     card_reps_score = (0.75+card_reps_score)/1.75
                 if card_ease_score > 1:
@@ -488,34 +947,120 @@ class TargetCorpusData:
                     interval_offset = 1
                 card_score = ((card_interval_score*interval_offset) + (card_ease_score/4) + (card_reps_score/100)) / 1.26
 
-                if card.days_overdue is not None and card.days_overdue > 0:
-                    relative_overdue = card.days_overdue/card.ivl
+                card_days_overdue = cards_days_overdue[card_index]
+                if card_days_overdue != card_table.NO_DAYS_OVERDUE and card_days_overdue > 0:
+                    relative_overdue = card_days_overdue/card_ivl
                     dev = (1+relative_overdue)**3
                     card_score = card_score/dev
             assert card_score <= 2.5
-            cards_familiarity[card.id] = card_score
+            cards_familiarity[card_table.get_card_id(card_index)] = card_score
 
         # done
         return cards_familiarity
 
     @staticmethod
-    def __get_cards_familiarity_factor(cards: Sequence[TargetCard], suspended_card_value: float, suspended_leech_card_value: float) -> dict[CardId, float]:
+    def __get_cards_familiarity_score_numpy(card_table: CardTable, cards_indices: np.ndarray) -> np.ndarray:
+        """
+        Same as __get_cards_familiarity_score, but calculated for all cards at once (in the order of the given indices).
+        """
+
+        cards_ivl = np.frombuffer(card_table.ivls, dtype=np.int64)[cards_indices]
+        cards_reps = np.frombuffer(card_table.reps, dtype=np.int64)[cards_indices]
+        cards_ease_factor = np.frombuffer(card_table.ease_factors, dtype=np.int64)[cards_indices]
+        cards_days_overdue = np.frombuffer(card_table.days_overdue, dtype=np.int64)[cards_indices]
+
+        cards_familiarity = np.zeros(len(cards_indices), dtype=np.float64)
+        scored = (cards_reps >= 1) & (cards_ivl >= 1)
+
+        if not scored.any():
+            return cards_familiarity
+
+        def normalize_against_baseline(values: np.ndarray, baseline: int) -> np.ndarray:
+
+            normalized = values / baseline
+            normalized = np.where(normalized > 1, 1+(normalized/10), normalized)
+
+            # Soft cap (as normalized grows beyond 1.5, we heavily dampen additional growth):
+            capped = normalized > 1.5
+            excess = normalized[capped] - 1.5
+            normalized[capped] = 1.5 + (excess / (1 + excess))
+
+            return normalized
+
+        ivl = cards_ivl[scored]
+        days_overdue = cards_days_overdue[scored]
+
+        interval_score = normalize_against_baseline(ivl, 300)
+        ease_score = normalize_against_baseline(cards_ease_factor[scored], 2500)
+        reps_score = normalize_against_baseline(cards_reps[scored], 12)
+        reps_score = np.where(reps_score > 1, (0.75+reps_score)/1.75, reps_score)
+        interval_offset = np.where(ease_score > 1, (ease_score+0.7)/1.7, np.where(ease_score < 1, (ease_score+0.75)/1.75, 1.0))
+        scores = ((interval_score*interval_offset) + (ease_score/4) + (reps_score/100)) / 1.26
+
+        overdue = days_overdue > 0
+        relative_overdue = days_overdue[overdue]/ivl[overdue]
+        scores[overdue] = scores[overdue]/((1+relative_overdue)**3)
+
+        assert scores.max() <= 2.5
+        cards_familiarity[scored] = scores
+        return cards_familiarity
+
+    @staticmethod
+    def __get_cards_familiarity_factor_numpy(card_table: CardTable, suspended_card_value: float, suspended_leech_card_value: float) -> dict[CardId, float]:
+
+        reviewed_indices = np.frombuffer(card_table.reviewed_indices, dtype=np.uintc)
+        cards_familiarity_value = TargetCorpusData.__get_cards_familiarity_score_numpy(card_table, reviewed_indices)
+
+        is_suspended = np.frombuffer(card_table.is_suspended, dtype=np.uint8)[reviewed_indices].astype(bool)
+        is_leech = np.frombuffer(card_table.is_leech, dtype=np.uint8)[reviewed_indices].astype(bool)
+        cards_familiarity_value[is_suspended & is_leech] *= suspended_leech_card_value
+        cards_familiarity_value[is_suspended & ~is_leech] *= suspended_card_value
+
+        # devalue cards from same note (devalue exponentially more as more cards from same note are found)
+
+        order = np.argsort(-cards_familiarity_value, kind='stable')
+        cards_familiarity_value = cards_familiarity_value[order]
+        reviewed_indices = reviewed_indices[order]
+
+        # rank of every card within its note (0 for the card of the note with the highest value)
+        notes_ids = np.frombuffer(card_table.nids, dtype=np.int64)[reviewed_indices]
+        by_note = np.argsort(notes_ids, kind='stable')
+        notes_ids_by_note = notes_ids[by_note]
+        is_note_start = np.empty(len(by_note), dtype=bool)
+        is_note_start[:1] = True
+        is_note_start[1:] = notes_ids_by_note[1:] != notes_ids_by_note[:-1]
+        positions = np.arange(len(by_note))
+        note_rank = np.empty(len(by_note), dtype=np.int64)
+        note_rank[by_note] = positions - np.maximum.accumulate(np.where(is_note_start, positions, 0))
+
+        cards_familiarity_value = np.where(note_rank > 0, cards_familiarity_value / np.exp2(note_rank), cards_familiarity_value)
+
+        cards_ids = np.frombuffer(card_table.ids, dtype=np.int64)[reviewed_indices]
+        return dict(zip(cards_ids.tolist(), cards_familiarity_value.tolist()))
+
+    @staticmethod
+    def __get_cards_familiarity_factor(card_table: CardTable, suspended_card_value: float, suspended_leech_card_value: float, use_numpy: bool = False) -> dict[CardId, float]:
+
+        if use_numpy and np is not None:
+            return TargetCorpusData.__get_cards_familiarity_factor_numpy(card_table, suspended_card_value, suspended_leech_card_value)
 
-        cards_familiarity_value = TargetCorpusData.__get_cards_familiarity_score(cards)
+        reviewed_indices = card_table.reviewed_indices
+        cards_familiarity_value = TargetCorpusData.__get_cards_familiarity_score(card_table, reviewed_indices)
 
-        for card in cards:
-            if card.is_suspended:
-                if card.is_leech:
-                    cards_familiarity_value[card.id] = cards_familiarity_value[card.id]*suspended_leech_card_value
+        for card_index in reviewed_indices:
+            if card_table.is_suspended[card_index]:
+                card_id = card_table.get_card_id(card_index)
+                if card_table.is_leech[card_index]:
+                    cards_familiarity_value[card_id] = cards_familiarity_value[card_id]*suspended_leech_card_value
                 else:
-                    cards_familiarity_value[card.id] = cards_familiarity_value[card.id]*suspended_card_value
+                    cards_familiarity_value[card_id] = cards_familiarity_value[card_id]*suspended_card_value
 
         # devalue cards from same note (devalue exponentially more as more cards from same note are found)
 
         cards_familiarity_value = sort_dict_floats_values(cards_familiarity_value)
 
         note_count: dict[NoteId, int] = {}
-        cards_note_ids: dict[CardId, NoteId] = {card.id: card.nid for card in cards}
+        cards_note_ids: dict[CardId, NoteId] = {card_table.get_card_id(card_index): card_table.get_note_id(card_index) for card_index in reviewed_indices}
 
         for card_id in cards_familiarity_value.keys():
 
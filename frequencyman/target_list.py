@@ -26,6 +26,7 @@ if TYPE_CHECKING:
     from anki.notes import Note, NoteId
     from .language_data import LanguageData
     from .lib.persistent_cacher import PersistentCacher
+    from .corpus_snapshots import CorpusSnapshotStore
 
 
 @dataclass(frozen=True)
@@ -57,6 +58,7 @@ class TargetList:
     target_list: list[Target]
     language_data: LanguageData
     col: Collection
+    corpus_snapshots: Optional[CorpusSnapshotStore]
     __cancel_reorder_flag: bool
 
     def __init__(self, language_data: LanguageData, cacher: PersistentCacher, col: Collection) -> None:
@@ -64,6 +66,7 @@ class TargetList:
         self.language_data = language_data
         self.col = col
         self.cacher = cacher
+        self.corpus_snapshots = None
         self.__cancel_reorder_flag = False
 
     def __iter__(self) -> Iterator[Target]:
@@ -85,6 +88,10 @@ class TargetList:
     def set_valid_targets(self, valid_target_list: list[ValidConfiguredTarget]) -> None:
 
         self.target_list = [Target(target, target_num, self.col, self.language_data, self.cacher) for target_num, target in enumerate(valid_target_list)]
+        for target in self.target_list:
+            target.corpus_snapshots = self.corpus_snapshots
+        if self.corpus_snapshots is not None:
+            self.corpus_snapshots.remove_snapshots_of_other_targets([self.corpus_snapshots.get_target_key(target.index_num) for target in self.target_list])
         self.__set_new_targets_data_cache()
 
     def set_targets_from_json(self, target_list_data: JSON_TYPE) -> None:
@@ -185,6 +192,20 @@ class TargetList:
 
         return TargetList.__query_executes_validly(query, col)
 
+    @staticmethod
+    def __validate_ranking_options(target_data: JsonConfiguredTarget, result: ValidConfiguredTarget, index: int) -> Optional[str]:
+        """
+        Validate the options of how the cards of the target are ranked (and add them to the result). Returns an error message if not valid.
+        """
+
+        if 'incremental_ranking' in target_data:
+            if isinstance(target_data['incremental_ranking'], int) and target_data['incremental_ranking'] > 0:
+                result['incremental_ranking'] = int(target_data['incremental_ranking'])
+            else:
+                return "Number of incremental reorders (incremental_ranking) defined in target #{} is not a positive number (integer).".format(index)
+
+        return None
+
     @staticmethod
     def __validate_target_data(defined_target_data: JSON_TYPE, index: int, col: Collection, language_data: LanguageData, reorder_keys: bool = False) -> tuple[bool, str, Optional[ValidConfiguredTarget]]:
 
@@ -325,6 +346,9 @@ class TargetList:
             else:
                 return (False, "Minimum number of notes for mature words defined in target #{} is not a number.".format(index), None)
 
+        if (ranking_options_error := TargetList.__validate_ranking_options(target_data, result, index)) is not None:
+            return (False, ranking_options_error, None)
+
         if 'suspended_card_value' in target_data:
             if isinstance(target_data['suspended_card_value'], float) or isinstance(target_data['suspended_card_value'], int):
                 result['suspended_card_value'] = float(target_data['suspended_card_value'])
@@ -455,6 +479,7 @@ class TargetList:
         modified_dirty_notes: dict[NoteId, Optional[Note]] = {}
         num_cards_repositioned = 0
         num_targets_repositioned = 0
+        repositioning_starting_from = 0
         if reorder_status_callback is None:
             reorder_status_callback = lambda target_index, num_targets: None
 
@@ -466,22 +491,26 @@ class TargetList:
 
             with event_logger.add_benchmarked_entry("Reordering target #{}.".format(target.index_num)):
                 reorder_status_callback(target.index_num, len(self.target_list))
-                reorder_result = target.reorder_cards(shift_existing, num_cards_repositioned, event_logger, modified_dirty_notes)
+                reorder_result = target.reorder_cards(shift_existing, repositioning_starting_from, event_logger, modified_dirty_notes)
                 reorder_result_list.append(reorder_result)
+                if reorder_result.success:  # next target starts after the new cards of this target, also if none were repositioned
+                    repositioning_starting_from = reorder_result.next_position
                 if reorder_result.cards_repositioned:
                     num_cards_repositioned += reorder_result.num_cards_repositioned
                     num_targets_repositioned += 1
 
         reorder_status_callback(-1, len(self.target_list))
 
-        self.cacher.db.close()
-
         if num_cards_repositioned == 0 and not self.__cancel_reorder_flag:
             event_logger.add_entry("Order of cards from targets was already up-to-date!")
 
         # Clear cache
-        TargetCards.notes_from_cards_cached.clear()
-        TargetCards.leech_card_ids_cached.clear()
+        notes_cache = TargetCards.notes_from_cards_cached
+        notes_data_cache = TargetCards.notes_data_cached
+        event_logger.add_entry("Notes cache: {:n} hits, {:n} misses and {:n} evictions (notes data cache: {:n} hits, {:n} misses and {:n} evictions).".format(
+            notes_cache.hits, notes_cache.misses, notes_cache.evictions, notes_data_cache.hits, notes_data_cache.misses, notes_data_cache.evictions
+        ))
+        TargetCards.clear_notes_cache()
         self.__set_new_targets_data_cache()
 
         # Update notes that have been modifies (field values for example)
@@ -494,6 +523,12 @@ class TargetList:
                     op_changes = col.update_notes(notes, skip_undo_entry=True)
                     update_notes_anki_op_changes.append(op_changes)
 
+        # Keys of saved rankings include the notes and cards modified by the reorder
+        for target in self.target_list:
+            target.update_saved_ranking_key()
+
+        self.cacher.close()
+
         # Done
         if len(self.target_list) == len(reorder_result_list):
             event_logger.add_entry("Done with reordering of all targets!")
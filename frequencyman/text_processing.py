@@ -7,16 +7,20 @@ from __future__ import annotations
 
 import re
 import html
-from typing import Callable, ClassVar, NewType, Optional, TYPE_CHECKING
+from functools import cache
+from collections.abc import Hashable
+from typing import Callable, ClassVar, NewType, Optional, TypeVar, TYPE_CHECKING
 
 from .tokenizers import get_user_provided_tokenizer, Tokenizer, LangId
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Iterable, Sequence
 
 
 WordToken = NewType('WordToken', str)
 
+H = TypeVar('H', bound=Hashable)
+
 
 class TextProcessing:
 
@@ -68,6 +72,20 @@ class TextProcessing:
     KHMER_PATTERN = re.compile(r'[\u1780-\u17ff]{1,}', re.UNICODE)
     DEFAULT_PATTERN = re.compile(r'[^\W\d_]{2,}', re.UNICODE)
 
+    # tags get_plain_text() needs to strip or replace, matched in a single scan (first alternative wins)
+    PLAIN_TEXT_TAGS_PATTERN = re.compile(
+        r'(?s:<(style|head|script|object|noscript|embed|noembed|applet|canvas).*?>.*?</\1>)'  # non-content blocks => space
+        r'|(?i:</?(?:br|p|hr|div|pre|blockquote|h[1-6]|ul|ol|li|table|tr|td|th|dl|dd|dt)[^>]*>)'  # block tags => space
+        r'|(?P<tag><[^>]+>)',  # other tags => removed
+        re.UNICODE
+    )
+    # a '<' followed by another '<' before any '>', without it the single scan equals stripping each kind of tag in turn
+    NESTED_TAG_OPENING_PATTERN = re.compile(r'<[^>]*<')
+    NON_CONTENT_BLOCK_PATTERN = re.compile(r'<(style|head|script|object|noscript|embed|noembed|applet|canvas)(.*?)>(.*?)</\1>', re.DOTALL)
+    BLOCK_TAG_PATTERN = re.compile(r'</?(br|p|hr|div|pre|blockquote|h[1-6]|ul|ol|li|table|tr|td|th|dl|dd|dt)([^>]*)>', re.IGNORECASE)
+    TAG_PATTERN = re.compile(r'<[^>]+>')
+    SOUND_AND_TYPE_MARKER_PATTERN = re.compile(r"\[(sound|type):[^]]+\]")
+
     @staticmethod
     def get_word_accepter(lang_id: Optional[LangId]) -> Callable[[str], bool]:
 
@@ -103,15 +121,44 @@ class TextProcessing:
 
         return is_acceptable_word_for_lang
 
+    @staticmethod
+    def __replace_tag(match: re.Match[str]) -> str:
+
+        if match.lastgroup == 'tag':
+            return ''
+        return ' '
+
+    @staticmethod
+    def __strip_tags(val: str) -> str:
+        """
+        Strip tags in a single scan. Values with a '<' followed by another '<' before any '>' (such as "<a <br> b>") still go through the
+        previous chain of three substitutions (non-content blocks, block tags, other tags): the chain first replaces the inner tag, after which
+        the outer tag matches differently, which a single scan can't reproduce.
+        """
+
+        if TextProcessing.NESTED_TAG_OPENING_PATTERN.search(val) is None:
+            return TextProcessing.PLAIN_TEXT_TAGS_PATTERN.sub(TextProcessing.__replace_tag, val)
+
+        val = TextProcessing.NON_CONTENT_BLOCK_PATTERN.sub(' ', val)
+        val = TextProcessing.BLOCK_TAG_PATTERN.sub(' ', val)
+        return TextProcessing.TAG_PATTERN.sub('', val)
+
     @staticmethod
     def get_plain_text(val: str) -> str:
-        val = re.sub(r'<(style|head|script|object|noscript|embed|noembed|applet|canvas)(.*?)>(.*?)</\1>', ' ', val, flags=re.DOTALL)
-        val = re.sub(r'</?(br|p|hr|div|pre|blockquote|h[1-6]|ul|ol|li|table|tr|td|th|dl|dd|dt)([^>]*)>', ' ', val, flags=re.IGNORECASE)
-        val = re.sub(r'<[^>]+>', '', val)
-        val = re.sub(r"\[(sound|type):[^]]+\]", " ", val)
-        val = html.unescape(val)
-        val = re.sub(r'[\s]+', ' ', val)
-        return val.strip()
+        """
+        Plain text of a field value: tags stripped (see __strip_tags), sound and type markers removed, character references unescaped and
+        whitespace collapsed. Each step is skipped if the value doesn't contain the character it starts with.
+        """
+
+        if '<' in val:
+            val = TextProcessing.__strip_tags(val)
+        if '[' in val:
+            val = TextProcessing.SOUND_AND_TYPE_MARKER_PATTERN.sub(' ', val)
+        if '&' in val:
+            val = html.unescape(val)
+
+        # collapse whitespace (str.split() uses the same definition of whitespace as \s)
+        return ' '.join(val.split())
 
     @staticmethod
     def get_word_token_creator(lang_id: LangId) -> Callable[[str], WordToken]:
@@ -132,23 +179,32 @@ class TextProcessing:
         return create_word_token
 
     @staticmethod
-    def get_word_tokens_from_text(text: str, lang_id: LangId, tokenizer: Optional[Tokenizer] = None) -> Sequence[WordToken]:
+    @cache
+    def get_tokenization_pipeline(lang_id: LangId) -> TokenizationPipeline:
+
+        return TokenizationPipeline(lang_id)
 
-        is_acceptable_word = TextProcessing.get_word_accepter(lang_id)
-        create_word_token = TextProcessing.get_word_token_creator(lang_id)
+    @staticmethod
+    def get_word_tokens_from_text(text: str, lang_id: LangId, tokenizer: Optional[Tokenizer] = None) -> Sequence[WordToken]:
 
         if tokenizer is None:
-            tokenizer = get_user_provided_tokenizer(lang_id)
+            pipeline = TextProcessing.get_tokenization_pipeline(lang_id)
         else:  # tokenizer is provided, should only be used for testing
-            if not lang_id in tokenizer.supported_languages():
-                raise ValueError("Provided tokenizer '{}' does not support '{}'.".format(tokenizer.__class__.__name__, lang_id))
+            pipeline = TokenizationPipeline(lang_id, tokenizer)
 
-        word_tokens = (create_word_token(token) for token in tokenizer.tokenize(text))
-        accepted_word_tokens = [token for token in word_tokens if is_acceptable_word(token)]
-        return accepted_word_tokens
+        return pipeline.tokenize(text)
 
     @staticmethod
     def calc_word_presence_scores(context: Sequence[WordToken]) -> list[tuple[WordToken, float]]:
+
+        return TextProcessing.calc_presence_scores(context, [len(word) for word in context])
+
+    @staticmethod
+    def calc_presence_scores(context: Sequence[H], context_word_lengths: Sequence[int]) -> list[tuple[H, float]]:
+        """
+        Presence score of each word in context, with words given as tokens or as token ids (lengths given per position).
+        """
+
         context_num_words = len(context)
 
         if context_num_words == 0:
@@ -156,30 +212,27 @@ class TextProcessing:
         if context_num_words == 1:
             return [(context[0], 1.0)]
 
-        counts: dict[WordToken, int] = {}
-        word_lengths: dict[WordToken, int] = {}
+        counts: dict[H, int] = {}
         context_num_chars = 0
 
-        for word in context:
+        for position_index in range(context_num_words):
+            word = context[position_index]
             if word in counts:
                 counts[word] += 1
-                context_num_chars += word_lengths[word]
             else:
                 counts[word] = 1
-                word_len = len(word)
-                word_lengths[word] = word_len
-                context_num_chars += word_len
+            context_num_chars += context_word_lengths[position_index]
 
         inv_num_words = 1.0 / context_num_words
         inv_num_chars = 1.0 / context_num_chars
         inv_three = 1.0 / 3.0
 
-        results: list[tuple[WordToken, float]] = []
+        results: list[tuple[H, float]] = []
 
         for position_index in range(context_num_words):
             word = context[position_index]
             word_count = counts[word]
-            word_len = word_lengths[word]
+            word_len = context_word_lengths[position_index]
 
             results.append((
                 word,
@@ -189,3 +242,47 @@ class TextProcessing:
             ))
 
         return results
+
+
+class TokenizationPipeline:
+    """
+    Turns plain text into accepted word tokens for a single language (tokenizer, token creator and word accepter are resolved only once).
+    """
+
+    lang_id: LangId
+    tokenizer: Tokenizer
+
+    def __init__(self, lang_id: LangId, tokenizer: Optional[Tokenizer] = None) -> None:
+
+        if tokenizer is None:
+            tokenizer = get_user_provided_tokenizer(lang_id)
+        elif not lang_id in tokenizer.supported_languages():
+            raise ValueError("Provided tokenizer '{}' does not support '{}'.".format(tokenizer.__class__.__name__, lang_id))
+
+        self.lang_id = lang_id
+        self.tokenizer = tokenizer
+        self._is_acceptable_word = TextProcessing.get_word_accepter(lang_id)
+        self._create_word_token = TextProcessing.get_word_token_creator(lang_id)
+
+    def __accepted_word_tokens(self, tokens: Iterable[str]) -> list[WordToken]:
+
+        create_word_token = self._create_word_token
+        is_acceptable_word = self._is_acceptable_word
+        word_tokens = (create_word_token(token) for token in tokens)
+        return [token for token in word_tokens if is_acceptable_word(token)]
+
+    def tokenize(self, text: str) -> list[WordToken]:
+
+        return self.__accepted_word_tokens(self.tokenizer.tokenize(text))
+
+    def tokenize_many(self, texts: Sequence[str]) -> list[list[WordToken]]:
+
+        if not texts:
+            return []
+
+        texts_tokens = self.tokenizer.tokenize_batch(texts)
+
+        if len(texts_tokens) != len(texts):
+            raise ValueError("Tokenizer '{}' returned {} results for {} texts!".format(self.tokenizer.name(), len(texts_tokens), len(texts)))
+
+        return [self.__accepted_word_tokens(tokens) for tokens in texts_tokens]
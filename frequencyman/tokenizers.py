@@ -45,6 +45,10 @@ class Tokenizer(ABC):
     def tokenize(self, text: str) -> Sequence[str]:
         pass
 
+    def tokenize_batch(self, texts: Sequence[str]) -> list[Sequence[str]]:
+        """Tokenize multiple texts at once. Tokenizers with a faster batch mode can override this."""
+        return [self.tokenize(text) for text in texts]
+
     @abstractmethod
     def is_available(self) -> bool:
         pass
@@ -9,9 +9,11 @@ from functools import cached_property
 from typing import Optional, Union, TYPE_CHECKING
 
 from ..language_data import LanguageData
+from ..target_cards import TargetCards
 from ..target_list import TargetList
 
 from ..lib.persistent_cacher import PersistentCacher, NullPersistentCacher, SqlDbFile
+from ..corpus_snapshots import CorpusSnapshotStore
 from ..lib.utilities import override
 
 from aqt.qt import QMainWindow, QWidget, QVBoxLayout, QLayout, QPaintEvent, QCloseEvent, QTabWidget, QHideEvent
@@ -92,7 +94,19 @@ class FrequencyManTab(QWidget):
 
     def init_new_target_list(self) -> TargetList:
 
-        return TargetList(self.language_data, self.cacher, self.col)
+        target_list = TargetList(self.language_data, self.cacher, self.col)
+
+        if self.fm_config.is_enabled('use_corpus_snapshots'):
+            target_list.corpus_snapshots = CorpusSnapshotStore(self.fm_window.user_files_dir / 'corpus_snapshots')
+
+        notes_cache_max_items = self.fm_config.get('notes_cache_max_items', None)
+        notes_cache_max_size_mb = self.fm_config.get('notes_cache_max_size_mb', 256)
+        TargetCards.set_notes_cache_limits(
+            notes_cache_max_items if isinstance(notes_cache_max_items, int) and not isinstance(notes_cache_max_items, bool) else None,
+            notes_cache_max_size_mb*1024*1024 if isinstance(notes_cache_max_size_mb, int) and not isinstance(notes_cache_max_size_mb, bool) else None
+        )
+
+        return target_list
 
     @override
     def paintEvent(self, a0: Optional[QPaintEvent]):
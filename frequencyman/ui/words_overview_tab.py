@@ -554,7 +554,7 @@ class WordsOverviewTab(FrequencyManTab):
 
         # Add menu items
         show_cards_action = None
-        if word_token in content_metrics.cards_per_word:
+        if word_token in content_metrics.word_postings:
             show_cards_action = menu.addAction("Show cards")
             menu.addSeparator()
         copy_word_action = menu.addAction("Copy word")
@@ -572,7 +572,7 @@ class WordsOverviewTab(FrequencyManTab):
 
     def __on_menu_word_show_cards(self, word: WordToken, content_metrics: SegmentContentMetrics) -> None:
 
-        note_ids = set(card.nid for card in content_metrics.cards_per_word[word])
+        note_ids = content_metrics.word_postings.get_notes_ids(word)
         batched_note_ids = batched(note_ids, 300)  # prevent "Expression tree is too large" error
         queries = []
         for note_ids_batch in batched_note_ids:
@@ -61,7 +61,7 @@ class NumberOfCardsColumn(AdditionalColumn):
 
     @override
     def get_values(self, words: Sequence[WordToken], metrics: SegmentContentMetrics) -> list[Union[float, int, str]]:
-        return [len(set(card.id for card in metrics.cards_per_word.get(word, []))) for word in words]
+        return [metrics.word_postings.num_cards(word) for word in words]
 
 class NumberOfNotesColumn(AdditionalColumn):
 
@@ -69,4 +69,4 @@ class NumberOfNotesColumn(AdditionalColumn):
 
     @override
     def get_values(self, words: Sequence[WordToken], metrics: SegmentContentMetrics) -> list[Union[float, int, str]]:
-        return [len(set(card.nid for card in metrics.cards_per_word.get(word, []))) for word in words]
\ No newline at end of file
+        return [metrics.word_postings.num_notes(word) for word in words]
\ No newline at end of file
@@ -152,14 +152,16 @@ class NotInWordFrequencyListsOverview(WordsOverviewOption):
     @override
     def data(self) -> TableDataType:
 
-        no_fr_words = set(word for word in self.selected_corpus_content_metrics.all_words if word not in self.selected_corpus_content_metrics.word_frequency)
-        data: TableDataType = [(word, [len(cards)]) for word, cards in self.selected_corpus_content_metrics.cards_per_word.items() if word in no_fr_words]
+        word_frequency = self.selected_corpus_content_metrics.word_frequency
+        tokens = self.selected_corpus_content_metrics.vocabulary.tokens
+        token_counts = self.selected_corpus_content_metrics.index.token_counts
+        data: TableDataType = [(tokens[token_id], [token_count]) for token_id, token_count in token_counts.items() if tokens[token_id] not in word_frequency]
         data = sorted(data, key=lambda x: x[1][0], reverse=True)
         return data
 
     @override
     def labels(self) -> list[str]:
-        return ["Word", "Number of cards"]
+        return ["Word", "Number of occurrences"]
 
 
 class WordFrequencyListsOverview(WordsOverviewOption):
@@ -227,8 +229,8 @@ class LonelyWordsOverview(WordsOverviewOption):
     @override
     def data(self) -> TableDataType:
 
-        num_notes = {word: len(set(card.nid for card in cards)) for word, cards in self.selected_corpus_content_metrics.cards_per_word.items()}
-        lonely_words = set(word for word, num_notes in num_notes.items() if num_notes == 1)
+        word_postings = self.selected_corpus_content_metrics.word_postings
+        lonely_words = set(word for word in word_postings.words() if word_postings.num_notes(word) == 1)
 
         data = [(word, [self.selected_corpus_content_metrics.words_familiarity.get(word, 0.0)]) for word in lonely_words]
         data = sorted(data, key=lambda x: x[1][0], reverse=True)
@@ -0,0 +1,68 @@
+"""
+FrequencyMan by Rick Zuidhoek. Licensed under the GNU GPL-3.0.
+See <https://www.gnu.org/licenses/gpl-3.0.html> for details.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .text_processing import WordToken
+    from .tokenizers import LangId
+
+
+class Vocabulary:
+    """
+    Word tokens of a single language, interned to dense integer ids (assigned in order of first appearance).
+    """
+
+    lang_id: LangId
+    tokens: list[WordToken]
+    token_lengths: array[int]
+    __token_ids: dict[WordToken, int]
+
+    def __init__(self, lang_id: LangId) -> None:
+
+        self.lang_id = lang_id
+        self.tokens = []
+        self.token_lengths = array('I')
+        self.__token_ids = {}
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __contains__(self, token: WordToken) -> bool:
+        return token in self.__token_ids
+
+    def get_id(self, token: WordToken) -> int:
+
+        token_id = self.__token_ids.get(token)
+
+        if token_id is None:
+            token_id = len(self.tokens)
+            self.__token_ids[token] = token_id
+            self.tokens.append(token)
+            self.token_lengths.append(len(token))
+
+        return token_id
+
+    def find_id(self, token: WordToken) -> Optional[int]:
+
+        return self.__token_ids.get(token)
+
+    def get_ids(self, tokens: Iterable[WordToken]) -> array[int]:
+
+        return array('I', [self.get_id(token) for token in tokens])
+
+    def get_token(self, token_id: int) -> WordToken:
+
+        return self.tokens[token_id]
+
+    def get_tokens(self, token_ids: Iterable[int]) -> list[WordToken]:
+
+        tokens = self.tokens
+        return [tokens[token_id] for token_id in token_ids]
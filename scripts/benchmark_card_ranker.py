@@ -0,0 +1,111 @@
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+assert (PROJECT_ROOT / "frequencyman").is_dir()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from frequencyman.card_ranker import CardRanker
+from frequencyman.language_data import LanguageData
+from frequencyman.target_list import TargetList
+from tests.tools import CallerContext, TestCollection, TestCollections
+
+
+class TestBenchmark:  # name used by the test collection to create its temporary files
+    pass
+
+
+def create_lang_data(lang_data_dir: Path, words: list[str]) -> LanguageData:
+    """Creates a language data dir with a word frequency list for the generated words."""
+
+    (lang_data_dir / 'en').mkdir(parents=True)
+    with open(lang_data_dir / 'en' / 'en.txt', 'w', encoding='utf-8') as wf_file:
+        wf_file.writelines("{} {}\n".format(word, len(words)-rank) for rank, word in enumerate(words))
+
+    return LanguageData(lang_data_dir)
+
+
+def add_notes(col: TestCollection, words: list[str], num_notes: int) -> None:
+    """Adds notes (with one reviewed or new card per note) directly into the database."""
+
+    note_type_id = col.models.by_name('Basic')['id']
+    deck_id = col.decks.id('Default')
+
+    rng = random.Random(1)
+    word_weights = [1 / (rank+1) for rank in range(len(words))]
+    notes_rows = []
+    cards_rows = []
+
+    for i in range(num_notes):
+        note_id = 1_000_000 + i
+        card_id = 2_000_000 + i
+        is_reviewed = rng.random() < 0.4
+        card_type, card_queue = (2, 2) if is_reviewed else (0, 0)
+        front = " ".join(rng.choices(words, word_weights, k=rng.randint(3, 12)))
+        back = " ".join(rng.choices(words, word_weights, k=rng.randint(1, 6)))
+        notes_rows.append((note_id, "guid{}".format(i), note_type_id, 0, 0, "", "{}\x1f{}".format(front, back), front, 0, 0, ""))
+        cards_rows.append((card_id, note_id, deck_id, 0, 0, 0, card_type, card_queue, i, rng.randint(1, 300) if is_reviewed else 0, 2500, rng.randint(1, 20) if is_reviewed else 0, 0, 0, 0, 0, 0, ""))
+
+    col.db.executemany("INSERT INTO notes VALUES (?,?,?,?,?,?,?,?,?,?,?)", notes_rows)
+    col.db.executemany("INSERT INTO cards VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", cards_rows)
+
+
+def main() -> None:
+    runs = 3
+    num_notes = 80_000
+
+    rng = random.Random(2)
+    words = list(dict.fromkeys("".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 9))) for _ in range(20_000)))
+
+    col = TestCollections.get_new_test_collection("two_deck_collection", CallerContext(test_instance=TestBenchmark(), test_function_name="test_benchmark_card_ranker"))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            lang_data = create_lang_data(Path(temp_dir) / 'lang_data', words)
+            add_notes(col, words, num_notes)
+
+            target_list = TargetList(lang_data, col.cacher, col)
+            target_list.set_targets([
+                {
+                    'deck': 'Default',
+                    'notes': [{
+                        "name": "Basic",
+                        "fields": {
+                            "Front": "EN",
+                            "Back": "EN"
+                        },
+                    }]
+                }
+            ])
+
+            target = target_list[0]
+            target_cards = target.get_cards()
+            corpus_data = target.get_corpus_data_non_cached(target_cards)
+
+            print("{:,} notes, {:,} new cards (fastest of {} runs):".format(len(target_cards.notes_ids_all_cards), len(target_cards.new_cards_ids), runs))
+
+            durations: list[float] = []
+            for _ in range(runs):
+                card_ranker = CardRanker(corpus_data, target.name, lang_data, {})
+                start = time.perf_counter()
+                card_ranker.calc_cards_ranking(target_cards, target_cards)
+                durations.append(time.perf_counter() - start)
+
+            tracemalloc.start()
+            card_ranker = CardRanker(corpus_data, target.name, lang_data, {})
+            card_ranker.calc_cards_ranking(target_cards, target_cards)
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print("  ranking: {:.3f} seconds".format(min(durations)))
+            print("  peak memory: {:.1f} MB".format(peak_memory / 1024 / 1024))
+        finally:
+            col.remove()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+assert (PROJECT_ROOT / "frequencyman").is_dir()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from anki.collection import Collection
+from frequencyman.target_cards import TargetCards
+
+
+def create_collection(collection_path: Path, num_cards: int) -> Collection:
+    """Creates a collection with one (reviewed or new) card per note, inserted directly into the database."""
+
+    col = Collection(str(collection_path))
+    col.set_config('rollover', 4)
+    note_type_id = col.models.by_name('Basic')['id']
+    deck_id = col.decks.id('Default')
+
+    rng = random.Random(1)
+    notes_rows = []
+    cards_rows = []
+
+    for i in range(num_cards):
+        note_id = 1_000_000 + i
+        card_id = 2_000_000 + i
+        is_reviewed = rng.random() < 0.4
+        card_type, card_queue = (2, 2) if is_reviewed else (0, 0)
+        notes_rows.append((note_id, "guid{}".format(i), note_type_id, 0, 0, "", "front {}\x1fback {}".format(i, i), "front {}".format(i), 0, 0, ""))
+        cards_rows.append((card_id, note_id, deck_id, 0, 0, 0, card_type, card_queue, rng.randint(0, 5000), rng.randint(1, 300) if is_reviewed else 0, 2500, rng.randint(1, 20) if is_reviewed else 0, 0, 0, 0, 0, 0, ""))
+
+    col.db.executemany("INSERT INTO notes VALUES (?,?,?,?,?,?,?,?,?,?,?)", notes_rows)
+    col.db.executemany("INSERT INTO cards VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", cards_rows)
+
+    return col
+
+
+def get_cards_rows_in_list(col: Collection, cards_ids: list) -> list:
+    """The query as it was done before (all card ids formatted into one 'IN (...)' list)."""
+
+    card_ids_str = ",".join(map(str, cards_ids))
+    return col.db.execute("SELECT id, nid, type, queue, ivl, reps, factor, due FROM cards WHERE id IN ({}) ORDER BY due ASC, id ASC".format(card_ids_str))
+
+
+def get_cards_rows_temp_table(col: Collection, cards_ids: list) -> list:
+    """Alternative: card ids inserted into a temporary table, then joined."""
+
+    col.db.execute("CREATE TEMP TABLE IF NOT EXISTS benchmark_cards_ids (id INTEGER PRIMARY KEY)")
+    col.db.execute("DELETE FROM temp.benchmark_cards_ids")
+    col.db.executemany("INSERT INTO temp.benchmark_cards_ids (id) VALUES (?)", [(card_id,) for card_id in cards_ids])
+    return col.db.execute("SELECT c.id, c.nid, c.type, c.queue, c.ivl, c.reps, c.factor, c.due FROM cards c JOIN temp.benchmark_cards_ids t ON t.id = c.id ORDER BY c.due ASC, c.id ASC")
+
+
+def get_cards_rows_json_each(col: Collection, cards_ids: list) -> list:
+    """Card ids bound as a single json parameter."""
+
+    return col.db.execute("SELECT id, nid, type, queue, ivl, reps, factor, due FROM cards WHERE id IN (SELECT value FROM json_each(?)) ORDER BY due ASC, id ASC", json.dumps(cards_ids))
+
+
+def get_cards_rows_json_each_leech(col: Collection, cards_ids: list) -> list:
+    """The query as used by TargetCards (json parameter, with the leech status from the tags of the notes)."""
+
+    return col.db.execute(TargetCards._TargetCards__get_cards_query(), json.dumps(cards_ids))  # type: ignore[attr-defined]
+
+
+def main() -> None:
+    runs = 3
+
+    query_variants: dict[str, Callable[[Collection, list], list]] = {
+        'IN-list': get_cards_rows_in_list,
+        'temp table join': get_cards_rows_temp_table,
+        'json_each': get_cards_rows_json_each,
+        'json_each + leech (used)': get_cards_rows_json_each_leech
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+
+        for num_cards in [10_000, 100_000, 500_000]:
+
+            col = create_collection(Path(temp_dir) / "benchmark_{}.anki2".format(num_cards), num_cards)
+
+            try:
+                cards_ids = list(col.find_cards('*', order="c.due asc"))
+                assert len(cards_ids) == num_cards
+
+                print("{:,} cards (fastest of {} runs):".format(num_cards, runs))
+
+                expected_cards_ids = [card.id for card in TargetCards(cards_ids, col).all_cards]
+
+                for variant_name, get_cards_rows in query_variants.items():
+                    durations: list[float] = []
+                    for _ in range(runs):
+                        start = time.perf_counter()
+                        cards_rows = get_cards_rows(col, cards_ids)
+                        durations.append(time.perf_counter() - start)
+                    assert [row[0] for row in cards_rows] == expected_cards_ids
+                    print("  {:<26} {:.3f} seconds".format(variant_name+":", min(durations)))
+            finally:
+                col.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+assert (PROJECT_ROOT / "frequencyman").is_dir()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from frequencyman.text_processing import TextProcessing
+from tests.test_text_processing import get_plain_text_reference
+
+FIELD_VALUES = [
+    "El perro come la comida en la cocina.",
+    "El <i>perro</i> come&nbsp;la comida.<br><div>Otra línea</div>[sound:perro.mp3]",
+    "<div><b>Tom</b> &amp; <b>Jerry</b></div><div><br></div><div>[sound:tts-1234.mp3]</div>",
+    "<style>.card { color: red; }</style><span style=\"color:red\">rojo</span> y <span>azul</span>",
+    "你好<br/>世界 [sound:zh.mp3]",
+]
+
+
+def benchmark(name: str, get_plain_text_fn, field_values: list[str], runs: int) -> float:
+
+    durations: list[float] = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        for field_value in field_values:
+            get_plain_text_fn(field_value)
+        durations.append(time.perf_counter() - start)
+
+    fastest = min(durations)
+    print("  {:<12} {:.3f} seconds ({:,.0f} fields per second)".format(name, fastest, len(field_values) / fastest))
+    return fastest
+
+
+def main() -> None:
+    num_fields = 150_000
+    runs = 5
+
+    rnd = random.Random(1)
+    field_values = [" ".join(rnd.choice(FIELD_VALUES) for _ in range(rnd.randint(1, 3))) for _ in range(num_fields)]
+
+    for field_value in field_values[:1000]:
+        assert TextProcessing.get_plain_text(field_value) == get_plain_text_reference(field_value)
+
+    print("get_plain_text() on {:,} field values (fastest of {} runs):".format(num_fields, runs))
+    reference_time = benchmark("reference", get_plain_text_reference, field_values, runs)
+    current_time = benchmark("current", TextProcessing.get_plain_text, field_values, runs)
+    print("  speedup: {:.2f}x".format(reference_time / current_time))
+
+
+if __name__ == "__main__":
+    main()
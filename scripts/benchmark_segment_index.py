@@ -0,0 +1,141 @@
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+assert (PROJECT_ROOT / "frequencyman").is_dir()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from frequencyman.target_corpus_data import SegmentContentMetrics, SegmentIndexBuilder
+from frequencyman.target_list import TargetList
+from frequencyman.text_processing import TextProcessing
+from tests.tools import CallerContext, TestCollections
+
+
+class TestBenchmark:  # name used by the test collection to create its temporary files
+    pass
+
+
+def get_index_multi_pass(metrics: SegmentContentMetrics) -> tuple[dict, int, int]:
+    """Builds the segment index the way it was done before SegmentIndexBuilder (one pass over the fields per structure)."""
+
+    num_passes = 0
+    num_fields_visited = 0
+    token_lengths = metrics.vocabulary.token_lengths
+    fields_per_note = metrics.targeted_fields_per_note
+
+    def calc_presence_scores(token_ids):
+        return TextProcessing.calc_presence_scores(token_ids, [token_lengths[token_id] for token_id in token_ids])
+
+    # reviewed words aggregates
+    num_passes += 1
+    reviewed_words_presence = defaultdict(list)
+    reviewed_words = defaultdict(list)
+    reviewed_words_familiarity_factor = defaultdict(list)
+    cards_indices = {card.id: card_index for card_index, card in enumerate(metrics.target_cards.all_cards)}
+    for card in metrics.target_cards.reviewed_cards:
+        for field_data in fields_per_note.get(card.nid, []):
+            num_fields_visited += 1
+            for token_id, presence in calc_presence_scores(field_data.field_value_token_ids):
+                reviewed_words_presence[token_id].append(presence)
+                reviewed_words[token_id].append(cards_indices[card.id])
+                reviewed_words_familiarity_factor[token_id].append(metrics.cards_familiarity_factor[card.id])
+
+    # all words presence
+    num_passes += 1
+    all_words_presence = defaultdict(list)
+    for card in metrics.target_cards.all_cards:
+        for field_data in fields_per_note.get(card.nid, []):
+            num_fields_visited += 1
+            for token_id, presence in calc_presence_scores(field_data.field_value_token_ids):
+                all_words_presence[token_id].append(presence)
+
+    # cards per word
+    num_passes += 1
+    cards_per_word = defaultdict(list)
+    for card_index, card in enumerate(metrics.target_cards.all_cards):
+        for field_data in fields_per_note.get(card.nid, []):
+            num_fields_visited += 1
+            for token_id in field_data.field_value_token_ids:
+                cards_per_word[token_id].append(card_index)
+
+    # all words
+    num_passes += 1
+    all_words: set[int] = set()
+    for field_data_list in fields_per_note.values():
+        for field_data in field_data_list:
+            num_fields_visited += 1
+            all_words.update(field_data.field_value_token_ids)
+
+    # internal word counts
+    num_passes += 1
+    token_counts: defaultdict[int, int] = defaultdict(int)
+    for field_data_list in fields_per_note.values():
+        for field_data in field_data_list:
+            num_fields_visited += 1
+            for token_id in field_data.field_value_token_ids:
+                token_counts[token_id] += 1
+
+    index = {
+        'token_counts': dict(token_counts),
+        'all_words_presence': dict(all_words_presence),
+        'cards_per_word': dict(cards_per_word),
+        'reviewed_words': dict(reviewed_words),
+    }
+    return index, num_passes, num_fields_visited
+
+
+def main() -> None:
+    runs = 5
+
+    col = TestCollections.get_new_test_collection("big_collection_es", CallerContext(test_instance=TestBenchmark(), test_function_name="test_benchmark_segment_index"))
+
+    try:
+        target_list = TargetList(col.lang_data, col.cacher, col)
+        target_list.set_targets([
+            {
+                'deck': 'Spanish',
+                'notes': [{
+                    "name": "-- My spanish --",
+                    "fields": {
+                        "Meaning": "EN",
+                        "Sentence": "ES"
+                    },
+                }]
+            }
+        ])
+
+        target = target_list[0]
+        corpus_data = target.get_corpus_data_non_cached(target.get_cards())
+
+        for segment_id, metrics in corpus_data.content_metrics.items():
+
+            multi_pass_durations: list[float] = []
+            single_pass_durations: list[float] = []
+
+            for _ in range(runs):
+                start = time.perf_counter()
+                reference_index, num_passes, num_fields_visited = get_index_multi_pass(metrics)
+                multi_pass_durations.append(time.perf_counter() - start)
+
+                builder = SegmentIndexBuilder(metrics.vocabulary, metrics.cards_familiarity_factor)
+                start = time.perf_counter()
+                index = builder.build(metrics.target_cards, metrics.targeted_fields_per_note)
+                single_pass_durations.append(time.perf_counter() - start)
+
+            assert index.token_counts == reference_index['token_counts']
+            assert index.all_words_presence == reference_index['all_words_presence']
+            assert {token_id: list(cards) for token_id, cards in index.cards_postings.items()} == {token_id: list(dict.fromkeys(cards)) for token_id, cards in reference_index['cards_per_word'].items()}
+            assert {token_id: list(cards) for token_id, cards in index.reviewed_cards_indices.items()} == reference_index['reviewed_words']
+
+            print("Segment '{}' ({:,} cards, {:,} notes, fastest of {} runs):".format(segment_id, len(metrics.target_cards.all_cards), len(metrics.targeted_fields_per_note), runs))
+            print("  multi-pass:  {} passes, {:,} field visits, {:.3f} seconds".format(num_passes, num_fields_visited, min(multi_pass_durations)))
+            print("  single-pass: 1 pass, {:,} field visits, {:.3f} seconds".format(builder.num_fields_visited, min(single_pass_durations)))
+            print("  speedup: {:.2f}x".format(min(multi_pass_durations) / min(single_pass_durations)))
+    finally:
+        col.remove()
+
+
+if __name__ == "__main__":
+    main()
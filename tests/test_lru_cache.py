@@ -0,0 +1,74 @@
+from frequencyman.lib.lru_cache import LruCache
+
+
+def test_lru_cache_max_items():
+    """Test that the least recently used items are evicted when exceeding the max number of items."""
+    cache: LruCache[int, str] = LruCache(max_items=2)
+
+    cache.put(1, "a")
+    cache.put(2, "b")
+    assert cache.get(1) == "a"  # 2 is now least recently used
+    cache.put(3, "c")
+
+    assert 2 not in cache
+    assert 1 in cache and 3 in cache
+    assert len(cache) == 2
+    assert cache.evictions == 1
+
+
+def test_lru_cache_max_size():
+    """Test that items are evicted when exceeding the (approximate) size budget."""
+    cache: LruCache[int, str] = LruCache(max_size=10, get_size=len)
+
+    cache.put(1, "aaaa")
+    cache.put(2, "bbbb")
+    assert cache.size == 8
+    cache.put(3, "cccc")
+
+    assert 1 not in cache
+    assert cache.size == 8
+
+    cache.put(2, "bb")  # replacing an item updates the size
+    assert cache.size == 6
+
+    cache.discard(3)
+    assert cache.size == 2
+    assert len(cache) == 1
+
+
+def test_lru_cache_counters():
+    """Test the hit and miss counters, and that clearing the cache resets them."""
+    cache: LruCache[int, str] = LruCache()
+
+    cache.put(1, "a")
+    assert cache.get(1) == "a"
+    assert cache.get(2) is None
+    assert 2 not in cache  # membership test is not counted
+
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 0)
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses, cache.evictions, cache.size) == (0, 0, 0, 0)
+
+
+def test_lru_cache_pinned_items():
+    """Test that pinned items are never evicted, but do count towards the limits."""
+    cache: LruCache[int, str] = LruCache(max_items=2)
+
+    cache.put(1, "a", pinned=True)
+    cache.put(2, "b")
+    cache.put(3, "c")
+    cache.put(4, "d")
+
+    assert 1 in cache
+    assert cache.get(1) == "a"
+    assert len(cache) == 2
+
+    cache.put(1, "aa")  # stays pinned
+    cache.put(5, "e")
+    assert cache.get(1) == "aa"
+
+    cache.set_limits(max_items=1, max_size=None)
+    assert len(cache) == 1
+    assert 1 in cache
@@ -50,6 +50,31 @@ def test_delete_item(cacher: PersistentCacher) -> None:
     assert cacher.num_items_stored() == 2
 
 
+def test_get_items(cacher: PersistentCacher) -> None:
+    cacher.save_item("key_a", "stored_a")
+    produced_for: list[list[str]] = []
+
+    def producer(inputs: list[str]) -> list[str]:
+        produced_for.append(inputs)
+        return [value.upper() for value in inputs]
+
+    items = cacher.get_items({"key_a": "a", "key_b": "b", "key_c": "c"}, producer)
+    assert items == {"key_a": "stored_a", "key_b": "B", "key_c": "C"}
+    assert produced_for == [["b", "c"]]
+
+    # all items cached now, producer not called again
+    assert cacher.get_items({"key_b": "b", "key_c": "c"}, producer) == {"key_b": "B", "key_c": "C"}
+    assert len(produced_for) == 1
+
+    cacher.flush_save_buffer()
+    assert cacher.num_items_stored() == 3
+
+
+def test_get_items_producer_mismatch(cacher: PersistentCacher) -> None:
+    with pytest.raises(ValueError, match="Producer returned 1 items, expected 2"):
+        cacher.get_items({"key_a": "a", "key_b": "b"}, lambda inputs: ["only_one"])
+
+
 def test_flush_save_buffer_on_close(cacher: PersistentCacher) -> None:
     assert cacher.get_item("new_key", dummy_producer) == "dummy_value"
     cacher.close()
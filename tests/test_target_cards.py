@@ -1,4 +1,6 @@
+import pytest
 
+from frequencyman.lib.lru_cache import LruCache
 from frequencyman.target_cards import TargetCards
 
 from tests.tools import (
@@ -33,3 +35,86 @@ class TestTargetCards:
 
         assert sorted(due_cards_ids_from_find_cards) == sorted(due_cards_ids_from_target_cards)
         assert sorted(overdue_cards_ids_from_find_cards) == sorted(overdue_cards_ids_from_target_cards)
+
+    @with_test_collection("two_deck_collection")
+    def test_get_notes_data(self, col: TestCollection):
+
+        target_cards = TargetCards(col.find_cards('*'), col)
+        TargetCards.clear_notes_cache()
+
+        notes_data = target_cards.get_notes_data_from_all_cards()
+
+        assert list(notes_data.keys()) == target_cards.notes_ids_all_cards
+        assert len(TargetCards.notes_from_cards_cached) == 0  # no note objects created
+
+        for note_id, note_data in notes_data.items():
+            note = col.get_note(note_id)
+            assert note_data.id == note.id
+            assert note_data.mid == note.mid
+            assert note_data.fields == note.fields
+            assert note_data.tags == note.tags
+            assert note_data.mod == note.mod
+
+        assert target_cards.get_notes_types_ids_from_all_cards() == {note_id: note_data.mid for note_id, note_data in notes_data.items()}
+
+        # modified (cached) note objects take precedence
+
+        note_id = target_cards.notes_ids_all_cards[0]
+        note = target_cards.get_note(note_id)
+        note.fields[0] = "modified"
+
+        assert target_cards.get_notes_data([note_id])[note_id].fields[0] == "modified"
+
+    @with_test_collection("two_deck_collection")
+    def test_leech_cards(self, col: TestCollection):
+
+        notes_ids = sorted({col.get_card(card_id).nid for card_id in col.find_cards('*')})
+        assert len(notes_ids) >= 5
+
+        for note_id, tags in zip(notes_ids, [['leech'], ['Leech::sub'], ['leeches'], ['other::leech'], ['other', 'LEECH']]):
+            note = col.get_note(note_id)
+            note.tags = tags
+            col.update_note(note)
+
+        target_cards = TargetCards(col.find_cards('*'), col)
+
+        leech_cards_ids = [card.id for card in target_cards.all_cards if card.is_leech]
+
+        assert len(leech_cards_ids) > 0
+        assert sorted(leech_cards_ids) == sorted(col.find_cards('tag:leech'))
+
+    @with_test_collection("two_deck_collection")
+    def test_notes_cache_limits(self, col: TestCollection, monkeypatch: pytest.MonkeyPatch):
+
+        target_cards = TargetCards(col.find_cards('*'), col)
+        TargetCards.clear_notes_cache()
+
+        monkeypatch.setattr(TargetCards, 'notes_from_cards_cached', LruCache(max_items=3))
+        monkeypatch.setattr(TargetCards, 'notes_data_cached', LruCache(max_items=3))
+
+        notes_ids = target_cards.notes_ids_all_cards
+        assert len(notes_ids) > 3
+
+        # notes data (not note objects) are cached, up to the limit
+
+        notes_data = target_cards.get_notes_data_from_all_cards()
+        assert list(notes_data.keys()) == notes_ids
+        assert len(TargetCards.notes_from_cards_cached) == 0
+        assert len(TargetCards.notes_data_cached) == 3
+        assert TargetCards.notes_data_cached.evictions == len(notes_ids) - 3
+
+        assert target_cards.get_notes_data(notes_ids[-3:]) == {note_id: notes_data[note_id] for note_id in notes_ids[-3:]}
+        assert TargetCards.notes_data_cached.hits == 3
+
+        # modified notes are kept in the cache
+
+        modified_note = target_cards.get_note(notes_ids[0])
+        modified_note.fields[0] = "modified"
+        TargetCards.keep_modified_note(modified_note)
+
+        for note_id in notes_ids[1:]:
+            target_cards.get_note(note_id)
+
+        assert len(TargetCards.notes_from_cards_cached) == 3
+        assert target_cards.get_note(notes_ids[0]) is modified_note
+        assert target_cards.get_notes_data([notes_ids[0]])[notes_ids[0]].fields[0] == "modified"
@@ -1,27 +1,35 @@
-from typing import Callable
+from __future__ import annotations
 
+import json
+from array import array
+from dataclasses import replace
+from typing import TYPE_CHECKING, Callable, Optional
+
+import pytest
 from anki.cards import CardId
 from anki.notes import NoteId
-
-from frequencyman.target_cards import TargetCard
-from frequencyman.target_corpus_data import TargetCorpusData
+from frequencyman.corpus_snapshots import SNAPSHOT_HEADER_SIZE, CorpusSnapshotStore
+from frequencyman.target_cards import CardTable, TargetCard, TargetCards
+from frequencyman.target_corpus_data import CorpusSegmentId, SegmentContentMetrics, SegmentIndexBuilder, TargetCorpusData, WordPostings
 from frequencyman.target_list import TargetList
 from frequencyman.text_processing import WordToken
 
-from .tools import (
-    TestCollection,
-    test_collection as test_collection_fixture,
-    with_test_collection
+from .tools import TestCollection, with_test_collection
+from .tools import test_collection as test_collection_fixture
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from frequencyman.target import Target
 
-)
 col = test_collection_fixture
 
 
 def card_familiarity_score(card: TargetCard):
-    cards = [card]
-    cards_familiarity_score_fn:  Callable[[list[TargetCard]], dict[CardId, float]]
+    card_table = CardTable.from_cards([card])
+    cards_familiarity_score_fn:  Callable[[CardTable, array[int]], dict[CardId, float]]
     cards_familiarity_score_fn = TargetCorpusData._TargetCorpusData__get_cards_familiarity_score  # type: ignore[attr-defined]
-    cards_scores = cards_familiarity_score_fn(cards)
+    cards_scores = cards_familiarity_score_fn(card_table, array('I', range(len(card_table))))
     return cards_scores[card.id]
 
 
@@ -29,6 +37,30 @@ def create_card(interval_days: int, ease_factor: int, reps: int) -> TargetCard:
     return TargetCard(id=CardId(0), nid=NoteId(0), type=0, queue=0, ivl=interval_days, reps=reps, ease_factor=ease_factor, due=0, is_leech=False, is_suspended=False)
 
 
+def assert_corpus_data_equal(corpus_data: TargetCorpusData, expected_corpus_data: TargetCorpusData):
+
+    assert list(corpus_data.content_metrics.keys()) == list(expected_corpus_data.content_metrics.keys())
+    assert list(corpus_data.targeted_fields_per_note.keys()) == list(expected_corpus_data.targeted_fields_per_note.keys())
+
+    for note_id, note_fields in corpus_data.targeted_fields_per_note.items():
+        expected_note_fields = expected_corpus_data.targeted_fields_per_note[note_id]
+        assert [field_data.field_value for field_data in note_fields] == [field_data.field_value for field_data in expected_note_fields]
+        assert [field_data.field_value_tokenized for field_data in note_fields] == [field_data.field_value_tokenized for field_data in expected_note_fields]
+
+    for segment_id, metrics in corpus_data.content_metrics.items():
+        expected_metrics = expected_corpus_data.content_metrics[segment_id]
+        assert list(metrics.words_familiarity.items()) == list(expected_metrics.words_familiarity.items())
+        assert list(metrics.word_frequency.items()) == list(expected_metrics.word_frequency.items())
+        assert list(metrics.internal_word_frequency.items()) == list(expected_metrics.internal_word_frequency.items())
+        assert metrics.mature_words == expected_metrics.mature_words
+        assert list(metrics.words_familiarity_sweetspot.items()) == list(expected_metrics.words_familiarity_sweetspot.items())
+        assert {word: list(cards) for word, cards in metrics.reviewed_words.items()} == expected_metrics.reviewed_words
+        assert {word: list(presence) for word, presence in metrics.all_words_presence.items()} == expected_metrics.all_words_presence
+        for word in expected_metrics.word_postings.words():
+            assert metrics.word_postings.get_cards(word) == expected_metrics.word_postings.get_cards(word)
+            assert metrics.word_postings.get_notes_ids(word) == expected_metrics.word_postings.get_notes_ids(word)
+
+
 class TestTargetCorpusData:
 
     def test_cards_familiarity_score(self):
@@ -77,6 +109,31 @@ class TestTargetCorpusData:
             card_score = round(card_familiarity_score(card), expected_score[1])
             assert card_score == round(expected_score[0], expected_score[1]), index
 
+    def test_cards_familiarity_factor_numpy_parity(self):
+
+        pytest.importorskip("numpy")
+
+        card_table = CardTable()
+        intervals = [0, 1, 3, 30, 150, 300, 900, 5000]
+        ease_factors = [1300, 1900, 2500, 3100]
+        reps = [0, 1, 5, 12, 40, 200]
+        days_overdue = [None, 0, 1, 5, 40]
+
+        for index in range(500):
+            card_queue = [0, 2, 2, -1, 1][index % 5]
+            card_type = 0 if card_queue == 0 else 2
+            card_row = (index, index % 97, card_type, card_queue, intervals[index % 8], reps[index % 6], ease_factors[index % 4], 0)
+            card_table.append(card_row, index % 7 == 0, days_overdue[index % 5] if card_type == 2 else None)
+
+        cards_familiarity_factor_fn: Callable[[CardTable, float, float, bool], dict[CardId, float]]
+        cards_familiarity_factor_fn = TargetCorpusData._TargetCorpusData__get_cards_familiarity_factor  # type: ignore[attr-defined]
+
+        numpy_factors = cards_familiarity_factor_fn(card_table, 0.25, 0.0, True)
+        python_factors = cards_familiarity_factor_fn(card_table, 0.25, 0.0, False)
+
+        assert len(python_factors) == len(card_table.reviewed_indices)
+        assert list(numpy_factors.items()) == list(python_factors.items())
+
     @with_test_collection("empty_collection")
     def test_internal_word_frequency(self, col: TestCollection):
 
@@ -126,3 +183,318 @@ class TestTargetCorpusData:
 
         # Assert one of the valid orders
         assert list(internal_wf.keys()) in [expected_order_1, expected_order_2]
+
+    @with_test_collection("two_deck_collection")
+    def test_words_familiarity_numpy_parity(self, col: TestCollection, monkeypatch: pytest.MonkeyPatch):
+
+        pytest.importorskip("numpy")
+
+        target_list = TargetList(col.lang_data, col.cacher, col)
+
+        target_list.set_targets([
+            {
+                'decks': 'decka, deckb',
+                'notes': [{
+                    "name": "Basic",
+                    "fields": {
+                        "Front": "EN",
+                        "Back": "ES"
+                    },
+                }]
+            }
+        ])
+
+        target = target_list[0]
+        corpus_data = target.get_corpus_data_non_cached(target.get_cards())
+        assert corpus_data.content_metrics
+
+        def get_familiarity_metrics(content_metrics: SegmentContentMetrics, use_numpy: bool) -> tuple[dict[WordToken, float], float, float, float]:
+            monkeypatch.setattr(SegmentContentMetrics, 'use_numpy', use_numpy)
+            metrics = replace(content_metrics)
+            return (metrics.words_familiarity, metrics.words_familiarity_mean, metrics.words_familiarity_median, metrics.words_familiarity_max)
+
+        for content_metrics in corpus_data.content_metrics.values():
+
+            (numpy_familiarity, numpy_mean, numpy_median, numpy_max) = get_familiarity_metrics(content_metrics, use_numpy=True)
+            (python_familiarity, python_mean, python_median, python_max) = get_familiarity_metrics(content_metrics, use_numpy=False)
+
+            assert numpy_familiarity
+            assert numpy_familiarity == pytest.approx(python_familiarity, rel=1e-12)
+            assert set(numpy_familiarity.keys()) == set(python_familiarity.keys())
+            assert numpy_mean == pytest.approx(python_mean, rel=1e-12)
+            assert numpy_median == pytest.approx(python_median, rel=1e-12)
+            assert numpy_max == pytest.approx(python_max, rel=1e-12)
+
+    @with_test_collection("two_deck_collection")
+    def test_segment_index_single_pass(self, col: TestCollection):
+
+        target_list = TargetList(col.lang_data, col.cacher, col)
+
+        target_list.set_targets([
+            {
+                'decks': 'decka, deckb',
+                'notes': [{
+                    "name": "Basic",
+                    "fields": {
+                        "Front": "EN",
+                        "Back": "ES"
+                    },
+                }]
+            }
+        ])
+
+        target = target_list[0]
+        corpus_data = target.get_corpus_data_non_cached(target.get_cards())
+
+        for content_metrics in corpus_data.content_metrics.values():
+
+            builder = SegmentIndexBuilder(content_metrics.vocabulary, content_metrics.cards_familiarity_factor)
+            index = builder.build(content_metrics.target_cards, content_metrics.targeted_fields_per_note)
+
+            num_fields = sum(len(fields) for fields in content_metrics.targeted_fields_per_note.values())
+            assert builder.num_fields_visited == num_fields
+            assert sum(index.token_counts.values()) == sum(len(field_data.field_value_token_ids) for fields in content_metrics.targeted_fields_per_note.values() for field_data in fields)
+            assert len(index.reviewed_token_ids) == len(index.reviewed_presence_scores) == len(index.reviewed_cards_familiarity_factors)
+            assert set(index.cards_postings.keys()) == set(index.notes_postings.keys()) == set(index.token_counts.keys())
+
+    @with_test_collection("two_deck_collection")
+    def test_word_postings(self, col: TestCollection):
+
+        target_list = TargetList(col.lang_data, col.cacher, col)
+
+        target_list.set_targets([
+            {
+                'decks': 'decka, deckb',
+                'notes': [{
+                    "name": "Basic",
+                    "fields": {
+                        "Front": "EN",
+                        "Back": "ES"
+                    },
+                }]
+            }
+        ])
+
+        target = target_list[0]
+        target_cards = target.get_cards()
+        corpus_data = target.get_corpus_data_non_cached(target_cards)
+
+        for content_metrics in corpus_data.content_metrics.values():
+
+            word_postings = content_metrics.word_postings
+            assert set(word_postings.words()) == content_metrics.all_words
+
+            for word in word_postings.words():
+                expected_cards = [card for card in target_cards.all_cards if any(word in field_data.field_value_tokenized for field_data in content_metrics.targeted_fields_per_note[card.nid])]
+                assert word in word_postings
+                assert word_postings.get_cards(word) == expected_cards
+                assert word_postings.num_cards(word) == len(expected_cards)
+                assert word_postings.get_notes_ids(word) == sorted({card.nid for card in expected_cards})
+                assert word_postings.num_notes(word) == len({card.nid for card in expected_cards})
+
+            words = word_postings.words()[:2]
+            assert word_postings.get_notes_ids_with_all_words(words) == sorted(set(word_postings.get_notes_ids(words[0])) & set(word_postings.get_notes_ids(words[1])))
+            assert word_postings.get_cards_with_all_words(words) == [card for card in word_postings.get_cards(words[0]) if card in word_postings.get_cards(words[1])]
+            assert WordToken("nonexistingword") not in word_postings
+            assert word_postings.num_cards(WordToken("nonexistingword")) == 0
+
+    def test_intersect_postings(self):
+
+        intersect_postings = WordPostings.intersect_postings
+
+        assert list(intersect_postings([array('I', [1, 3, 5, 7, 9]), array('I', [3, 4, 5, 9, 12]), array('I', [0, 5, 9])])) == [5, 9]
+        assert list(intersect_postings([array('I', [1, 2]), array('I')])) == []
+        assert list(intersect_postings([array('I', [2, 4, 6])])) == [2, 4, 6]
+        assert list(intersect_postings([])) == []
+
+    @with_test_collection("two_deck_collection")
+    def test_corpus_snapshot(self, col: TestCollection, tmp_path: Path):
+
+        def get_target(corpus_snapshots: Optional[CorpusSnapshotStore]) -> Target:
+            target_list = TargetList(col.lang_data, col.cacher, col)
+            target_list.corpus_snapshots = corpus_snapshots
+            target_list.set_targets([
+                {
+                    'decks': 'decka, deckb',
+                    'notes': [{
+                        "name": "Basic",
+                        "fields": {
+                            "Front": "EN",
+                            "Back": "ES"
+                        },
+                    }]
+                }
+            ])
+            return target_list[0]
+
+        corpus_snapshots = CorpusSnapshotStore(tmp_path)
+
+        target = get_target(None)
+        expected_corpus_data = target.get_corpus_data_non_cached(target.get_cards())
+
+        # first run creates the snapshot, second run loads it
+
+        target = get_target(corpus_snapshots)
+        created_corpus_data = target.get_corpus_data_non_cached(target.get_cards())
+        assert len(list(tmp_path.glob('*.snapshot'))) == 1
+
+        target = get_target(corpus_snapshots)
+        loaded_corpus_data = target.get_corpus_data_non_cached(target.get_cards())
+
+        for corpus_data in [created_corpus_data, loaded_corpus_data]:
+            assert_corpus_data_equal(corpus_data, expected_corpus_data)
+
+        # field values are not part of the json header
+
+        (snapshot_file_path,) = tmp_path.glob('*.snapshot')
+        snapshot_data = snapshot_file_path.read_bytes()
+        (_, header_length) = SNAPSHOT_HEADER_SIZE.unpack_from(snapshot_data)
+        header = json.loads(snapshot_data[SNAPSHOT_HEADER_SIZE.size:SNAPSHOT_HEADER_SIZE.size+header_length])
+        field_value = next(iter(loaded_corpus_data.targeted_fields_per_note.values()))[0].field_value
+        assert field_value != "" and field_value not in json.dumps(header)
+
+        # loaded data is copied out of the snapshot file, so the file can be replaced without affecting it
+
+        first_field_data = next(iter(loaded_corpus_data.targeted_fields_per_note.values()))[0]
+        assert isinstance(first_field_data.field_value_token_ids, array)
+
+        for snapshot_file_path in tmp_path.glob('*.snapshot'):
+            with snapshot_file_path.open('r+b') as file:
+                file.write(bytes(snapshot_file_path.stat().st_size))
+
+        assert_corpus_data_equal(loaded_corpus_data, expected_corpus_data)
+
+        # damaged snapshot is created again
+
+        target = get_target(corpus_snapshots)
+        assert_corpus_data_equal(target.get_corpus_data_non_cached(target.get_cards()), expected_corpus_data)
+        assert len(list(tmp_path.glob('*.snapshot'))) == 1
+        assert all(snapshot_file_path.read_bytes().startswith(b'FMCS') for snapshot_file_path in tmp_path.glob('*.snapshot'))
+
+        # changing a note invalidates the snapshot
+
+        note = col.get_note(next(iter(loaded_corpus_data.targeted_fields_per_note.keys())))
+        note['Front'] = note['Front'] + " snapshot"
+        col.update_note(note)
+        TargetCards.clear_notes_cache()
+
+        target = get_target(corpus_snapshots)
+        updated_corpus_data = target.get_corpus_data_non_cached(target.get_cards())
+        assert "snapshot" in updated_corpus_data.content_metrics[CorpusSegmentId('en')].all_words
+        assert len(list(tmp_path.glob('*.snapshot'))) == 1
+
+        # snapshots of targets no longer in the target list are removed
+
+        (tmp_path / 'target1_{}.snapshot'.format("0"*32)).write_bytes(b'FMCS')
+        get_target(corpus_snapshots)
+        assert [snapshot_file_path.name.split('_')[0] for snapshot_file_path in tmp_path.glob('*.snapshot')] == ['target0']
+
+    @with_test_collection("two_deck_collection")
+    def test_incremental_corpus_update(self, col: TestCollection):
+
+        def get_target() -> Target:
+            target_list = TargetList(col.lang_data, col.cacher, col)
+            target_list.set_targets([
+                {
+                    'decks': 'decka, deckb',
+                    'notes': [{
+                        "name": "Basic",
+                        "fields": {
+                            "Front": "EN",
+                            "Back": "ES"
+                        },
+                    }]
+                }
+            ])
+            return target_list[0]
+
+        target = get_target()
+        previous_corpus_data = target.get_corpus_data_non_cached(target.get_cards_non_cached())
+
+        # nothing modified, same corpus data is returned
+
+        assert target.get_corpus_data_non_cached(target.get_cards_non_cached()) is previous_corpus_data
+
+        # modify a note and a reviewed card
+
+        modified_note = col.get_note(next(iter(previous_corpus_data.targeted_fields_per_note.keys())))
+        modified_note['Front'] = modified_note['Front'] + " incremental"
+        col.update_note(modified_note)
+        col.sched.suspend_cards([previous_corpus_data.target_cards.reviewed_cards[0].id])
+        TargetCards.clear_notes_cache()
+
+        assert previous_corpus_data.get_modified_notes_ids() == {modified_note.id}
+        assert previous_corpus_data.has_modified_cards()
+
+        updated_corpus_data = target.get_corpus_data_non_cached(target.get_cards_non_cached())
+        assert updated_corpus_data is not previous_corpus_data
+        assert "incremental" in updated_corpus_data.content_metrics[CorpusSegmentId('en')].all_words
+
+        # only content data of the modified note is created again
+
+        for note_id, note_fields in updated_corpus_data.targeted_fields_per_note.items():
+            if note_id == modified_note.id:
+                assert note_fields is not previous_corpus_data.targeted_fields_per_note[note_id]
+            else:
+                assert note_fields is previous_corpus_data.targeted_fields_per_note[note_id]
+
+        # consistent with full rebuild
+
+        target = get_target()
+        rebuilt_corpus_data = target.get_corpus_data_non_cached(target.get_cards_non_cached())
+        assert_corpus_data_equal(updated_corpus_data, rebuilt_corpus_data)
+
+    @with_test_collection("two_deck_collection")
+    def test_incremental_corpus_update_added_edited_deleted_notes(self, col: TestCollection):
+
+        def get_target() -> Target:
+            target_list = TargetList(col.lang_data, col.cacher, col)
+            target_list.set_targets([
+                {
+                    'decks': 'decka, deckb',
+                    'notes': [{
+                        "name": "Basic",
+                        "fields": {
+                            "Front": "EN",
+                            "Back": "ES"
+                        },
+                    }]
+                }
+            ])
+            return target_list[0]
+
+        target = get_target()
+        previous_corpus_data = target.get_corpus_data_non_cached(target.get_cards_non_cached())
+        (edited_note_id, deleted_note_id, *unchanged_notes_ids) = previous_corpus_data.targeted_fields_per_note.keys()
+
+        # add, edit and delete notes
+
+        model = col.models.by_name("Basic")
+        did = col.decks.id("decka")
+        assert model and did
+        added_note = col.new_note(model)
+        added_note['Front'] = "The horse jumps."
+        added_note['Back'] = "El caballo salta."
+        col.add_note(added_note, did)
+
+        edited_note = col.get_note(edited_note_id)
+        edited_note['Front'] = edited_note['Front'] + " edited"
+        col.update_note(edited_note)
+
+        col.remove_notes([deleted_note_id])
+        TargetCards.clear_notes_cache()
+
+        updated_corpus_data = target.get_corpus_data_non_cached(target.get_cards_non_cached())
+        assert updated_corpus_data is not previous_corpus_data
+
+        assert added_note.id in updated_corpus_data.targeted_fields_per_note
+        assert deleted_note_id not in updated_corpus_data.targeted_fields_per_note
+        assert updated_corpus_data.targeted_fields_per_note[edited_note_id] is not previous_corpus_data.targeted_fields_per_note[edited_note_id]
+        for note_id in unchanged_notes_ids:
+            assert updated_corpus_data.targeted_fields_per_note[note_id] is previous_corpus_data.targeted_fields_per_note[note_id]
+
+        # same as corpus data created from scratch
+
+        target = get_target()
+        created_corpus_data = target.get_corpus_data_non_cached(target.get_cards_non_cached())
+        assert_corpus_data_equal(updated_corpus_data, created_corpus_data)
@@ -113,7 +113,8 @@ class TestTargetList:
             '[{"deck": "Spanish", "notes": [{"name": "basic", "fields": {"Front": "not_a_lang_data_id"}}]}]': 'not_a_lang_data_id',
             '[{"deck": "not_a_deck", "notes": [{"name": "basic", "fields": {"Front": "EN"}}]}]': 'not_a_deck',
             '[{"scope_query": "\\"Spanish", "notes": [{"name": "basic", "fields": {"Front": "EN"}}]}]': 'not a valid query',
-            '[{"deck": "Spanish", "reorder_scope_query": "\\"Spanish", "notes": [{"name": "basic", "fields": {"Front": "EN"}}]}]': 'not a valid query'
+            '[{"deck": "Spanish", "reorder_scope_query": "\\"Spanish", "notes": [{"name": "basic", "fields": {"Front": "EN"}}]}]': 'not a valid query',
+            '[{"deck": "Spanish", "incremental_ranking": true, "notes": [{"name": "basic", "fields": {"Front": "EN"}}]}]': 'incremental_ranking'
         }
 
         for index, (json_data, expected_error) in enumerate(invalid_targets_data.items()):
@@ -1,9 +1,15 @@
+import json
 import pytest
 from collections import defaultdict
+from typing import Any
+
+from anki.cards import CardId
 
 from frequencyman.card_ranker import CardRanker
+from frequencyman.target import Target
 from frequencyman.target_list import TargetList, TargetListReorderResult
 from frequencyman.lib.event_logger import EventLogger
+from frequencyman.lib.persistent_cacher import NullPersistentCacher
 
 from tests.tools import (
     TestCollection,
@@ -233,9 +239,11 @@ class TestTargetListReorder:
         assert "Reordering target #1" in str(event_logger)
         assert "Found 4 new cards in a target collection of 6 cards" in str(event_logger)
 
-        assert result.num_cards_repositioned == 11
+        assert len(result.reorder_result_list[0].sorted_cards_ids) == 7
+        assert len(result.reorder_result_list[1].sorted_cards_ids) == 4
+        assert result.num_cards_repositioned == 9
         assert result.reorder_result_list[0].num_cards_repositioned == 7
-        assert result.reorder_result_list[1].num_cards_repositioned == 4
+        assert result.reorder_result_list[1].num_cards_repositioned == 2  # other cards keep their position
 
         # check acquired cards for each target
         assert len(target_list[0].get_cards_non_cached().all_cards_ids) == 10
@@ -297,14 +305,16 @@ class TestTargetListReorder:
         assert target_list[0].corpus_data is not None and len(target_list[0].corpus_data.segments_ids) == 2
         assert list(target_list[0].corpus_data.content_metrics.keys()) == target_list[0].corpus_data.segments_ids
 
-        assert result.num_cards_repositioned == 11
+        assert result.num_cards_repositioned == 5
         reorder_result = result.reorder_result_list[0]
         assert reorder_result.success and reorder_result.cards_repositioned
         assert reorder_result.error is None
+        assert len(reorder_result.sorted_cards_ids) == 11
         assert len(result.modified_dirty_notes) == 0
         assert "Reordering target #0" in str(event_logger)
         assert "Found 11 new cards in a target collection of 16 cards" in str(event_logger)
-        assert "11 cards repositioned" in str(event_logger)
+        assert "Repositioning 5 of 11 cards for this target." in str(event_logger)
+        assert "5 cards repositioned" in str(event_logger)
 
         # check order
         col.lock_and_assert_order('sorted_cards_ids', result.reorder_result_list[0].sorted_cards_ids)
@@ -366,9 +376,11 @@ class TestTargetListReorder:
 
         assert "Found 11 new cards in a target collection of 16 cards." in str(event_logger)
 
+        assert len(result.reorder_result_list[0].sorted_cards_ids) == 7
+        assert len(result.reorder_result_list[1].sorted_cards_ids) == 4
         assert result.reorder_result_list[0].num_cards_repositioned == 7
-        assert result.reorder_result_list[1].num_cards_repositioned == 4
-        assert result.num_cards_repositioned == 11
+        assert result.reorder_result_list[1].num_cards_repositioned == 1
+        assert result.num_cards_repositioned == 8
 
         # check acquired cards for each target
         assert len(target_list[0].get_cards_non_cached().all_cards_ids) == 16
@@ -515,8 +527,9 @@ class TestTargetListReorder:
         assert len(result.modified_dirty_notes) == 0
         assert "Found 11 new cards in a target collection of 16 cards" in str(event_logger)
 
-        assert result.reorder_result_list[0].num_cards_repositioned == 11
-        assert result.num_cards_repositioned == 11
+        assert len(result.reorder_result_list[0].sorted_cards_ids) == 11
+        assert result.reorder_result_list[0].num_cards_repositioned == 5
+        assert result.num_cards_repositioned == 5
 
         # check order
         col.lock_and_assert_order('sorted_cards_ids', result.reorder_result_list[0].sorted_cards_ids)
@@ -555,8 +568,9 @@ class TestTargetListReorder:
         assert "Reordering target #0" in str(event_logger)
         assert "Found 12 new cards in a target collection of 16 cards." in str(event_logger)
 
-        assert result.reorder_result_list[0].num_cards_repositioned == 12
-        assert result.num_cards_repositioned == 12
+        assert len(result.reorder_result_list[0].sorted_cards_ids) == 12
+        assert result.reorder_result_list[0].num_cards_repositioned == 8
+        assert result.num_cards_repositioned == 8
 
         assert len(target_list[0].get_cards_non_cached().all_cards_ids) == 16
         assert len(target_list[0].get_cards_non_cached().get_notes_from_all_cards()) == 16
@@ -597,8 +611,75 @@ class TestTargetListReorder:
         assert list(target_list[0].corpus_data.content_metrics.keys()) == target_list[0].corpus_data.segments_ids
 
         assert len(target_list[0].get_cards_non_cached().all_cards_ids) == 16
+        assert "Skipped ranking inputs not needed for the used ranking factors" in str(event_logger)
 
         col.lock_and_assert_order('all_cards_ids_'+ranking_factor, target_list[0].get_cards_non_cached().all_cards_ids)
+        col.lock_and_assert_order('new_cards_ids_'+ranking_factor, target_list[0].get_cards_non_cached().new_cards_ids)
+
+    @freeze_time_anki("2023-12-01")
+    @with_test_collection("two_deck_collection")
+    def test_notes_ranking_numpy_parity(self, col: TestCollection, monkeypatch: pytest.MonkeyPatch):
+
+        pytest.importorskip("numpy")
+
+        target_list = TargetList(col.lang_data, col.cacher, col)
+
+        target_list.set_targets([
+            {
+                'decks': ['decka', 'deckb'],
+                'notes': [{
+                    "name": "Basic",
+                    "fields": {
+                        "Front": "EN",
+                        "Back": "ES"
+                    },
+                }]
+            }
+        ])
+
+        result = target_list.reorder_cards(col, EventLogger())
+        assert result.reorder_result_list[0].success
+
+        target = target_list[0]
+        target_cards = target.get_cards_non_cached()
+        assert target.corpus_data is not None
+
+        results = []
+
+        for use_numpy in [False, True]:
+            monkeypatch.setattr(CardRanker, 'use_numpy', use_numpy)
+            card_ranker = CardRanker(target.corpus_data, target.name, col.lang_data, {})
+            card_rankings, _ = card_ranker.calc_cards_ranking(target_cards, target_cards)
+            sorted_cards_ids = card_ranker.get_sorted_cards_ids(target_cards.new_cards_ids, card_rankings)
+            results.append((card_rankings, sorted_cards_ids, card_ranker.ranking_factors_stats))
+
+        (python_rankings, python_sorted_cards_ids, python_stats), (numpy_rankings, numpy_sorted_cards_ids, numpy_stats) = results
+
+        assert len(python_rankings) == len(target_cards.new_cards_ids)
+        assert numpy_rankings == pytest.approx(python_rankings)
+        assert numpy_sorted_cards_ids == python_sorted_cards_ids
+        assert python_stats is not None and numpy_stats is not None
+        assert numpy_stats.keys() == python_stats.keys()
+        for factor, factor_stats in python_stats.items():
+            assert numpy_stats[factor] == pytest.approx(factor_stats)
+
+    def test_ranking_inputs(self):
+
+        all_inputs = frozenset(CardRanker.ranking_inputs_dependencies.keys())
+
+        assert CardRanker.get_ranking_inputs(CardRanker.get_default_ranking_factors_span(), False) == all_inputs - {'internal_word_frequency', 'lowest_internal_fr_word'}
+        assert CardRanker.get_ranking_inputs({'ideal_word_count': 1, 'word_frequency': 0}, False) == frozenset()
+        assert CardRanker.get_ranking_inputs({'word_frequency': 1}, False) == {'word_frequency'}
+        assert CardRanker.get_ranking_inputs({'most_obscure_word': 1}, False) == {'most_obscure_word', 'word_frequency', 'familiarity_positional'}
+        assert CardRanker.get_ranking_inputs({'lexical_underexposure': 1}, False) == {'lexical_underexposure', 'familiarity'}
+        assert CardRanker.get_ranking_inputs({'word_frequency': 1}, True) == frozenset(CardRanker.fields_meta_data_inputs)
+
+        ranking_inputs = CardRanker.get_ranking_inputs(CardRanker.get_default_ranking_factors_span(), True)
+        assert CardRanker.get_fields_meta_data_inputs(['Front', 'fm_unknown'], ranking_inputs) == frozenset()
+        assert CardRanker.get_fields_meta_data_inputs(['fm_seen_words', 'fm_new_words'], ranking_inputs) == {'new_words'}
+        assert CardRanker.get_fields_meta_data_inputs(['fm_main_focus_word_static_0'], ranking_inputs) == {'focus_words', 'familiarity'}
+        assert CardRanker.get_fields_meta_data_inputs(['fm_lowest_fr_word_1', 'fm_lowest_internal_fr_word_1'], ranking_inputs) == {'word_frequency'}
+        assert CardRanker.get_fields_meta_data_inputs(['fm_seen_words', 'fm_debug_info'], ranking_inputs) == ranking_inputs
 
     @freeze_time_anki("2023-12-01")
     @with_test_collection("zh_and_ja")
@@ -659,6 +740,46 @@ class TestTargetListReorder:
 
             col.lock_and_assert_result('all_words_'+str(target.index_num), sorted(all_words))
 
+    @freeze_time_anki("2023-12-01")
+    @with_test_collection("two_deck_collection")
+    def test_fields_meta_data_of_reviewed_notes(self, col: TestCollection):
+
+        # add meta data fields to model
+        model = col.models.by_name("Basic")
+        assert model is not None
+        col.models.add_field(model, col.models.new_field("fm_seen_words"))
+        col.models.add_field(model, col.models.new_field("fm_lowest_fr_word_0"))
+        col.models.save(model)
+
+        target_list = TargetList(col.lang_data, col.cacher, col)
+
+        target_list.set_targets([
+            {
+                'decks': ['decka', 'deckb'],
+                'notes': [{
+                    "name": "Basic",
+                    "fields": {
+                        "Front": "EN",
+                        "Back": "ES"
+                    },
+                }]
+            }
+        ])
+
+        # reorder cards
+        event_logger = EventLogger()
+        result = target_list.reorder_cards(col, event_logger)
+
+        assert result.reorder_result_list[0].success
+        assert "Processing meta data for note fields" in str(event_logger)
+
+        # notes without new cards also get their meta data
+        reviewed_notes_ids = col.find_notes('(deck:decka OR deck:deckb) -is:new')
+        assert len(reviewed_notes_ids) > 0
+        for note_id in reviewed_notes_ids:
+            assert col.get_note(note_id)['fm_seen_words'] != ''
+            assert col.get_note(note_id)['fm_lowest_fr_word_0'] != ''
+
     @freeze_time_anki("2023-12-01")
     @with_test_collection("two_deck_collection")
     def test_internal_word_frequency_ranking(self, col: TestCollection):
@@ -702,3 +823,381 @@ class TestTargetListReorder:
         for note_id in col.find_notes('deck:decka OR deck:deckb'):
             note = col.get_note(note_id)
             assert 'internal_fr_scores' in note['fm_debug_info']
+
+    @freeze_time_anki("2023-12-01")
+    @with_test_collection("two_deck_collection")
+    def test_debug_info_reused_when_content_unchanged(self, col: TestCollection):
+
+        # add debug fields to model
+        model = col.models.by_name("Basic")
+        assert model is not None
+        for field_name in ["fm_debug_info", "fm_debug_ranking_info", "fm_debug_words_info"]:
+            col.models.add_field(model, col.models.new_field(field_name))
+        col.models.save(model)
+
+        target_list = TargetList(col.lang_data, NullPersistentCacher(), col)  # without ranking result of previous reorder
+
+        target_list.set_targets([
+            {
+                'decks': ['decka', 'deckb'],
+                'notes': [{
+                    "name": "Basic",
+                    "fields": {
+                        "Front": "EN",
+                        "Back": "ES"
+                    },
+                }]
+            }
+        ])
+
+        notes_ids = col.find_notes('deck:decka OR deck:deckb')
+        CardRanker.debug_info_cached.clear()
+
+        # first reorder creates the debug info of all notes
+        result = target_list.reorder_cards(col, EventLogger())
+        assert result.reorder_result_list[0].success
+        assert CardRanker.debug_info_cached.hits == 0
+        assert CardRanker.debug_info_cached.misses == len(notes_ids)*3
+
+        debug_info = {note_id: col.get_note(note_id)['fm_debug_info'] for note_id in notes_ids}
+        debug_words_info = {note_id: col.get_note(note_id)['fm_debug_words_info'] for note_id in notes_ids}
+        assert all(info != '' for info in debug_info.values())
+
+        # second reorder reuses it, as the content of the notes didn't change
+        result = target_list.reorder_cards(col, EventLogger())
+        assert result.reorder_result_list[0].success
+        assert len(result.modified_dirty_notes) > 0
+        assert all(note is None for note in result.modified_dirty_notes.values())
+        assert CardRanker.debug_info_cached.hits == len(notes_ids)*3
+        assert CardRanker.debug_info_cached.misses == len(notes_ids)*3
+
+        for note_id in notes_ids:
+            note = col.get_note(note_id)
+            assert note['fm_debug_info'] == debug_info[note_id]
+            assert note['fm_debug_words_info'] == debug_words_info[note_id]
+
+    @freeze_time_anki("2023-12-01")
+    @with_test_collection("two_deck_collection")
+    def test_ranking_of_unchanged_target_reused(self, col: TestCollection):
+
+        targets: list = [
+            {
+                'deck': 'decka',
+                'notes': [{
+                    "name": "Basic",
+                    "fields": {
+                        "Front": "EN",
+                        "Back": "ES"
+                    },
+                }]
+            }
+        ]
+
+        target_list = TargetList(col.lang_data, col.cacher, col)
+        target_list.set_targets(targets)
+
+        # first reorder ranks the cards
+        event_logger = EventLogger()
+        result = target_list.reorder_cards(col, event_logger)
+        assert result.num_cards_repositioned == 7
+        assert "Ranking cards and creating a new sorted list" in str(event_logger)
+
+        # unchanged target (with a new target list) uses the ranking of the previous reorder
+        target_list = TargetList(col.lang_data, col.cacher, col)
+        target_list.set_targets(targets)
+
+        event_logger = EventLogger()
+        result = target_list.reorder_cards(col, event_logger)
+        assert result.reorder_result_list[0].success
+        assert result.num_cards_repositioned == 0
+        assert "Target is unchanged since the previous reorder." in str(event_logger)
+        assert "Repositioning 7 cards not needed for this target." in str(event_logger)
+        assert "Ranking cards and creating a new sorted list" not in str(event_logger)
+
+        # changed content of a targeted field requires ranking again
+        note = col.get_note(col.find_notes('deck:decka')[0])
+        note['Front'] += " changed"
+        col.update_note(note)
+
+        event_logger = EventLogger()
+        result = target_list.reorder_cards(col, event_logger)
+        assert result.reorder_result_list[0].success
+        assert "Target is unchanged since the previous reorder." not in str(event_logger)
+        assert "Ranking cards and creating a new sorted list" in str(event_logger)
+
+        # changed ranking factors require ranking again
+        targets[0]['ranking_factors'] = {'word_frequency': 1}
+        target_list.set_targets(targets)
+
+        event_logger = EventLogger()
+        result = target_list.reorder_cards(col, event_logger)
+        assert result.reorder_result_list[0].success
+        assert "Target is unchanged since the previous reorder." not in str(event_logger)
+        assert "Ranking cards and creating a new sorted list" in str(event_logger)
+
+    @freeze_time_anki("2023-12-01")
+    @with_test_collection("two_deck_collection")
+    def test_incremental_ranking(self, col: TestCollection, monkeypatch: pytest.MonkeyPatch):
+
+        monkeypatch.setattr(Target, 'incremental_ranking_max_added', 0.5)
+
+        targets: list = [
+            {
+                'deck': 'decka',
+                'notes': [{
+                    "name": "Basic",
+                    "fields": {
+                        "Front": "EN",
+                        "Back": "ES"
+                    },
+                }],
+                'incremental_ranking': 1
+            }
+        ]
+
+        target_list = TargetList(col.lang_data, col.cacher, col)
+        target_list.set_targets(targets)
+
+        did = col.decks.id("decka")
+        model = col.models.by_name("Basic")
+        assert did and model
+
+        def add_note(front: str, back: str) -> None:
+            note = col.new_note(model)
+            note['Front'] = front
+            note['Back'] = back
+            col.add_note(note, did)
+
+        # first reorder ranks all cards
+        event_logger = EventLogger()
+        result = target_list.reorder_cards(col, event_logger)
+        assert result.num_cards_repositioned == 7
+        assert "Ranking cards and creating a new sorted list" in str(event_logger)
+        ranked_cards_ids = list(result.reorder_result_list[0].sorted_cards_ids)
+
+        # only the cards of added notes are ranked and inserted, the other cards keep their order
+        add_note("The dog runs.", "El perro corre.")
+        add_note("A cat.", "Un gato.")
+
+        event_logger = EventLogger()
+        result = target_list.reorder_cards(col, event_logger)
+        assert result.reorder_result_list[0].success
+        assert result.num_cards_repositioned == 2
+        assert "Ranking 2 cards added since the previous reorder." in str(event_logger)
+        assert "Inserting 2 cards into the order of the previous reorder." in str(event_logger)
+        assert "Ranking cards and creating a new sorted list" not in str(event_logger)
+
+        sorted_cards_ids = list(result.reorder_result_list[0].sorted_cards_ids)
+        assert len(sorted_cards_ids) == 9
+        assert [card_id for card_id in sorted_cards_ids if card_id in ranked_cards_ids] == ranked_cards_ids
+        assert list(target_list[0].get_cards_non_cached().new_cards_ids) == sorted_cards_ids
+
+        # unchanged target uses the (incremental) ranking of the previous reorder
+        event_logger = EventLogger()
+        result = target_list.reorder_cards(col, event_logger)
+        assert "Target is unchanged since the previous reorder." in str(event_logger)
+
+        # fully ranked again after the defined number of incremental reorders
+        add_note("The bird.", "El pájaro.")
+
+        event_logger = EventLogger()
+        result = target_list.reorder_cards(col, event_logger)
+        assert result.reorder_result_list[0].success
+        assert "Fully ranking target again after 1 incremental reorders." in str(event_logger)
+        assert "Ranking cards and creating a new sorted list" in str(event_logger)
+
+    @freeze_time_anki("2023-12-01")
+    @with_test_collection("two_deck_collection")
+    def test_incremental_ranking_outside_previous_range(self, col: TestCollection, monkeypatch: pytest.MonkeyPatch):
+
+        monkeypatch.setattr(Target, 'incremental_ranking_max_added', 0.5)
+
+        target_list = TargetList(col.lang_data, col.cacher, col)
+        target_list.set_targets([
+            {
+                'deck': 'decka',
+                'notes': [{
+                    "name": "Basic",
+                    "fields": {
+                        "Front": "EN",
+                        "Back": "ES"
+                    },
+                }],
+                'ranking_factors': {'word_frequency': 1},
+                'incremental_ranking': 1
+            }
+        ])
+
+        did = col.decks.id("decka")
+        model = col.models.by_name("Basic")
+        assert did and model
+
+        def add_note(front: str, back: str) -> CardId:
+            note = col.new_note(model)
+            note['Front'] = front
+            note['Back'] = back
+            col.add_note(note, did)
+            return note.cards()[0].id
+
+        # first reorder ranks all cards
+        result = target_list.reorder_cards(col, EventLogger())
+        ranked_cards_ids = list(result.reorder_result_list[0].sorted_cards_ids)
+
+        def get_stored_ranking() -> dict[str, Any]:
+            return col.cacher.get_item("ranking_result_target0", dict)
+
+        # narrow the word frequency range of the previous ranking, so added cards can score outside of it
+        previous_ranking = get_stored_ranking()
+        assert previous_ranking['ranking_factors_scaling']['word_frequency'] == [0.0, 0.005, 1.0]
+        assert previous_ranking['card_rankings'][0] == 1.0 and previous_ranking['card_rankings'][-1] == 0.0
+        previous_ranking['ranking_factors_scaling']['word_frequency'] = [0.001, 0.004, 1.0]
+        col.cacher.save_item("ranking_result_target0", previous_ranking)
+
+        # same content as the best ranked card (above the range) and unknown words (below the range)
+        best_ranked_note = col.get_card(ranked_cards_ids[0]).note()
+        above_range_card_id = add_note(best_ranked_note['Front'], best_ranked_note['Back'])
+        below_range_card_id = add_note("Xyzzy qwrtp.", "Zzxq plorf.")
+
+        event_logger = EventLogger()
+        result = target_list.reorder_cards(col, event_logger)
+        assert "Ranking 2 cards added since the previous reorder." in str(event_logger)
+
+        # scores are not clipped to the range, so the cards are placed before and after all previously ranked cards
+        assert list(result.reorder_result_list[0].sorted_cards_ids) == [above_range_card_id] + ranked_cards_ids + [below_range_card_id]
+
+        card_rankings = get_stored_ranking()['card_rankings']
+        assert card_rankings[0] == pytest.approx((0.005-0.001)/0.003)
+        assert card_rankings[-1] == pytest.approx((0.0-0.001)/0.003)
+
+    @freeze_time_anki("2023-12-01")
+    @with_test_collection("two_deck_collection")
+    def test_incremental_ranking_inserts_before_next_target(self, col: TestCollection, monkeypatch: pytest.MonkeyPatch):
+
+        monkeypatch.setattr(Target, 'incremental_ranking_max_added', 0.5)
+
+        def target(deck: str) -> dict:
+            return {
+                'deck': deck,
+                'notes': [{
+                    "name": "Basic",
+                    "fields": {
+                        "Front": "EN",
+                        "Back": "ES"
+                    },
+                }],
+                'ranking_factors': {'word_frequency': 1},
+                'incremental_ranking': 1
+            }
+
+        def get_new_cards_order() -> list[CardId]:
+            return col.db.list("SELECT id FROM cards WHERE type = 0 ORDER BY due, id")
+
+        target_list = TargetList(col.lang_data, col.cacher, col)
+        target_list.set_targets([target('decka'), target('deckb')])
+        target_list.reorder_cards(col, EventLogger())
+
+        did = col.decks.id("decka")
+        model = col.models.by_name("Basic")
+        assert did and model
+
+        # added card starts out after the cards of the second target, and is ranked last in the first target
+        note = col.new_note(model)
+        note['Front'] = "Xyzzy qwrtp."
+        note['Back'] = "Zzxq plorf."
+        col.add_note(note, did)
+        added_card_id = note.cards()[0].id
+        assert get_new_cards_order()[-1] == added_card_id
+
+        event_logger = EventLogger()
+        result = target_list.reorder_cards(col, event_logger)
+        assert "Inserting 1 cards into the order of the previous reorder." in str(event_logger)
+
+        (first_result, second_result) = result.reorder_result_list
+        assert first_result.success and second_result.success
+        assert first_result.sorted_cards_ids[-1] == added_card_id
+
+        # inserted right after the other cards of the first target, before the cards of the second target
+        second_target_cards_ids = list(target_list[1].get_cards_non_cached().new_cards_ids)
+        assert get_new_cards_order() == list(first_result.sorted_cards_ids) + second_target_cards_ids
+        assert col.get_card(added_card_id).due+1 == first_result.next_position
+        assert col.db.scalar("SELECT MIN(due) FROM cards WHERE type = 0 AND id IN (SELECT value FROM json_each(?))", json.dumps(second_target_cards_ids)) >= first_result.next_position
+
+    @freeze_time_anki("2023-12-01")
+    @with_test_collection("two_deck_collection")
+    def test_next_target_starts_after_unchanged_target(self, col: TestCollection):
+
+        def target(deck: str, ranking_factors: dict) -> dict:
+            return {
+                'deck': deck,
+                'notes': [{
+                    "name": "Basic",
+                    "fields": {
+                        "Front": "EN",
+                        "Back": "ES"
+                    },
+                }],
+                'ranking_factors': ranking_factors
+            }
+
+        def get_new_cards_order() -> list[CardId]:
+            return col.db.list("SELECT id FROM cards WHERE type = 0 ORDER BY due, id")
+
+        target_list = TargetList(col.lang_data, col.cacher, col)
+
+        target_list.set_targets([target('decka', {'word_frequency': 1}), target('deckb', {'word_frequency': 1})])
+        result = target_list.reorder_cards(col, EventLogger())
+        first_target_cards_ids = list(result.reorder_result_list[0].sorted_cards_ids)
+        first_target_next_position = result.reorder_result_list[0].next_position
+
+        # first target is unchanged (nothing is repositioned), but the second target still starts after its cards
+        target_list.set_targets([target('decka', {'word_frequency': 1}), target('deckb', {'familiarity': 1})])
+        event_logger = EventLogger()
+        result = target_list.reorder_cards(col, event_logger)
+        assert "Target is unchanged since the previous reorder." in str(event_logger)
+
+        (first_result, second_result) = result.reorder_result_list
+        assert first_result.success and not first_result.cards_repositioned
+        assert first_result.next_position == first_target_next_position
+        assert second_result.success and second_result.cards_repositioned
+
+        assert get_new_cards_order() == first_target_cards_ids + list(second_result.sorted_cards_ids)
+        assert col.db.scalar("SELECT MIN(due) FROM cards WHERE type = 0 AND id IN (SELECT value FROM json_each(?))", json.dumps(second_result.sorted_cards_ids)) >= first_target_next_position
+
+    @freeze_time_anki("2023-12-01")
+    @with_test_collection("two_deck_collection")
+    def test_reposition_only_moved_cards(self, col: TestCollection):
+
+        def target(deck: str, ranking_factors: dict) -> dict:
+            return {
+                'deck': deck,
+                'notes': [{
+                    "name": "Basic",
+                    "fields": {
+                        "Front": "EN",
+                        "Back": "ES"
+                    },
+                }],
+                'ranking_factors': ranking_factors
+            }
+
+        def get_new_cards_order() -> list[CardId]:
+            return col.db.list("SELECT id FROM cards WHERE type = 0 ORDER BY due, id")
+
+        target_list = TargetList(col.lang_data, NullPersistentCacher(), col)
+
+        for ranking_factors in [{'word_frequency': 1}, {'familiarity': 1}, {'word_frequency': 1, 'ideal_word_count': 1}]:
+
+            sorted_cards_ids_before = {target.index_num: list(target.get_cards_non_cached().new_cards_ids) for target in target_list}
+            target_list.set_targets([target('decka', ranking_factors), target('deckb', ranking_factors)])
+
+            event_logger = EventLogger()
+            result = target_list.reorder_cards(col, event_logger)
+            assert all(reorder_result.success for reorder_result in result.reorder_result_list)
+
+            # same order as repositioning all cards of each target, one target after the other
+            expected_order: list[CardId] = []
+            for target_index, reorder_result in enumerate(result.reorder_result_list):
+                expected_order.extend(reorder_result.sorted_cards_ids if reorder_result.cards_repositioned else sorted_cards_ids_before[target_index])
+            assert get_new_cards_order() == expected_order
+
+            assert result.num_cards_repositioned < len(expected_order)
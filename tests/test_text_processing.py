@@ -1,7 +1,10 @@
 from collections.abc import Sequence
+import html
+import random
+import re
 import pytest
-from frequencyman.text_processing import LangId, TextProcessing, WordToken
-from frequencyman.tokenizers import get_tokenizer_registry
+from frequencyman.text_processing import LangId, TextProcessing, TokenizationPipeline, WordToken
+from frequencyman.tokenizers import DefaultTokenizer, get_tokenizer_registry
 
 
 def test_acceptable_word():
@@ -53,6 +56,76 @@ def test_get_plain_text():
     assert TextProcessing.get_plain_text("Use of [brackets] <b>[inside HTML]</b> tags.") == "Use of [brackets] [inside HTML] tags."
 
 
+def get_plain_text_reference(val: str) -> str:
+    # previous (multi pass) implementation of TextProcessing.get_plain_text
+    val = re.sub(r'<(style|head|script|object|noscript|embed|noembed|applet|canvas)(.*?)>(.*?)</\1>', ' ', val, flags=re.DOTALL)
+    val = re.sub(r'</?(br|p|hr|div|pre|blockquote|h[1-6]|ul|ol|li|table|tr|td|th|dl|dd|dt)([^>]*)>', ' ', val, flags=re.IGNORECASE)
+    val = re.sub(r'<[^>]+>', '', val)
+    val = re.sub(r"\[(sound|type):[^]]+\]", " ", val)
+    val = html.unescape(val)
+    val = re.sub(r'[\s]+', ' ', val)
+    return val.strip()
+
+
+def test_get_plain_text_equals_reference():
+
+    field_values = [
+        "",
+        "   ",
+        "plain text without markup",
+        "  lots   of\t\nwhite\r\n space\u3000here\xa0 ",
+        "This a <b>sample</b></b> text with HTML<p>tags</P>and<br>example.",
+        "El <i>perro</i> come&nbsp;la comida.<br><div>Otra línea</div>[sound:perro.mp3]",
+        "<style>.card { color: red; }</style><span style=\"color:red\">rojo</span>",
+        "<SCRIPT>alert(1)</SCRIPT> upper case script is not a content block",
+        "<header>not a head block</header>",
+        "<pre>code</pre><param name='x'><h3>Title</h3><TD>cell</TD>",
+        "[type:<b>Front</b>] answer [sound:a.mp3][sound:b.mp3]",
+        "[sound:]  [x] [type:] ]] [[",
+        "&amp &ampx &gtx &#65;&#x42; &unknown; &#; &#x; &Tab;x&NewLine;y a&b[sound:x.mp3]",
+        "&lt;b&gt;escaped tag&lt;/b&gt; &amp;nbsp;",
+        "<img src=\"a.png\"><a href=\"https://example.com/?a=1&b=2\">link</a>",
+        "Tom &amp; Jerry &mdash; 'quotes' &quot;double&quot;",
+        "你好<br/>世界 [sound:zh.mp3]",
+        "if a < b<br>then c",
+        "a <3 b<script>x</script> c> d",
+        "<b <script>x</script>> text",
+        "x <styles <b>y</style> z",
+        "&am<b>p; &#6<i>5; [so<b>und:a.mp3] [sound:a<br>b.mp3]",
+        "&#91;sound:x.mp3] &lt;br&gt; [sound:x.mp3&#93;",
+    ]
+
+    for field_value in field_values:
+        assert TextProcessing.get_plain_text(field_value) == get_plain_text_reference(field_value), field_value
+
+    # random (well-formed) combinations of markup and text
+
+    fragments = [
+        "<b>", "</b>", "<br>", "<BR/>", "<p class='x'>", "</P>", "<div>", "<h1>", "<li>", "<img src='a.png'>",
+        "<script>x</script>", "<style>a{}</style>", "<SCRIPT>x</SCRIPT>", "<head><title>t</title></head>",
+        "[sound:a.mp3]", "[type:Front]", "[sound:", "[type:", "[x]", "[", "]", ">",
+        "&amp;", "&nbsp;", "&lt;", "&#65;", "&#x42;", "&amp", "&nbspx", "&foo;", "&", "&#", "&#x",
+        " ", "  ", "\t", "\n", "\xa0", "word", "palabra", "é", "你",
+    ]
+
+    rnd = random.Random(42)
+
+    for _ in range(20_000):
+        field_value = "".join(rnd.choice(fragments) for _ in range(rnd.randint(0, 12)))
+        assert TextProcessing.get_plain_text(field_value) == get_plain_text_reference(field_value), field_value
+
+    # random combinations with stray '<', '&' and '[' characters
+
+    fragments = [
+        "<", ">", "&", "[", "]", "#", ";", "/", "sound:", "type:", "amp", "nbsp", "x", "41", "br", "p", "script", "style",
+        "<b>", "</b>", "<br>", "<div>", "<script>", "</script>", "<style>", "</style>", "&amp;", "&#65;", " ", "\n", "a", "é",
+    ]
+
+    for _ in range(50_000):
+        field_value = "".join(rnd.choice(fragments) for _ in range(rnd.randint(0, 16)))
+        assert TextProcessing.get_plain_text(field_value) == get_plain_text_reference(field_value), field_value
+
+
 def test_get_word_tokens_from_text_default_tokenizer_en():
 
     text_with_special_chars = "I can't \"believe\" it's here (wow) 1-character! 'amazinG'"
@@ -133,6 +206,19 @@ def test_get_word_tokens_from_text_user_tokenizer_zh():
         assert TextProcessing.get_word_tokens_from_text(" 我 爱自然语言处理。 ", LangId('zh'), tokenizer) == ['我', '爱', '自然语言', '处理'], tokenizer.name()
 
 
+def test_tokenization_pipeline_tokenize_many():
+
+    texts = ["I can't \"believe\" it's here (wow)", "", "12345", "Anna’s sente-nce. EE.UU. Anna's visit.", "Hello, world!"]
+
+    pipeline = TextProcessing.get_tokenization_pipeline(LangId("en"))
+    assert pipeline is TextProcessing.get_tokenization_pipeline(LangId("en"))
+    assert pipeline.tokenize_many(texts) == [TextProcessing.get_word_tokens_from_text(text, LangId("en")) for text in texts]
+    assert pipeline.tokenize_many([]) == []
+
+    with pytest.raises(ValueError):
+        TokenizationPipeline(LangId("zh"), DefaultTokenizer())
+
+
 def test_create_word_token():
 
     create_word_token = TextProcessing.get_word_token_creator(LangId('en'))
@@ -5,7 +5,7 @@ import pytest
 from frequencyman.lib.utilities import (
     get_float, normalize_dict_floats_values, normalize_dict_positional_floats_values,
     positional_value_absolute, remove_bottom_percent_dict, load_json_with_tolerance,
-    sort_dict_floats_values
+    sort_dict_floats_values, get_longest_non_decreasing_subsequence
 )
 
 
@@ -256,3 +256,12 @@ def test_load_json_with_tolerance_json_inside_string():
 def test_load_json_with_tolerance_invalid_json():
     with pytest.raises(json.JSONDecodeError):
         load_json_with_tolerance("{invalid: json}")
+
+
+def test_get_longest_non_decreasing_subsequence():
+    assert get_longest_non_decreasing_subsequence([]) == []
+    assert get_longest_non_decreasing_subsequence([5]) == [0]
+    assert get_longest_non_decreasing_subsequence([1, 2, 3]) == [0, 1, 2]
+    assert get_longest_non_decreasing_subsequence([3, 2, 1]) == [2]
+    assert get_longest_non_decreasing_subsequence([2, 2, 1, 2]) == [0, 1, 3]
+    assert get_longest_non_decreasing_subsequence([0, 8, 4, 12, 2, 10, 6, 14, 1, 9]) == [0, 4, 6, 9]
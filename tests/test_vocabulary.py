@@ -0,0 +1,23 @@
+from frequencyman.text_processing import LangId, WordToken
+from frequencyman.vocabulary import Vocabulary
+
+
+def test_vocabulary():
+
+    vocabulary = Vocabulary(LangId('en'))
+    tokens = [WordToken(token) for token in ["the", "cat", "sat", "on", "the", "mat"]]
+
+    token_ids = vocabulary.get_ids(tokens)
+
+    assert list(token_ids) == [0, 1, 2, 3, 0, 4]
+    assert token_ids.typecode == 'I'
+    assert len(vocabulary) == 5
+    assert WordToken("cat") in vocabulary
+    assert WordToken("dog") not in vocabulary
+    assert vocabulary.get_id(WordToken("dog")) == 5
+    assert vocabulary.get_token(1) == "cat"
+    assert vocabulary.get_tokens(token_ids) == tokens
+    assert list(vocabulary.token_lengths) == [3, 3, 3, 2, 3, 3]
+    assert vocabulary.find_id(WordToken("mat")) == 4
+    assert vocabulary.find_id(WordToken("hat")) is None
+    assert len(vocabulary) == 6